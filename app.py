@@ -3,9 +3,12 @@ from dash import Dash, Output, Input, dcc, State
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from sensors import load_sensors
-from sensors.communication import PySerialCommunication  # or ZCMCommunication
+from sensors.shared_memory import IngestClient
+from ingest import create_communication
 from layout import create_layout  # Import the layout function
 import callbacks  # Import the general callbacks module
+from monitoring import register_metrics
+from profiling import register_profiling
 import os
 
 # Initialize the Dash app
@@ -18,18 +21,29 @@ server = app.server
 
 def initialize_app():
     # Initialize shared communication using dependency injection
-    communication = PySerialCommunication(
-        port='/dev/cu.usbmodem1101',  # Replace with your serial port
-        baudrate=115200,
-        timeout=10
-    )
+    shared_memory = os.environ.get('SENSOR_SHARED_MEMORY')
+    if shared_memory:
+        # A separate ingestion process (ingest.py) owns the ports and stores the
+        # samples in shared memory; this worker only reads them
+        communication = IngestClient(shared_memory)
+    else:
+        communication = create_communication()
     app.layout = [dcc.Store(id='callback_store', storage_type='session', data=False)]  # Store for general callbacks
-    # Load sensors with shared communication
-    sensors = load_sensors(communication, app)
+    # Load sensors with shared communication, persisting their history to disk if
+    # SENSOR_RECORDING_DIR is set. Only one process may write a recording, so
+    # under several workers let ingest.py write it and the workers follow it.
+    recording_dir = os.environ.get('SENSOR_RECORDING_DIR')
+    sensors = load_sensors(communication, app, recording_dir=recording_dir,
+                           shared_memory=shared_memory, attach=bool(shared_memory))
 
     # Assign the main layout of the app
     app.layout.append(create_layout(app, sensors))
     callbacks.register_callbacks(app, sensors)
+    register_metrics(app, communication, sensors)  # Prometheus metrics at /metrics
+    # On-demand profiling at /profile, enabled by setting SENSOR_PROFILE_TOKEN
+    profile_dir = os.environ.get('SENSOR_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+    register_profiling(app, profile_dir, token=os.environ.get('SENSOR_PROFILE_TOKEN'),
+                       communication=communication, sensors=sensors)
 
 # Check if the script is run directly (not imported) and if it's the reloader process
 if __name__ == '__main__':
@@ -0,0 +1,76 @@
+// assets/sensor_stream.js
+// Appends samples pushed over /sensor-stream to the sensor graphs.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    sensorStream: (function () {
+        var streams = {};  // sensor name -> {url, source}
+
+        // Dash renders dict ids as JSON with sorted keys
+        function graphElement(sensorName, field) {
+            var id = JSON.stringify({field: field, sensor_name: sensorName, type: 'sensor-graph'});
+            var container = document.getElementById(id);
+            return container ? container.querySelector('.js-plotly-plot') : null;
+        }
+
+        function streamUrl(sensorName, cursor) {
+            if (!cursor || !cursor.key) {
+                return null;  // Not streaming, e.g. showing rollups
+            }
+            var params = new URLSearchParams({
+                sensor: sensorName,
+                since: cursor.sequence,
+                time_window: cursor.key.time_window === null ? '' : cursor.key.time_window,
+                parameters: JSON.stringify(cursor.key.parameters)
+            });
+            return '/sensor-stream?' + params.toString();
+        }
+
+        function open(sensorName, url) {
+            var source = new EventSource(url);
+            source.onmessage = function (event) {
+                var batch = JSON.parse(event.data);
+                Object.keys(batch.y).forEach(function (field) {
+                    var graph = graphElement(sensorName, field);
+                    if (graph) {
+                        Plotly.extendTraces(graph, {x: [batch.x], y: [batch.y[field]]}, [0], batch.max_points);
+                    }
+                });
+            };
+            // The window outgrew raw streaming; the dashboard tick rebuilds the figures
+            source.addEventListener('end', function () {
+                source.close();
+            });
+            return source;
+        }
+
+        function connect(cursors) {
+            var inputs = window.dash_clientside.callback_context.inputs_list[0];
+            var active = {};
+            inputs.forEach(function (input, index) {
+                var sensorName = input.id.sensor_name;
+                var url = streamUrl(sensorName, cursors[index]);
+                var stream = streams[sensorName];
+                active[sensorName] = true;
+                // Cursor stamps change every update; only reconnect when the stream itself changes
+                if (stream && stream.url === url && stream.source.readyState !== EventSource.CLOSED) {
+                    return;
+                }
+                if (stream) {
+                    stream.source.close();
+                    delete streams[sensorName];
+                }
+                if (url) {
+                    streams[sensorName] = {url: url, source: open(sensorName, url)};
+                }
+            });
+            Object.keys(streams).forEach(function (sensorName) {
+                if (!active[sensorName]) {
+                    streams[sensorName].source.close();
+                    delete streams[sensorName];
+                }
+            });
+            return Object.keys(streams).length;
+        }
+
+        return {connect: connect};
+    })()
+});
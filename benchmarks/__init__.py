@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Performance benchmarks for the ingestion, query and render paths; run with
+# python -m benchmarks.run
@@ -0,0 +1,372 @@
+# benchmarks/run.py
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# Allow running as a script from anywhere in the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensors.base_sensor import BaseSensor
+from sensors.communication import CommunicationInterface, PySerialCommunication, AsciiCodec, BinaryFrameCodec
+from sensors.async_serial import AsyncSerialCommunication
+from sensors.dispatcher import BLOCK
+from sensors.rollup import DEFAULT_TIERS
+from sensors.timebase import now_ns
+
+QUERY_SIZES = [10_000, 1_000_000, 10_000_000]
+QUICK_QUERY_SIZES = [10_000, 100_000]
+
+
+class NullCommunication(CommunicationInterface):
+    """Communication without a transport, for feeding sensors directly."""
+
+
+def measure(function, min_repeat=3, max_repeat=50, budget=1.0):
+    """
+    Time repeated calls of a function.
+
+    Parameters:
+    - function: Callable without arguments.
+    - min_repeat: Minimum number of calls.
+    - max_repeat: Maximum number of calls.
+    - budget: Seconds after which no more calls are started once min_repeat is reached.
+
+    Returns:
+    - Dictionary of latency statistics in milliseconds.
+    """
+    durations = []
+    start = time.perf_counter()
+    while len(durations) < max_repeat and (len(durations) < min_repeat or time.perf_counter() - start < budget):
+        call_start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - call_start) * 1000)
+    durations = np.array(durations)
+    return {
+        'repeat': len(durations),
+        'min_ms': float(durations.min()),
+        'median_ms': float(np.median(durations)),
+        'p95_ms': float(np.percentile(durations, 95)),
+        'mean_ms': float(durations.mean()),
+    }
+
+
+def filled_sensor(n_samples, data_fields=('value',), rate_hz=1000.0, sensor_class=None, rollup_tiers=DEFAULT_TIERS):
+    """
+    Create a sensor holding n_samples samples that end now.
+
+    Parameters:
+    - n_samples: Number of samples, also the buffer capacity.
+    - data_fields: Field names, for a plain BaseSensor.
+    - rate_hz: Sample rate the timestamps are spaced at.
+    - sensor_class: Sensor class taking a communication object, instead of a plain BaseSensor.
+    - rollup_tiers: Rollup tiers of a plain BaseSensor.
+
+    Returns:
+    - The sensor.
+    """
+    communication = NullCommunication()
+    if sensor_class is None:
+        sensor_class = type('BenchmarkSensor', (BaseSensor,), {'rollup_tiers': rollup_tiers})
+        sensor = sensor_class('Benchmark Sensor', communication, 'BENCH_SENSOR', list(data_fields), capacity=n_samples)
+    else:
+        sensor_class = type(sensor_class.__name__, (sensor_class,), {'capacity': n_samples})
+        sensor = sensor_class(communication)
+    period_ns = int(1e9 / rate_hz)
+    first = now_ns() - (n_samples - 1) * period_ns
+    chunk = 1_000_000
+    for start in range(0, n_samples, chunk):
+        count = min(chunk, n_samples - start)
+        timestamps = first + (start + np.arange(count, dtype=np.int64)) * period_ns
+        t = timestamps / 1e9
+        values = np.column_stack([20 + np.sin(t + i) + 0.1 * np.random.standard_normal(count)
+                                  for i in range(len(sensor.data_fields))])
+        sensor.data_batch_callback(timestamps, values)
+    return sensor
+
+
+def bench_serial(n_messages=200_000):
+    """
+    Parse and dispatch throughput of PySerialCommunication's read loop.
+
+    The encoded messages are written into a pseudo-terminal that the real
+    reader thread reads, decodes and dispatches to a batch callback.
+    """
+    results = []
+    for codec_name in ('ascii', 'binary'):
+        master, slave = os.openpty()
+        codec = AsciiCodec() if codec_name == 'ascii' else BinaryFrameCodec({1: 'BENCH_SENSOR'})
+        communication = PySerialCommunication(os.ttyname(slave), timeout=0.1, codec=codec, overflow=BLOCK)
+        received = [0]
+        done = threading.Event()
+
+        def callback(timestamps, values):
+            received[0] += len(timestamps)
+            if received[0] >= n_messages:
+                done.set()
+
+        communication.register_batch_callback('BENCH_SENSOR', callback, 3)
+        while communication.serial_conn is None:
+            time.sleep(0.05)
+        time.sleep(2.5)  # connect() waits 2 seconds for a board reset before reading
+        values = np.round(np.random.standard_normal((n_messages, 3)), 4)
+        data = b''.join(codec.encode('BENCH_SENSOR', row) for row in values.tolist())
+
+        start = time.perf_counter()
+        view = memoryview(data)
+        for offset in range(0, len(data), 65536):
+            os.write(master, view[offset:offset + 65536])
+        done.wait(60)
+        seconds = time.perf_counter() - start
+        communication.close()
+        os.close(master)
+        os.close(slave)
+        results.append({
+            'benchmark': 'serial_parse_dispatch',
+            'codec': codec_name,
+            'messages': n_messages,
+            'received': received[0],
+            'bytes': len(data),
+            'seconds': seconds,
+            'messages_per_s': received[0] / seconds,
+            'megabytes_per_s': len(data) / seconds / 1e6,
+        })
+    return results
+
+
+def bench_async_serial(n_messages=200_000, port_counts=(1, 8, 32)):
+    """
+    Aggregate parse and dispatch throughput of AsyncSerialCommunication.
+
+    The messages are split evenly over pseudo-terminals that a single event
+    loop thread reads, one sensor per port.
+    """
+    results = []
+    for n_ports in port_counts:
+        ptys = [os.openpty() for _ in range(n_ports)]
+        communication = AsyncSerialCommunication([os.ttyname(slave) for _, slave in ptys], reset_delay=0.5,
+                                                 overflow=BLOCK)
+        per_port = n_messages // n_ports
+        received = [0]
+        done = threading.Event()
+
+        def callback(timestamps, values):
+            received[0] += len(timestamps)
+            if received[0] >= per_port * n_ports:
+                done.set()
+
+        for index in range(n_ports):
+            communication.register_batch_callback(f'BENCH_SENSOR_{index}', callback, 3)
+        while not all(stats['connected'] for stats in communication.port_stats().values()):
+            time.sleep(0.05)
+        codec = AsciiCodec()
+        values = np.round(np.random.standard_normal((per_port, 3)), 4).tolist()
+        data = [b''.join(codec.encode(f'BENCH_SENSOR_{index}', row) for row in values) for index in range(n_ports)]
+
+        start = time.perf_counter()
+        views = [memoryview(port_data) for port_data in data]
+        for offset in range(0, len(data[0]), 16384):
+            for (master, _), view in zip(ptys, views):
+                os.write(master, view[offset:offset + 16384])
+        done.wait(60)
+        seconds = time.perf_counter() - start
+        communication.close()
+        for master, slave in ptys:
+            os.close(master)
+            os.close(slave)
+        total_bytes = sum(len(port_data) for port_data in data)
+        results.append({
+            'benchmark': 'async_serial_parse_dispatch',
+            'ports': n_ports,
+            'messages': per_port * n_ports,
+            'received': received[0],
+            'bytes': total_bytes,
+            'seconds': seconds,
+            'messages_per_s': received[0] / seconds,
+            'megabytes_per_s': total_bytes / seconds / 1e6,
+        })
+    return results
+
+
+def bench_ingest(n_samples=100_000, n_batch_samples=1_000_000, batch_size=1000):
+    """Ingest rate of BaseSensor.data_callback (per sample) and data_batch_callback."""
+    sensor = BaseSensor('Benchmark Sensor', NullCommunication(), 'BENCH_SENSOR', ['value'], capacity=n_samples)
+    rows = [[str(20 + i % 100 / 10)] for i in range(n_samples)]
+    start = time.perf_counter()
+    for row in rows:
+        sensor.data_callback(row)
+    seconds = time.perf_counter() - start
+    results = [{
+        'benchmark': 'ingest_data_callback',
+        'samples': n_samples,
+        'seconds': seconds,
+        'samples_per_s': n_samples / seconds,
+    }]
+
+    sensor = BaseSensor('Benchmark Sensor', NullCommunication(), 'BENCH_SENSOR', ['value'], capacity=n_batch_samples)
+    timestamps = now_ns() + np.arange(n_batch_samples, dtype=np.int64) * 1_000_000
+    values = np.random.standard_normal((n_batch_samples, 1))
+    start = time.perf_counter()
+    for offset in range(0, n_batch_samples, batch_size):
+        sensor.data_batch_callback(timestamps[offset:offset + batch_size], values[offset:offset + batch_size])
+    seconds = time.perf_counter() - start
+    results.append({
+        'benchmark': 'ingest_data_batch_callback',
+        'samples': n_batch_samples,
+        'batch_size': batch_size,
+        'seconds': seconds,
+        'samples_per_s': n_batch_samples / seconds,
+    })
+    return results
+
+
+def bench_queries(sizes=QUERY_SIZES, window_seconds=60):
+    """Latency of get_data and time-window queries for buffers of several sizes."""
+    results = []
+    for n_samples in sizes:
+        sensor = filled_sensor(n_samples)
+        start = datetime.now() - timedelta(seconds=window_seconds)
+        cases = {
+            'get_data': sensor.get_data,
+            'get_window_recent': lambda: sensor.get_window(start=start),
+            'count_window_recent': lambda: sensor.count_window(start=start),
+            'get_window_all': lambda: sensor.get_window(),
+            'get_plot_window_all': lambda: sensor.get_plot_window(min_points=1600),
+        }
+        for name, function in cases.items():
+            results.append(dict({'benchmark': f'query_{name}', 'samples': n_samples,
+                                 'window_seconds': window_seconds if 'recent' in name else None},
+                                **measure(function)))
+        sensor.close()
+        del sensor
+    return results
+
+
+def bench_callbacks(n_samples=100_000, window_seconds=60):
+    """End-to-end latency of the sensor card update callbacks, called directly."""
+    from dash import Dash
+    from sensors.temperature_sensor import Sensor as TemperatureSensor
+    from tabs.sensor_tab.components import get_sensor_card
+
+    app = Dash(__name__)
+    sensor = filled_sensor(n_samples, rate_hz=100.0, sensor_class=TemperatureSensor)
+    card = get_sensor_card(app, sensor.name, sensor)
+    card.push = False  # Measure the extendData path rather than deferring to the push stream
+
+    def stream_tick(cursor, window):
+        # Add one tick's worth of samples, then refresh from the previous cursor
+        timestamps = now_ns() - np.arange(10, 0, -1, dtype=np.int64) * 10_000_000
+        sensor.data_batch_callback(timestamps, np.full((10, 1), 21.0))
+        return card.update_sensor_graphs(window, cursor)
+
+    results = []
+    for cached in (False, True):
+        card.figure_cache = card.__class__.figure_cache if cached else None
+        cases = {
+            'update_sensor_graphs_window': lambda: card.update_sensor_graphs(window_seconds),
+            'update_sensor_graphs_all': lambda: card.update_sensor_graphs(None),
+            'update_temperature_sensor_content_window': lambda: card.update_temperature_sensor_content(window_seconds, 'F'),
+            'update_temperature_sensor_content_all': lambda: card.update_temperature_sensor_content(None, 'F'),
+        }
+        for name, function in cases.items():
+            function()  # Warm up caches and lazily built pipelines
+            results.append(dict({'benchmark': f'callback_{name}', 'samples': n_samples,
+                                 'figure_cache': cached}, **measure(function)))
+
+    # Streaming only applies while the window's raw samples fit in max_points
+    card.figure_cache = None
+    stream_window = card.max_points // 2 / 100
+    cursor = card.update_sensor_graphs(stream_window)['cursor']
+    results.append(dict({'benchmark': 'callback_update_sensor_graphs_stream_tick', 'samples': n_samples,
+                         'window_seconds': stream_window, 'figure_cache': False},
+                        **measure(lambda: stream_tick(cursor, stream_window))))
+    sensor.close()
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path):
+    """
+    Print each result next to the matching one in a previous run.
+
+    Parameters:
+    - results: Results of this run.
+    - baseline_path: JSON file written by a previous run.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    def key(result):
+        # Everything except the measurements identifies a case
+        return tuple((name, value) for name, value in sorted(result.items())
+                     if name not in ('repeat', 'received', 'seconds') and not name.endswith(('_ms', '_per_s')))
+
+    previous = {key(result): result for result in baseline}
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        metric = 'median_ms' if 'median_ms' in result else next(
+            name for name in result if name.endswith('_per_s'))
+        ratio = result[metric] / old[metric] if old[metric] else float('nan')
+        print(f"{result['benchmark']:<50} {metric:<15} {old[metric]:>12.3f} -> {result[metric]:>12.3f} ({ratio:.2f}x)")
+
+
+def main():
+    benchmarks = {
+        'serial': bench_serial,
+        'async-serial': bench_async_serial,
+        'ingest': bench_ingest,
+        'queries': bench_queries,
+        'callbacks': bench_callbacks,
+    }
+    parser = argparse.ArgumentParser(description="Run the sensor dashboard benchmarks.")
+    parser.add_argument('--output', default='benchmark-results.json', help="JSON file to write the results to")
+    parser.add_argument('--only', nargs='+', choices=benchmarks, help="Run only these benchmarks")
+    parser.add_argument('--quick', action='store_true', help="Use smaller buffers for a fast run")
+    parser.add_argument('--compare', help="Results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for name, benchmark in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name} benchmarks...")
+        if name == 'queries' and args.quick:
+            results.extend(benchmark(QUICK_QUERY_SIZES))
+        elif name in ('serial', 'async-serial') and args.quick:
+            results.extend(benchmark(20_000))
+        else:
+            results.extend(benchmark())
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
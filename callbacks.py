@@ -2,6 +2,12 @@
 from dash.dependencies import Input, Output
 from dash import html
 import dash_bootstrap_components as dbc
+from datetime import datetime
+from flask import Response, request, abort
+from sensors.export import EXPORT_FORMATS, PARQUET, DEFAULT_ROWS_PER_GROUP, iter_export
+
+# Route of the history download; /export/<sensor id>?format=parquet&start=...&end=...
+EXPORT_ROUTE = '/export/<sensor_id>'
 
 def register_callbacks(app, sensors):
     """
@@ -39,3 +45,75 @@ def register_callbacks(app, sensors):
     for sensor in sensors:
         if hasattr(sensor, 'register_callbacks'):
             sensor.register_callbacks(app)
+
+    register_export_route(app, sensors)
+
+
+def parse_export_time(value):
+    """
+    Parse a start or end query parameter of the export route.
+
+    Parameters:
+    - value: Epoch nanoseconds, an ISO 8601 time (naive means local time), or empty.
+
+    Returns:
+    - int nanoseconds or datetime, or None if value is empty.
+
+    Raises:
+    - ValueError: If the value cannot be parsed.
+    """
+    if not value:
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return datetime.fromisoformat(value)
+
+
+def register_export_route(app, sensors):
+    """
+    Register the download route for sensor history exports.
+
+    Parameters:
+    - app: The Dash app instance.
+    - sensors: List of sensor objects.
+    """
+    sensors_by_id = {sensor.sensor_id: sensor for sensor in sensors}
+
+    @app.server.route(EXPORT_ROUTE)
+    def export_sensor_history(sensor_id):
+        """
+        Download a sensor's history as Parquet or Arrow IPC.
+
+        The file is streamed as it is written, one row group at a time.
+
+        Query parameters:
+        - format: 'parquet' (default) or 'arrow'.
+        - start: Start of the range, epoch nanoseconds or ISO 8601; empty for all history.
+        - end: End of the range, epoch nanoseconds or ISO 8601; empty for now.
+        - rows_per_group: Rows per row group.
+        """
+        sensor = sensors_by_id.get(sensor_id)
+        if sensor is None:
+            abort(404)
+        format = request.args.get('format', PARQUET)
+        if format not in EXPORT_FORMATS:
+            abort(400)
+        try:
+            start = parse_export_time(request.args.get('start'))
+            end = parse_export_time(request.args.get('end'))
+            rows_per_group = int(request.args.get('rows_per_group') or DEFAULT_ROWS_PER_GROUP)
+        except ValueError:
+            abort(400)
+        if rows_per_group < 1:
+            abort(400)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Exporting sensor history requires pyarrow")
+            abort(501)
+        filename = f'{sensor_id}.{format}'
+        return Response(
+            iter_export(sensor, format, start, end, rows_per_group),
+            mimetype='application/vnd.apache.parquet' if format == PARQUET else 'application/vnd.apache.arrow.file',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
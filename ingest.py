@@ -0,0 +1,78 @@
+# ingest.py
+import argparse
+import os
+import signal
+import threading
+from sensors import load_sensors
+from sensors.communication import PySerialCommunication  # or ZCMCommunication
+from sensors.manager import CommunicationManager
+from sensors.shared_memory import DEFAULT_PREFIX, STATS_NAME, SharedStats, communication_stats
+
+STATS_INTERVAL = 1.0  # Seconds between publications of the communication counters
+
+
+def create_communication():
+    """
+    Create the communication object from the environment.
+
+    SENSOR_PORTS_CONFIG names a JSON file of backends and routes for a
+    CommunicationManager; otherwise a single serial port is read from
+    SENSOR_SERIAL_PORT.
+
+    Returns:
+    - The communication object.
+    """
+    ports_config = os.environ.get('SENSOR_PORTS_CONFIG')
+    if ports_config:
+        # Several ports and backends, with sensors routed to the one they arrive on
+        return CommunicationManager.from_file(ports_config)
+    return PySerialCommunication(
+        port=os.environ.get('SENSOR_SERIAL_PORT', '/dev/cu.usbmodem1101'),  # Replace with your serial port
+        baudrate=115200,
+        timeout=10
+    )
+
+
+def main():
+    """
+    Run the ingestion process: own every port, store the samples in shared
+    memory (and the recording, if enabled) and publish the communication
+    counters, until SIGINT or SIGTERM.
+    """
+    parser = argparse.ArgumentParser(description="Read the sensors into shared memory for the dashboard workers.")
+    parser.add_argument('--prefix', default=os.environ.get('SENSOR_SHARED_MEMORY', DEFAULT_PREFIX),
+                        help="Shared memory name prefix, as SENSOR_SHARED_MEMORY for the workers")
+    parser.add_argument('--recording-dir', default=os.environ.get('SENSOR_RECORDING_DIR'),
+                        help="Directory to persist sensor history in, as SENSOR_RECORDING_DIR for the workers; "
+                             "history is kept in memory only without it")
+    parser.add_argument('--unlink-on-exit', action='store_true',
+                        help="Remove the shared memory blocks on exit instead of keeping them for the next run")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    communication = create_communication()
+    stats = SharedStats(f'{args.prefix}{STATS_NAME}', create=True)
+    sensors = load_sensors(communication, None, recording_dir=args.recording_dir,
+                           shared_memory=args.prefix)
+    print(f"Ingesting {', '.join(sensor.sensor_id for sensor in sensors)} into shared memory '{args.prefix}*'")
+    try:
+        while not stop.is_set():
+            stats.publish(communication_stats(communication))
+            stop.wait(STATS_INTERVAL)
+    finally:
+        blocks = [sensor.shared_memory for sensor in sensors] + [stats.block]
+        # Drain the dispatcher into the sensors before closing their blocks
+        communication.close()
+        stats.publish(communication_stats(communication))
+        for sensor in sensors:
+            sensor.close()
+        if args.unlink_on_exit:
+            for block in blocks:
+                block.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# monitoring.py
+import threading
+import time
+from flask import Response, request, g
+from sensors.metrics import Histogram, DURATION_BUCKETS, format_metric, format_histogram
+from sensors.timebase import now_ns
+
+METRICS_ROUTE = '/metrics'
+RATE_WINDOW_SECONDS = 10  # Window the per-sensor sample rate is averaged over
+
+
+class CallbackTimings:
+    """Execution time histograms of Dash callbacks, keyed by their output."""
+
+    def __init__(self):
+        self.durations = {}  # output -> Histogram
+        self.errors = {}  # output -> count of failed requests
+        self._lock = threading.Lock()  # Requests are served from several threads
+
+    def observe(self, output, seconds, failed=False):
+        with self._lock:
+            histogram = self.durations.get(output)
+            if histogram is None:
+                histogram = self.durations[output] = Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+            if failed:
+                self.errors[output] = self.errors.get(output, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.durations.items()), dict(self.errors)
+
+
+def collect_metrics(communication, sensors, callback_timings):
+    """
+    Render all metrics in the Prometheus text exposition format.
+
+    Parameters:
+    - communication: The shared communication object or CommunicationManager.
+    - sensors: List of sensor objects.
+    - callback_timings: CallbackTimings of the Dash callbacks.
+
+    Returns:
+    - The metrics page as a string.
+    """
+    lines = []
+    window_start = now_ns() - RATE_WINDOW_SECONDS * 10**9
+    per_sensor = [({'sensor': sensor.sensor_id}, sensor) for sensor in sensors]
+    lines += format_metric('sensor_samples_total', 'counter', 'Samples stored per sensor.',
+                           [(labels, sensor.sequence) for labels, sensor in per_sensor])
+    lines += format_metric('sensor_samples_per_second', 'gauge',
+                           f'Samples stored per second over the last {RATE_WINDOW_SECONDS} seconds.',
+                           [(labels, sensor.count_window(window_start) / RATE_WINDOW_SECONDS)
+                            for labels, sensor in per_sensor])
+    lines += format_metric('sensor_buffer_samples', 'gauge', 'Samples held in memory per sensor.',
+                           [(labels, len(sensor.buffer)) for labels, sensor in per_sensor])
+    lines += format_metric('sensor_buffer_capacity', 'gauge', 'Sample buffer capacity per sensor.',
+                           [(labels, sensor.buffer.capacity) for labels, sensor in per_sensor])
+    lines += format_metric('sensor_memory_bytes', 'gauge', 'Memory held by sample buffers and rollups per sensor.',
+                           [(labels, sensor.memory_bytes) for labels, sensor in per_sensor])
+    recording = [(labels, sensor.recording.stats()) for labels, sensor in per_sensor
+                 if sensor.recording and not sensor.recording.read_only]
+    if recording:
+        lines += format_metric('sensor_recording_pending_samples', 'gauge', 'Samples queued for the recording.',
+                               [(labels, stats['pending']) for labels, stats in recording])
+        lines += format_metric('sensor_recording_dropped_total', 'counter',
+                               'Samples dropped because the recording fell behind.',
+                               [(labels, stats['dropped']) for labels, stats in recording])
+
+    # A CommunicationManager exposes its backends; a single backend is labelled 'default'
+    backends = list((getattr(communication, 'backends', None) or {'default': communication}).items())
+    serial = []
+    for name, backend in backends:
+        ports = backend.port_stats() if hasattr(backend, 'port_stats') else None
+        if ports is not None:  # Backends reading several ports report each one
+            serial += [({'backend': name, 'port': port}, stats) for port, stats in ports.items()]
+        else:
+            serial.append(({'backend': name, 'port': getattr(backend, 'port', '')}, backend.connection_stats()))
+    serial = [(labels, connection) for labels, connection in serial if connection]
+    if serial:
+        lines += format_metric('serial_connected', 'gauge', 'Whether the serial port is connected.',
+                               [(labels, int(connection['connected'])) for labels, connection in serial])
+        lines += format_metric('serial_bytes_read_total', 'counter', 'Bytes read from the serial port.',
+                               [(labels, connection['bytes_read']) for labels, connection in serial])
+        lines += format_metric('serial_parse_errors_total', 'counter', 'Malformed messages discarded by the codec.',
+                               [(labels, connection['parse_errors']) for labels, connection in serial])
+        lines += format_metric('serial_reconnects_total', 'counter', 'Reconnections after a lost connection.',
+                               [(labels, connection['reconnects']) for labels, connection in serial])
+        lines += format_metric('serial_disconnected_seconds_total', 'counter', 'Time spent without a connection.',
+                               [(labels, connection['disconnected_seconds']) for labels, connection in serial])
+
+    dispatch = [({'backend': name}, backend.dispatch_stats()) for name, backend in backends]
+    lines += format_metric('dispatch_queue_depth', 'gauge', 'Messages waiting for delivery.',
+                           [(labels, stats['queue_depth']) for labels, stats in dispatch])
+    for name in ('enqueued', 'delivered', 'dropped', 'callback_errors', 'parse_errors'):
+        lines += format_metric(f'dispatch_{name}_total', 'counter', f'Dispatcher {name.replace("_", " ")} count.',
+                               [(labels, stats[name]) for labels, stats in dispatch])
+    lines += format_histogram('dispatch_latency_seconds', 'Time from receiving a sample to delivering it.',
+                              [({'backend': name}, backend.dispatcher.latency) for name, backend in backends])
+
+    durations, errors = callback_timings.snapshot()
+    lines += format_histogram('dash_callback_duration_seconds', 'Execution time of Dash callback requests.',
+                              [({'output': output}, histogram) for output, histogram in durations])
+    lines += format_metric('dash_callback_errors_total', 'counter', 'Dash callback requests that failed.',
+                           [({'output': output}, count) for output, count in errors.items()])
+    return '\n'.join(lines) + '\n'
+
+
+def register_metrics(app, communication, sensors):
+    """
+    Time every Dash callback request and serve all metrics at /metrics.
+
+    Parameters:
+    - app: The Dash app instance.
+    - communication: The shared communication object.
+    - sensors: List of sensor objects.
+
+    Returns:
+    - The CallbackTimings collecting the callback durations.
+    """
+    server = app.server
+    callback_timings = CallbackTimings()
+
+    @server.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @server.after_request
+    def record_callback_time(response):
+        start = g.get('request_start')
+        if start is not None and request.path.endswith('/_dash-update-component'):
+            body = request.get_json(silent=True) or {}
+            callback_timings.observe(body.get('output', 'unknown'), time.perf_counter() - start,
+                                     failed=response.status_code >= 400)
+        return response
+
+    @server.route(METRICS_ROUTE)
+    def metrics():
+        return Response(collect_metrics(communication, sensors, callback_timings),
+                        mimetype='text/plain; version=0.0.4')
+
+    return callback_timings
@@ -0,0 +1,302 @@
+# profiling.py
+import functools
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+import numpy as np
+from flask import Response, request, abort, jsonify
+from sensors.metrics import Histogram, DURATION_BUCKETS
+
+PROFILE_ROUTE = '/profile'
+MAX_CAPTURE_SECONDS = 300
+
+
+def reader_threads(communication, sensors=None):
+    """
+    Names of the threads that read and record samples.
+
+    Parameters:
+    - communication: Shared communication object; a CommunicationManager's
+      backends are each included.
+    - sensors: Optional list of sensors, whose recording writer threads are included.
+
+    Returns:
+    - Tuple of thread names, in order of first appearance.
+    """
+    owners = list((getattr(communication, 'backends', None) or {'default': communication}).values())
+    owners += [sensor.recording for sensor in sensors or () if sensor.recording is not None]
+    names = {}
+    for owner in owners:
+        thread = getattr(owner, 'thread', None)
+        if thread is not None:
+            names[thread.name] = True
+    return tuple(names)
+
+
+class Profiler:
+    """
+    Time-boxed profiling of a running app.
+
+    While a capture runs, every registered Dash callback is wrapped with a
+    timer and the selected threads' stacks are sampled at a fixed interval.
+    At the end the callbacks are restored, so profiling costs nothing while
+    it is off, and two files are written: the callback timing report as
+    JSON and the stack samples in collapsed-stack format, which flamegraph
+    tools (flamegraph.pl, speedscope) read directly.
+    """
+
+    def __init__(self, app, output_dir):
+        """
+        Initialize the profiler.
+
+        Parameters:
+        - app: The Dash app instance.
+        - output_dir: Directory the capture files are written to.
+        """
+        self.app = app
+        self.output_dir = output_dir
+        self.capture = None  # Settings and end time of the capture in progress
+        self.last_report = None
+        self.last_stacks_path = None
+        self._durations = {}  # callback output -> list of seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+        return self.capture is not None
+
+    def start(self, seconds, interval=0.005, thread_names=None):
+        """
+        Start a capture in the background.
+
+        Parameters:
+        - seconds: Length of the capture window.
+        - interval: Seconds between stack samples.
+        - thread_names: Names of the threads to sample, or None for all threads.
+
+        Returns:
+        - True if the capture started, False if one is already running.
+        """
+        with self._lock:
+            if self.capture is not None:
+                return False
+            self.capture = {
+                'started': datetime.now().isoformat(timespec='seconds'),
+                'seconds': seconds,
+                'interval': interval,
+                'threads': list(thread_names) if thread_names else 'all',
+            }
+            self._durations = {}
+        self._stop.clear()
+        thread = threading.Thread(target=self._run, args=(seconds, interval, thread_names), name='ProfilerThread')
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def stop(self):
+        """End the capture in progress early."""
+        self._stop.set()
+
+    def _run(self, seconds, interval, thread_names):
+        originals = self._wrap_callbacks()
+        try:
+            stacks, samples = self._sample(seconds, interval, thread_names)
+        finally:
+            self._restore_callbacks(originals)
+        try:
+            self._write_results(stacks, samples)
+        except OSError as e:
+            print(f"Error writing profile to {self.output_dir}: {e}")
+        finally:
+            with self._lock:
+                self.capture = None
+
+    def _wrap_callbacks(self):
+        # Dash looks callbacks up in callback_map on every request, so
+        # replacing the entries takes effect immediately
+        originals = {}
+        for output, entry in list(self.app.callback_map.items()):
+            callback = entry.get('callback')
+            if callback is None:
+                continue
+            originals[output] = callback
+            entry['callback'] = self._timed(output, callback)
+        return originals
+
+    def _restore_callbacks(self, originals):
+        for output, callback in originals.items():
+            entry = self.app.callback_map.get(output)
+            if entry is not None:
+                entry['callback'] = callback
+
+    def _timed(self, output, callback):
+        @functools.wraps(callback)
+        def timed_callback(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                with self._lock:
+                    self._durations.setdefault(output, []).append(duration)
+        return timed_callback
+
+    def _sample(self, seconds, interval, thread_names):
+        stacks = Counter()
+        samples = 0
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f'thread-{ident}')
+                if ident == own_ident or (thread_names and name not in thread_names):
+                    continue
+                stacks[self.collapse(name, frame)] += 1
+            samples += 1
+            self._stop.wait(interval)
+        return stacks, samples
+
+    @staticmethod
+    def collapse(thread_name, frame):
+        """
+        Format a stack as one collapsed-stack line prefix, root first.
+
+        Parameters:
+        - thread_name: Name of the sampled thread, used as the root frame.
+        - frame: Innermost frame of the thread.
+
+        Returns:
+        - 'thread;outer (file:line);...;inner (file:line)'.
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        names.append(thread_name)
+        return ';'.join(reversed(names))
+
+    def _write_results(self, stacks, samples):
+        with self._lock:
+            durations = dict(self._durations)
+            capture = dict(self.capture)
+        callbacks = {}
+        for output, values in sorted(durations.items()):
+            values = np.array(values)
+            histogram = Histogram(DURATION_BUCKETS)
+            histogram.observe_many(values)
+            callbacks[output] = {
+                'function': getattr(self.app.callback_map.get(output, {}).get('callback'), '__name__', None),
+                'calls': len(values),
+                'total_seconds': float(values.sum()),
+                'mean_ms': float(values.mean() * 1000),
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p95_ms': float(np.percentile(values, 95) * 1000),
+                'max_ms': float(values.max() * 1000),
+                'histogram': {
+                    'le_seconds': [float(bound) for bound in histogram.bounds] + ['+Inf'],
+                    'counts': histogram.counts.tolist(),
+                },
+            }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        stacks_path = os.path.join(self.output_dir, f'{name}.collapsed')
+        with open(stacks_path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        report = dict(capture, samples=samples, stacks_file=stacks_path, callbacks=callbacks)
+        with open(os.path.join(self.output_dir, f'{name}.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+        self.last_report = report
+        self.last_stacks_path = stacks_path
+        print(f"Profile written to {stacks_path}")
+
+
+def register_profiling(app, output_dir, token=None, communication=None, sensors=None):
+    """
+    Register the protected routes that control the profiler.
+
+    - POST /profile/start?seconds=30&interval=0.005&threads=SerialReadThread,DispatchThread
+      starts a capture. Without threads it samples the reader threads of
+      the communication backends and the recording writers (or every
+      thread if there are none); threads=all samples every thread.
+    - POST /profile/stop ends it early.
+    - GET /profile returns the capture in progress and the last report.
+    - GET /profile/stacks downloads the last collapsed-stack file.
+
+    Requests must carry the token as 'Authorization: Bearer <token>' or a
+    'token' query parameter. Without a token the routes are disabled.
+
+    Parameters:
+    - app: The Dash app instance.
+    - output_dir: Directory the capture files are written to.
+    - token: Secret required by the routes, None to disable them.
+    - communication: Shared communication object whose reader threads are sampled by default.
+    - sensors: Optional list of sensors whose recording threads are sampled by default.
+
+    Returns:
+    - The Profiler instance.
+    """
+    profiler = Profiler(app, output_dir)
+    server = app.server
+
+    def authorize():
+        if not token:
+            abort(404)
+        header = request.headers.get('Authorization', '')
+        supplied = header[len('Bearer '):] if header.startswith('Bearer ') else request.args.get('token', '')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            abort(403)
+
+    @server.route(f'{PROFILE_ROUTE}/start', methods=['POST'])
+    def start_profile():
+        authorize()
+        try:
+            seconds = float(request.args.get('seconds', 30))
+            interval = float(request.args.get('interval', 0.005))
+        except ValueError:
+            abort(400)
+        if not 0 < seconds <= MAX_CAPTURE_SECONDS or interval <= 0:
+            abort(400)
+        threads = request.args.get('threads')
+        if threads == 'all':
+            thread_names = None
+        else:
+            thread_names = tuple(name for name in threads.split(',') if name) if threads else None
+            if not thread_names and communication is not None:
+                # Looked up per capture, since backends reconnect and recordings start late
+                thread_names = reader_threads(communication, sensors) or None
+        if not profiler.start(seconds, interval, thread_names):
+            return jsonify(status='busy', capture=profiler.capture), 409
+        return jsonify(status='started', capture=profiler.capture), 202
+
+    @server.route(f'{PROFILE_ROUTE}/stop', methods=['POST'])
+    def stop_profile():
+        authorize()
+        profiler.stop()
+        return jsonify(status='stopping' if profiler.active else 'idle')
+
+    @server.route(PROFILE_ROUTE)
+    def profile_status():
+        authorize()
+        return jsonify(capture=profiler.capture, last_report=profiler.last_report)
+
+    @server.route(f'{PROFILE_ROUTE}/stacks')
+    def profile_stacks():
+        authorize()
+        if not profiler.last_stacks_path or not os.path.exists(profiler.last_stacks_path):
+            abort(404)
+        with open(profiler.last_stacks_path) as f:
+            data = f.read()
+        return Response(data, mimetype='text/plain', headers={
+            'Content-Disposition': f'attachment; filename="{os.path.basename(profiler.last_stacks_path)}"'})
+
+    return profiler
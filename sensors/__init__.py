@@ -4,7 +4,23 @@ import importlib
 from .base_sensor import BaseSensor
 from dash import dcc
 
-def load_sensors(communication, app):
+def load_sensors(communication, app, recording_dir=None, shared_memory=None, attach=False):
+    """
+    Discover and instantiate all sensor classes.
+
+    Parameters:
+    - communication: Shared communication object.
+    - app: The Dash app instance.
+    - recording_dir: Directory to persist sensor history in, one subdirectory
+      per sensor id; None keeps history in memory only.
+    - shared_memory: Name prefix of shared memory blocks to keep the samples
+      in, so other processes can read them; None keeps them private.
+    - attach: Attach read-only to the shared memory and recording an
+      ingestion process writes, instead of writing them.
+
+    Returns:
+    - List of sensor objects.
+    """
     sensors = []
     sensor_folder = os.path.dirname(__file__)
     for filename in os.listdir(sensor_folder):
@@ -13,7 +29,16 @@ def load_sensors(communication, app):
             module = importlib.import_module(module_name)
             sensor_class = getattr(module, 'Sensor', None)
             if sensor_class and issubclass(sensor_class, BaseSensor):
-                sensors.append(sensor_class(communication))
+                sensor = sensor_class(communication)
+                if shared_memory:
+                    sensor.share_memory(shared_memory, attach=attach)
+                if recording_dir:
+                    directory = os.path.join(recording_dir, sensor.sensor_id)
+                    if attach:
+                        sensor.follow_recording(directory)
+                    else:
+                        sensor.start_recording(directory)
+                sensors.append(sensor)
     return sensors
 
 # def sensor_store():
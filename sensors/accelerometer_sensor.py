@@ -1,6 +1,11 @@
 from .base_sensor import BaseSensor
 
 class Sensor(BaseSensor):
+    capacity = 360_000  # About one hour of history at 100 Hz
+    # Picks up where the raw hour ends: 1 day of 10 s, 1 week of 1 min and
+    # 2 months of 10 min buckets, about 5 MB for the three axes
+    rollup_tiers = ((10, 8_640), (60, 10_080), (600, 8_784))
+
     def __init__(self, communication):
         super().__init__(
             name='Accelerometer Sensor',
@@ -0,0 +1,254 @@
+import asyncio
+import copy
+import errno
+import os
+import random
+import threading
+import time
+import serial
+from .communication import CommunicationInterface, AsciiCodec
+from .dispatcher import DROP_OLDEST
+from .timebase import now_ns
+
+READ_SIZE = 65536  # Most bytes taken from a port per readiness event
+
+
+class AsyncSerialCommunication(CommunicationInterface):
+    """
+    Reads many serial ports on a single asyncio event loop thread.
+
+    Each port is opened non-blocking and watched with the loop's selector
+    instead of a thread of its own, so one thread serves dozens of devices.
+    A port's bytes are decoded as soon as they arrive; the decoded samples
+    of all ports, each stamped with its read time, are handed to the
+    dispatcher together every batch_interval. Every port reconnects on its
+    own with exponential backoff.
+
+    Ports are opened with pyserial for the line settings, so any device it
+    can open works, including ptys. Requires a POSIX system (the Windows
+    event loop cannot watch serial handles).
+    """
+
+    def __init__(self, ports, baudrate=9600, codec=None, reconnect_interval=5, max_reconnect_interval=60,
+                 reset_delay=2, batch_interval=0.005, batch_size=5000, queue_size=10000, overflow=DROP_OLDEST):
+        """
+        Open the ports and start the event loop thread.
+
+        Parameters:
+        - ports: List of serial port names, or dictionary of {port: codec} to
+          give ports their own wire format.
+        - baudrate: Communication speed of every port.
+        - codec: Codec for ports without their own, AsciiCodec by default. Each
+          port decodes with a copy, so parse errors are counted per port.
+        - reconnect_interval: Seconds before the first retry after a failed connection attempt.
+        - max_reconnect_interval: Upper limit of the retry delay, which doubles after every failed attempt.
+        - reset_delay: Seconds to wait after opening a port before reading (Arduino reset).
+        - batch_interval: Seconds decoded samples are collected before they are dispatched.
+        - batch_size: Number of collected samples that triggers an immediate dispatch.
+        - queue_size: Maximum number of messages waiting for delivery.
+        - overflow: Policy when the queue is full. BLOCK pauses the event loop,
+          and so every port, until the dispatcher catches up.
+        """
+        super().__init__(queue_size=queue_size, overflow=overflow)
+        if not isinstance(ports, dict):
+            ports = {port: None for port in ports}
+        default_codec = codec or AsciiCodec()
+        self.ports = {}
+        for port, port_codec in ports.items():
+            if port_codec is None:
+                port_codec = copy.copy(default_codec)
+                port_codec.parse_errors = 0
+            self.ports[port] = _Port(port, port_codec)
+        self.baudrate = baudrate
+        self.reconnect_interval = reconnect_interval
+        self.max_reconnect_interval = max(max_reconnect_interval, reconnect_interval)
+        self.reset_delay = reset_delay
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self._items = []  # Decoded (sensor_id, values, timestamp) triples waiting for the next flush
+        self._flush_handle = None
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, name="AsyncSerialThread")
+        self.thread.daemon = True
+        self.thread.start()
+        self._started.wait()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._tasks = [self.loop.create_task(self.run_port(port)) for port in self.ports.values()]
+        self.loop.call_soon(self._started.set)
+        try:
+            self.loop.run_until_complete(asyncio.gather(*self._tasks, return_exceptions=True))
+        finally:
+            self.flush()
+            for port in self.ports.values():
+                self.close_port(port)
+            self.loop.close()
+
+    async def run_port(self, port):
+        """
+        Keep one port connected and read it until the communication is closed.
+
+        Parameters:
+        - port: The _Port to serve.
+        """
+        delay = self.reconnect_interval
+        while self.running:
+            try:
+                print(f"Attempting to connect to serial port {port.name}")
+                port.conn = serial.Serial(port=port.name, baudrate=self.baudrate, timeout=0)
+            except (serial.SerialException, OSError, ValueError) as e:
+                print(f"Error connecting to serial port {port.name}: {e}")
+                wait = delay * random.uniform(0.9, 1.0)
+                print(f"Retrying {port.name} in {wait:.1f} seconds...")
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.max_reconnect_interval)
+                continue
+            delay = self.reconnect_interval
+            await asyncio.sleep(self.reset_delay)  # Wait for Arduino to reset if necessary
+            port.connected()
+            print(f"Connected to serial port {port.name}")
+            port.lost = self.loop.create_future()
+            self.loop.add_reader(port.conn.fileno(), self.read_port, port)
+            try:
+                await port.lost
+            finally:
+                self.close_port(port)
+            if self.running:
+                print(f"Lost serial port {port.name}, attempting to reconnect...")
+
+    def read_port(self, port):
+        """
+        Read and decode whatever a ready port has buffered. Runs on the event loop.
+
+        Parameters:
+        - port: The _Port that became readable.
+        """
+        try:
+            chunk = os.read(port.conn.fileno(), READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # EIO is how a pty or USB adapter reports that the device went away
+            if e.errno != errno.EIO:
+                print(f"Error reading serial port {port.name}: {e}")
+            chunk = b''
+        if not chunk:
+            if not port.lost.done():
+                port.lost.set_result(None)
+            return
+        port.bytes_read += len(chunk)
+        messages, port.pending = port.codec.decode(port.pending + chunk)
+        if not messages:
+            return
+        timestamp = now_ns()
+        has_callback = self.has_callback
+        self._items.extend((sensor_id, values, timestamp) for sensor_id, values in messages if has_callback(sensor_id))
+        if len(self._items) >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None and self._items:
+            self._flush_handle = self.loop.call_later(self.batch_interval, self.flush)
+
+    def flush(self):
+        """Hand the collected samples to the dispatcher."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        items, self._items = self._items, []
+        self.dispatch_timed(items)
+
+    def close_port(self, port):
+        if port.conn is None:
+            return
+        try:
+            self.loop.remove_reader(port.conn.fileno())
+        except (ValueError, OSError):
+            pass
+        try:
+            port.conn.close()
+        except Exception as e:
+            print(f"Error closing serial port {port.name}: {e}")
+        port.conn = None
+        port.disconnected()
+
+    def port_stats(self):
+        """
+        Get the health counters of every port.
+
+        Returns:
+        - Dictionary of {port: stats}, stats as in PySerialCommunication.connection_stats.
+        """
+        return {name: port.stats() for name, port in self.ports.items()}
+
+    def connection_stats(self):
+        """
+        Get the health counters summed over all ports.
+
+        Returns:
+        - Dictionary with connected (True if every port is connected),
+          bytes_read, parse_errors, reconnects and disconnected_seconds.
+        """
+        ports = list(self.port_stats().values())
+        totals = {'connected': all(stats['connected'] for stats in ports)}
+        for name in ('bytes_read', 'parse_errors', 'reconnects', 'disconnected_seconds'):
+            totals[name] = sum(stats[name] for stats in ports)
+        return totals
+
+    def close(self):
+        if self.running:
+            self.running = False
+            try:
+                self.loop.call_soon_threadsafe(self._cancel_tasks)
+            except RuntimeError:
+                pass  # Loop already closed
+            if self.thread is not threading.current_thread():
+                self.thread.join(timeout=5)
+            print("Serial connections closed.")
+        super().close()
+
+    def _cancel_tasks(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+class _Port:
+    """Connection state and health counters of one port, only written by the event loop."""
+
+    def __init__(self, name, codec):
+        self.name = name
+        self.codec = codec
+        self.conn = None
+        self.lost = None  # Future resolved when the connection drops
+        self.pending = b''  # Incomplete trailing message carried over between reads
+        self.bytes_read = 0
+        self.reconnects = 0
+        self.disconnected_seconds = 0.0  # Total of the outages that have ended
+        self._disconnected_since = time.monotonic()  # None while connected
+        self._has_connected = False
+
+    def connected(self):
+        self.pending = b''
+        self.disconnected_seconds += time.monotonic() - self._disconnected_since
+        self._disconnected_since = None
+        if self._has_connected:
+            self.reconnects += 1
+        self._has_connected = True
+
+    def disconnected(self):
+        if self._disconnected_since is None:
+            self._disconnected_since = time.monotonic()
+
+    def stats(self):
+        since = self._disconnected_since
+        disconnected = self.disconnected_seconds
+        if since is not None:
+            disconnected += time.monotonic() - since
+        return {
+            'connected': since is None,
+            'bytes_read': self.bytes_read,
+            'parse_errors': self.codec.parse_errors,
+            'reconnects': self.reconnects,
+            'disconnected_seconds': disconnected,
+        }
@@ -1,28 +1,417 @@
-from datetime import datetime
+import threading
+import time
+import numpy as np
 import pandas as pd
+from .ring_buffer import RingBuffer, DEFAULT_CAPACITY
+from .rollup import RollupPyramid
+from .timebase import now_ns, to_ns, to_datetime64
+from .filters import FilterStage
+from .recording import Recording
+from .export import PARQUET, DEFAULT_ROWS_PER_GROUP, write_export
+from .shared_memory import POLL_INTERVAL, sensor_storage
+
+ROLLUP_STATE = 'rollups'  # Name of the rollups saved with the recording
+ROLLUP_SAVE_INTERVAL = 60  # Seconds between saves of the rollups while recording
 
 class BaseSensor:
-    def __init__(self, name, communication, sensor_id, data_fields):
+    capacity = DEFAULT_CAPACITY  # Samples kept in memory; override per sensor
+    rollup_tiers = None  # (bucket seconds, buckets kept) pre-aggregated tiers; opt in per sensor
+    filters = {}  # {name: Filter} or {name: (Filter, [fields])}; stored as '<field>_<name>' channels
+
+    def __init__(self, name, communication, sensor_id, data_fields, capacity=None):
         self.name = name
         self.communication = communication
         self.sensor_id = sensor_id
         self.data_fields = data_fields  # List of field names
-        self.data = []
-        self.communication.register_callback(self.sensor_id, self.data_callback)
+        if capacity is not None:
+            self.capacity = capacity
+        self.filter_stage = FilterStage(self.data_fields, self.filters) if self.filters else None
+        # Raw fields followed by the filtered channels
+        self.channels = self.filter_stage.channels if self.filter_stage else list(self.data_fields)
+        self.buffer = RingBuffer(self.channels, self.capacity)
+        self.rollups = RollupPyramid(self.channels, self.rollup_tiers) if self.rollup_tiers else None
+        self._new_data = threading.Condition()  # Notified after every stored batch
+        self._ingest_lock = threading.Lock()
+        self.recording = None  # On-disk history, see start_recording
+        self._rollups_saved = 0  # time.monotonic() of the last save of the rollups to the recording
+        self.shared_memory = None  # SharedBlock holding the buffer and rollups, see share_memory
+        self.communication.register_batch_callback(self.sensor_id, self.data_batch_callback, len(self.data_fields))
 
     def data_callback(self, values):
         try:
-            data_dict = {'Time': datetime.now()}
-            for field_name, value_str in zip(self.data_fields, values):
-                data_dict[field_name] = float(value_str)
-            self.data.append(data_dict)
+            row = np.array([values[:len(self.data_fields)]], dtype=np.float64)
+            self.data_batch_callback(np.array([now_ns()], dtype=np.int64), row)
         except ValueError as e:
             print(f"Invalid data for {self.sensor_id}: {values} - {e}")
 
+    def data_batch_callback(self, timestamps, values):
+        """
+        Store a batch of samples delivered by the communication dispatcher.
+
+        Parameters:
+        - timestamps: int64 array of receive times in epoch nanoseconds, shape (n,).
+        - values: float64 array of shape (n, len(data_fields)).
+        """
+        with self._ingest_lock:
+            if self.filter_stage:
+                values = self.filter_stage.process(values)
+            self.buffer.extend(timestamps, values)
+            if self.rollups:
+                self.rollups.extend(timestamps, values)
+            if self.recording:
+                self.recording.append(timestamps, values)
+                if self.rollups and time.monotonic() - self._rollups_saved >= ROLLUP_SAVE_INTERVAL:
+                    self._save_rollups()
+        with self._new_data:
+            self._new_data.notify_all()
+
+    def start_recording(self, directory, **options):
+        """
+        Persist every stored sample to memory-mapped segment files on disk.
+
+        History already on disk is loaded back: the most recent samples into
+        memory, and the rollups from the copy saved with the recording every
+        ROLLUP_SAVE_INTERVAL seconds, followed by the samples recorded after
+        it. Without a usable copy, the rollups are rebuilt from the samples
+        within their retention span. Time windows reaching back past the
+        samples in memory are then read from disk.
+
+        Parameters:
+        - directory: Directory for this sensor's segment files.
+        - options: Keyword arguments for Recording (segment_records,
+          max_segments, flush_interval, max_pending, overflow).
+
+        Raises:
+        - RuntimeError: If another process already records to the directory.
+        """
+        with self._ingest_lock:
+            self.recording = Recording(directory, self.channels, **options)
+            self._rollups_saved = time.monotonic()
+            if len(self.buffer):
+                return  # Samples already arrived; keep them rather than mixing in older ones
+            timestamps, values = self.recording.latest(self.capacity)
+            if self.rollups and len(timestamps):
+                start = int(timestamps[-1]) - self.rollups.span_ns  # Older samples are in no tier
+                state = self.recording.load_state(ROLLUP_STATE)
+                if state is not None and self.rollups.restore(state):
+                    start = max(start, self.rollups.last_timestamp + 1)
+                for chunk_timestamps, chunk_values in self.recording.iter_window(start):
+                    self.rollups.extend(chunk_timestamps, chunk_values)
+            self.buffer.extend(timestamps, values)
+
+    def _save_rollups(self):
+        # Called with the ingest lock held, so the copy matches the samples queued for the recording
+        state = self.rollups.state()
+        if state is not None:
+            self.recording.save_state(ROLLUP_STATE, state)
+        self._rollups_saved = time.monotonic()
+
+    def follow_recording(self, directory):
+        """
+        Read the on-disk history another process records, without writing to it.
+
+        As with start_recording, time windows reaching back past the samples
+        in memory are read from disk.
+
+        Parameters:
+        - directory: Directory of this sensor's segment files.
+        """
+        self.recording = Recording(directory, self.channels, read_only=True)
+
+    def share_memory(self, prefix, attach=False, timeout=30):
+        """
+        Move the sample buffer and rollups into a named shared memory block,
+        so other processes can query them without copying.
+
+        The ingestion process creates the block and stores every sample in
+        it; a block left by its previous run is reused if the layout matches,
+        keeping those samples. Dash workers attach read-only and see the
+        samples as soon as they are stored. Call this before start_recording
+        or follow_recording.
+
+        Parameters:
+        - prefix: Block name prefix; the block is named '<prefix><sensor_id>'.
+        - attach: Attach read-only to a block another process writes, instead of creating it.
+        - timeout: Seconds to wait for the block to appear when attaching.
+        """
+        with self._ingest_lock:
+            block, buffer, rollups = sensor_storage(f'{prefix}{self.sensor_id}', self.channels, self.capacity,
+                                                    self.rollup_tiers, create=not attach, timeout=timeout)
+            if not attach and not len(buffer) and len(self.buffer):
+                # Keep the samples that arrived before the move
+                timestamps, values = self.buffer.snapshot()
+                buffer.extend(timestamps, values.T)
+                if rollups:
+                    rollups.extend(timestamps, values.T)
+            self.buffer = buffer
+            self.rollups = rollups
+            self.shared_memory = block
+
+    def wait_for_data(self, cursor, timeout=None):
+        """
+        Block until samples newer than a cursor are stored.
+
+        Parameters:
+        - cursor: Cursor as returned by get_data_since, or the sequence property.
+        - timeout: Maximum time to wait in seconds, None to wait indefinitely.
+
+        Returns:
+        - True if new samples are available, False on timeout.
+        """
+        if self.shared_memory is not None and self.shared_memory.read_only:
+            # Another process stores the samples and cannot notify this one
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self.buffer.sequence <= cursor:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                time.sleep(POLL_INTERVAL)
+            return True
+        with self._new_data:
+            return self._new_data.wait_for(lambda: self.buffer.sequence > cursor, timeout)
+
     def get_data(self):
-        df = pd.DataFrame(self.data)
-        # self.data.clear()
-        return df
+        timestamps, values = self.buffer.snapshot()
+        return self.to_dataframe(timestamps, values)
+
+    def get_window(self, start=None, end=None):
+        """
+        Get the samples within a time range.
+
+        Samples older than those in memory are read from the recording, if any.
+
+        Parameters:
+        - start: Start of the range (datetime, or epoch nanoseconds), None for no lower bound.
+        - end: End of the range (datetime, or epoch nanoseconds), None for no upper bound.
+
+        Returns:
+        - DataFrame with the samples where start <= Time <= end.
+        """
+        timestamps, values = self._raw_window(to_ns(start), to_ns(end))
+        return self.to_dataframe(timestamps, values)
+
+    def count_window(self, start=None, end=None):
+        """
+        Count the samples within a time range without copying them.
+
+        Parameters:
+        - start: Start of the range (datetime, or epoch nanoseconds), None for no lower bound.
+        - end: End of the range (datetime, or epoch nanoseconds), None for no upper bound.
+
+        Returns:
+        - Number of samples where start <= Time <= end.
+        """
+        start_ns, end_ns = to_ns(start), to_ns(end)
+        disk_end = self._disk_end(start_ns, end_ns)
+        count = self.recording.count_window(start_ns, disk_end) if disk_end is not False else 0
+        timestamps, _ = self.buffer.window(start_ns, end_ns)
+        return count + len(timestamps)
+
+    def _disk_end(self, start, end):
+        # End of the part of a range that is older than the samples in memory,
+        # or False if memory covers all of it
+        if not self.recording:
+            return False
+        oldest = self.buffer.oldest()
+        if oldest is None:
+            return end
+        if start is not None and start >= oldest:
+            return False
+        return oldest - 1 if end is None else min(end, oldest - 1)
+
+    def _raw_window(self, start, end):
+        # Samples in a range from memory, preceded by any older ones from disk
+        timestamps, values = self.buffer.window(start, end)
+        disk_end = self._disk_end(start, end)
+        if disk_end is False:
+            return timestamps, values
+        disk_timestamps, disk_values = self.recording.window(start, disk_end)
+        if not len(disk_timestamps):
+            return timestamps, values
+        return np.concatenate((disk_timestamps, timestamps)), np.hstack((disk_values, values))
+
+    def iter_window(self, start=None, end=None):
+        """
+        Iterate over the samples within a time range in chunks, without
+        materializing the whole range.
+
+        Parameters:
+        - start: Start of the range (datetime, or epoch nanoseconds), None for no lower bound.
+        - end: End of the range (datetime, or epoch nanoseconds), None for no upper bound.
+
+        Yields:
+        - (timestamps, values): Arrays of shape (m,) and (n_channels, m); one
+          chunk per recording segment, then one for the samples in memory.
+        """
+        start_ns, end_ns = to_ns(start), to_ns(end)
+        # Read the in-memory part first: later appends overwrite its oldest rows
+        timestamps, values = self.buffer.window(start_ns, end_ns)
+        disk_end = self._disk_end(start_ns, end_ns)
+        if disk_end is not False:
+            if len(timestamps):
+                disk_end = min(disk_end, int(timestamps[0]) - 1) if disk_end is not None else int(timestamps[0]) - 1
+            for disk_timestamps, disk_values in self.recording.iter_window(start_ns, disk_end):
+                yield disk_timestamps, disk_values.T
+        if len(timestamps):
+            yield timestamps, values
+
+    def export(self, destination, format=PARQUET, start=None, end=None, rows_per_group=DEFAULT_ROWS_PER_GROUP):
+        """
+        Export the history, or a time range of it, to a Parquet or Arrow IPC file.
+
+        The data is written one row group at a time, so the export needs
+        about one row group of memory regardless of the range. Requires pyarrow.
+
+        Parameters:
+        - destination: File path or writable binary file object.
+        - format: 'parquet' or 'arrow'.
+        - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+        - end: End of the range (datetime, or epoch nanoseconds), None for now.
+        - rows_per_group: Rows per row group (Parquet) or record batch (Arrow).
+
+        Returns:
+        - Number of rows written.
+        """
+        return write_export(self, destination, format, start, end, rows_per_group)
+
+    def oldest_raw_timestamp(self):
+        """Time of the oldest raw sample, in memory or on disk, in epoch nanoseconds or None."""
+        oldest = self.buffer.oldest()
+        if self.recording:
+            disk_oldest = self.recording.oldest()
+            if disk_oldest is not None and (oldest is None or disk_oldest < oldest):
+                oldest = disk_oldest
+        return oldest
+
+    def get_plot_window(self, start=None, end=None, min_points=None):
+        """
+        Get a time range at the coarsest resolution that still has enough points.
+
+        If a rollup tier has at least min_points buckets across the range (and
+        holds data back to its start), its buckets are returned instead of the
+        raw samples, so long ranges cost about as much as short ones. Ranges
+        reaching back past the raw samples also use the finest tier that covers
+        them.
+
+        Parameters:
+        - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+        - end: End of the range (datetime, or epoch nanoseconds), None for now.
+        - min_points: Minimum number of points wanted, e.g. the plot's point budget.
+
+        Returns:
+        - (df, resolution): For raw samples, the same DataFrame as get_window and
+          None. For rollups, a DataFrame with 'Time' (bucket start), '<field>'
+          (bucket mean), '<field>_min', '<field>_max' and 'count' columns, and
+          the bucket width in seconds.
+        """
+        tier = self.get_plot_tier(start, end, min_points)
+        if tier is not None:
+            return self.get_tier_window(tier, start, end), tier.width_seconds
+        return self.get_window(start, end), None
+
+    def get_plot_tier(self, start=None, end=None, min_points=None):
+        """
+        Pick the rollup tier get_plot_window would use for a time range.
+
+        Parameters:
+        - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+        - end: End of the range (datetime, or epoch nanoseconds), None for now.
+        - min_points: Minimum number of points wanted.
+
+        Returns:
+        - RollupTier, or None to use the raw samples.
+        """
+        if not (self.rollups and min_points):
+            return None
+        end_ns = now_ns() if end is None else to_ns(end)
+        start_ns = self._oldest_timestamp() if start is None else to_ns(start)
+        if start_ns is None:
+            return None
+        tier = self.rollups.select(start_ns, end_ns, min_points)
+        raw_oldest = self.oldest_raw_timestamp()
+        if tier is None and (raw_oldest is None or raw_oldest > start_ns):
+            tier = self.rollups.finest_covering(start_ns)
+        return tier
+
+    def get_tier_window(self, tier, start=None, end=None):
+        """
+        Get a rollup tier's buckets across a time range, as in get_plot_window.
+
+        Parameters:
+        - tier: RollupTier from get_plot_tier.
+        - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+        - end: End of the range (datetime, or epoch nanoseconds), None for now.
+
+        Returns:
+        - DataFrame with 'Time', '<field>' (bucket mean), '<field>_min',
+          '<field>_max' and 'count' columns.
+        """
+        end_ns = now_ns() if end is None else to_ns(end)
+        start_ns = self._oldest_timestamp() if start is None else to_ns(start)
+        if start_ns is None:
+            start_ns = end_ns
+        timestamps, values = tier.window(start_ns - tier.width_ns, end_ns)
+        fields = [field[:-len('_mean')] if field.endswith('_mean') else field for field in tier.buffer.fields]
+        return self.to_dataframe(timestamps, values, fields)
+
+    def _oldest_timestamp(self):
+        # Earliest time covered by either the raw samples or the rollups
+        candidates = []
+        raw_oldest = self.oldest_raw_timestamp()
+        if raw_oldest is not None:
+            candidates.append(raw_oldest)
+        if self.rollups:
+            oldest = self.rollups.oldest()
+            if oldest is not None:
+                candidates.append(oldest)
+        return min(candidates) if candidates else None
+
+    @property
+    def memory_bytes(self):
+        """Memory held by the sample buffer and rollups in bytes."""
+        return self.buffer.nbytes + (self.rollups.nbytes if self.rollups else 0)
+
+    @property
+    def sequence(self):
+        """Sequence number of the next sample; increases by one per stored sample."""
+        return self.buffer.sequence
+
+    def get_data_since(self, cursor=None):
+        """
+        Get only the samples stored since a previous read.
+
+        Parameters:
+        - cursor: Cursor returned by the previous call, or None for all data.
+
+        Returns:
+        - (df, cursor): DataFrame of the new samples and the cursor for the next call.
+        """
+        timestamps, values, cursor = self.buffer.read_since(cursor)
+        return self.to_dataframe(timestamps, values), cursor
+
+    def to_dataframe(self, timestamps, values, fields=None):
+        """
+        Copy sample arrays into a DataFrame with a datetime64 'Time' column.
+
+        Parameters:
+        - timestamps: int64 epoch nanoseconds, shape (n,).
+        - values: Array of shape (n_fields, n).
+        - fields: Column names for values, defaults to channels.
+
+        Returns:
+        - DataFrame with 'Time' and one column per field.
+        """
+        columns = {'Time': to_datetime64(timestamps)}
+        for field, column in zip(fields or self.channels, values):
+            columns[field] = column.copy()
+        return pd.DataFrame(columns)
 
     def close(self):
-        self.communication.deregister_callback(self.sensor_id)
\ No newline at end of file
+        self.communication.deregister_callback(self.sensor_id)
+        # Under the ingest lock, so a batch being delivered never writes to a closed block
+        with self._ingest_lock:
+            if self.recording:
+                if self.rollups and not self.recording.read_only:
+                    self._save_rollups()
+                self.recording.close()
+            if self.shared_memory is not None:
+                self.shared_memory.close()
@@ -1,30 +1,292 @@
+import os
+import random
 import threading
 import time
+import binascii
+import struct
 from abc import ABC, abstractmethod
+from datetime import datetime
+import numpy as np
 import serial
+from .dispatcher import Dispatcher, DROP_OLDEST, BLOCK
+from .recording import Segment
+from .timebase import now_ns, to_ns
 
 class CommunicationInterface(ABC):
-    def __init__(self):
+    def __init__(self, queue_size=10000, overflow=DROP_OLDEST):
+        """
+        Initialize the callback registry and the dispatcher thread.
+
+        Parameters:
+        - queue_size: Maximum number of messages waiting for delivery.
+        - overflow: Policy when the queue is full ('drop-oldest', 'drop-newest' or 'block').
+        """
         self.callbacks = {}  # {sensor_id: callback}
+        self.batch_callbacks = {}  # {sensor_id: (callback, n_fields)}
+        self.dispatcher = Dispatcher(self.callbacks, self.batch_callbacks, maxsize=queue_size, overflow=overflow)
 
     def register_callback(self, sensor_id, callback):
         self.callbacks[sensor_id] = callback
 
+    def register_batch_callback(self, sensor_id, callback, n_fields):
+        """
+        Register a callback that receives many samples per call as arrays.
+
+        Takes precedence over a per-sample callback for the same sensor.
+
+        Parameters:
+        - sensor_id: Sensor identifier.
+        - callback: Called as callback(timestamps, values) with an int64 array of
+          receive times in epoch nanoseconds, shape (n,), and a float64 array of
+          shape (n, n_fields). Extra values in a message are ignored and
+          messages with missing or invalid values are dropped.
+        - n_fields: Number of values per sample.
+        """
+        self.batch_callbacks[sensor_id] = (callback, n_fields)
+
     def deregister_callback(self, sensor_id):
         self.callbacks.pop(sensor_id, None)
+        self.batch_callbacks.pop(sensor_id, None)
+
+    def has_callback(self, sensor_id):
+        return sensor_id in self.callbacks or sensor_id in self.batch_callbacks
+
+    def dispatch(self, messages, timestamp=None):
+        """
+        Queue decoded messages for delivery on the dispatcher thread.
+
+        Parameters:
+        - messages: List of (sensor_id, values) pairs.
+        - timestamp: Receive time in epoch nanoseconds, defaults to now.
+        """
+        self.dispatcher.put_many(messages, now_ns() if timestamp is None else timestamp)
+
+    def dispatch_timed(self, items):
+        """
+        Queue messages with their own receive times, e.g. replayed samples.
+
+        Parameters:
+        - items: List of (sensor_id, values, timestamp) triples, timestamps in
+          epoch nanoseconds.
+        """
+        self.dispatcher.put_items(items)
+
+    def dispatch_stats(self):
+        """Get the dispatcher queue depth and delivery/drop counters."""
+        return self.dispatcher.stats()
+
+    def connection_stats(self):
+        """
+        Get the transport's health counters.
+
+        Returns:
+        - Dictionary of counters; empty for transports that keep none.
+        """
+        return {}
 
-    @abstractmethod
     def close(self):
-        pass
+        """Stop the dispatcher after delivering what is queued; transports extend this to close themselves."""
+        self.dispatcher.stop()
+
+class Codec(ABC):
+    """
+    Turns a byte stream into sensor messages and back.
+
+    decode() is fed the unconsumed bytes from the previous call plus the newly
+    read bytes, and hands back whatever it could not consume yet.
+    """
+    parse_errors = 0  # Messages or bytes discarded as malformed
+
+    @abstractmethod
+    def decode(self, buffer):
+        """
+        Decode all complete messages in a buffer.
+
+        Parameters:
+        - buffer (bytes): Leftover bytes from the previous call followed by new bytes.
+
+        Returns:
+        - (messages, remainder): List of (sensor_id, values) pairs in arrival
+          order and the trailing bytes that do not form a complete message yet.
+        """
+
+    @abstractmethod
+    def encode(self, sensor_id, values):
+        """
+        Encode one message.
+
+        Parameters:
+        - sensor_id (str): Sensor identifier.
+        - values: Sequence of numeric field values.
+
+        Returns:
+        - bytes ready to be written to the stream.
+        """
+
+class AsciiCodec(Codec):
+    """
+    Newline-terminated text messages of the form "SENSOR_ID:v1,v2,...".
+
+    Values are passed on as strings; the sensor converts them.
+    """
+
+    def __init__(self, max_line_length=4096):
+        self.max_line_length = max_line_length  # Partial lines longer than this are discarded
+
+    def decode(self, buffer):
+        lines = buffer.split(b'\n')
+        remainder = lines.pop()
+        if len(remainder) > self.max_line_length:
+            print(f"Discarding {len(remainder)} bytes without a line terminator")
+            self.parse_errors += 1
+            remainder = b''
+        messages = []
+        for raw_line in lines:
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            sensor_id, data_str = self.parse_message(line)
+            if sensor_id:
+                messages.append((sensor_id, data_str.split(',')))
+            else:
+                self.parse_errors += 1
+        return messages, remainder
+
+    def encode(self, sensor_id, values):
+        return f"{sensor_id}:{','.join(str(value) for value in values)}\n".encode('utf-8')
+
+    @staticmethod
+    def parse_message(message):
+        parts = message.split(':', 1)
+        if len(parts) == 2:
+            return parts[0].strip(), parts[1].strip()
+        else:
+            return None, None
+
+class BinaryFrameCodec(Codec):
+    """
+    Compact binary frames:
+
+        0xAA 0x55 | id (u8) | n (u8) | n x float32 LE | CRC-16/CCITT LE
+
+    The CRC (binascii.crc_hqx, initial value 0xFFFF) covers the id, n and
+    payload bytes. Frames with a bad CRC are skipped and decoding resyncs on
+    the next sync pattern. Payloads are decoded per (id, n) group with a
+    single NumPy gather over the whole buffer instead of per-field float()
+    calls, then put back in arrival order.
+    """
+    SYNC = b'\xaa\x55'
+    HEADER_SIZE = 4
+    CRC_SIZE = 2
+
+    def __init__(self, sensor_ids):
+        """
+        Initialize the codec.
+
+        Parameters:
+        - sensor_ids (dict): Maps the frame id byte to a sensor id, e.g.
+          {1: 'TEMP_SENSOR', 2: 'PRESSURE_SENSOR'}.
+        """
+        self.sensor_ids = dict(sensor_ids)
+        self.frame_ids = {sensor_id: frame_id for frame_id, sensor_id in self.sensor_ids.items()}
+        self.max_frame_size = self.HEADER_SIZE + 255 * 4 + self.CRC_SIZE
+        self.crc_errors = 0
+
+    def decode(self, buffer):
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        size = len(data)
+        candidates = np.flatnonzero((data[:-1] == 0xAA) & (data[1:] == 0x55))
+        frames = {}  # {(frame_id, n_fields): ([payload offsets], [arrival indices])}
+        count = 0
+        position = 0
+        remainder_start = None
+        for start in candidates.tolist():
+            if start < position:
+                continue  # Sync pattern inside an already decoded frame
+            if start + self.HEADER_SIZE > size:
+                remainder_start = start
+                break
+            n_fields = buffer[start + 3]
+            end = start + self.HEADER_SIZE + 4 * n_fields + self.CRC_SIZE
+            if end > size:
+                remainder_start = start
+                break
+            crc = int.from_bytes(buffer[end - self.CRC_SIZE:end], 'little')
+            if binascii.crc_hqx(buffer[start + 2:end - self.CRC_SIZE], 0xFFFF) != crc:
+                self.crc_errors += 1
+                self.parse_errors += 1
+                continue
+            key = (buffer[start + 2], n_fields)
+            if key not in frames:
+                frames[key] = ([], [])
+            offsets, indices = frames[key]
+            offsets.append(start + self.HEADER_SIZE)
+            indices.append(count)
+            count += 1
+            position = end
+
+        if remainder_start is None:
+            # Keep a trailing sync byte in case the pattern is split across reads
+            remainder_start = size - 1 if size > position and buffer[-1] == 0xAA else size
+        remainder = buffer[max(remainder_start, position):]
+        if len(remainder) > self.max_frame_size:
+            remainder = b''
+
+        messages = [None] * count
+        unknown = False
+        for (frame_id, n_fields), (offsets, indices) in frames.items():
+            sensor_id = self.sensor_ids.get(frame_id)
+            if sensor_id is None:
+                unknown = True
+                continue
+            offsets = np.asarray(offsets)
+            payload = data[offsets[:, None] + np.arange(4 * n_fields)]
+            values = payload.view('<f4').reshape(len(offsets), n_fields).astype(np.float64)
+            for index, row in zip(indices, values):
+                messages[index] = (sensor_id, row)
+        if unknown:
+            messages = [message for message in messages if message is not None]
+        return messages, remainder
+
+    def encode(self, sensor_id, values):
+        body = struct.pack(f'<BB{len(values)}f', self.frame_ids[sensor_id], len(values), *values)
+        return self.SYNC + body + struct.pack('<H', binascii.crc_hqx(body, 0xFFFF))
 
 class PySerialCommunication(CommunicationInterface):
-    def __init__(self, port, baudrate=9600, timeout=1, reconnect_interval=5):
-        super().__init__()
+    def __init__(self, port, baudrate=9600, timeout=1, reconnect_interval=5, max_line_length=4096, codec=None,
+                 queue_size=10000, overflow=DROP_OLDEST, max_reconnect_interval=60):
+        """
+        Open a serial port and start its reader thread.
+
+        Parameters:
+        - port: Serial port name (e.g., '/dev/ttyUSB0' or 'COM3').
+        - baudrate: Communication speed.
+        - timeout: Read timeout in seconds.
+        - reconnect_interval: Seconds before the first retry after a failed connection attempt.
+        - max_line_length: Longest partial line the ASCII codec keeps.
+        - codec: Codec for the wire format, AsciiCodec by default.
+        - queue_size: Maximum number of messages waiting for delivery.
+        - overflow: Policy when the queue is full.
+        - max_reconnect_interval: Upper limit of the retry delay, which doubles
+          after every failed attempt (with up to 10% jitter so several ports
+          do not retry in lockstep).
+        """
+        super().__init__(queue_size=queue_size, overflow=overflow)
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.reconnect_interval = reconnect_interval
+        self.max_reconnect_interval = max(max_reconnect_interval, reconnect_interval)
+        self.codec = codec or AsciiCodec(max_line_length)  # Wire format, ASCII lines by default
         self.serial_conn = None
+        self._pending = b''  # Incomplete trailing message carried over between reads
+        # Health counters, only written by the read thread
+        self.bytes_read = 0
+        self.reconnects = 0
+        self.disconnected_seconds = 0.0  # Total of the outages that have ended
+        self._disconnected_since = time.monotonic()  # None while connected
+        self._has_connected = False
+        self._stop = threading.Event()  # Interrupts reconnect waits on close
         self.running = True
         self.serial_lock = threading.Lock()
         self.thread = threading.Thread(target=self.read_loop, name="SerialReadThread")
@@ -32,6 +294,9 @@ class PySerialCommunication(CommunicationInterface):
         self.thread.start()
 
     def connect(self):
+        if self._disconnected_since is None:
+            self._disconnected_since = time.monotonic()
+        delay = self.reconnect_interval
         while self.running:
             try:
                 print(f"Attempting to connect to serial port {self.port}")
@@ -40,17 +305,23 @@ class PySerialCommunication(CommunicationInterface):
                     baudrate=self.baudrate,
                     timeout=self.timeout
                 )
-                time.sleep(2)  # Wait for Arduino to reset if necessary
+                self._stop.wait(2)  # Wait for Arduino to reset if necessary
+                self._pending = b''
+                self.disconnected_seconds += time.monotonic() - self._disconnected_since
+                self._disconnected_since = None
+                if self._has_connected:
+                    self.reconnects += 1
+                self._has_connected = True
                 print(f"Connected to serial port {self.port}")
                 break  # Exit the loop once connected
             except serial.SerialException as e:
                 print(f"Error connecting to serial port {self.port}: {e}")
-                print(f"Retrying in {self.reconnect_interval} seconds...")
-                time.sleep(self.reconnect_interval)
             except Exception as e:
                 print(f"Unexpected error: {e}")
-                print(f"Retrying in {self.reconnect_interval} seconds...")
-                time.sleep(self.reconnect_interval)
+            wait = delay * random.uniform(0.9, 1.0)
+            print(f"Retrying in {wait:.1f} seconds...")
+            self._stop.wait(wait)
+            delay = min(delay * 2, self.max_reconnect_interval)
 
     def read_loop(self):
         self.connect()
@@ -59,13 +330,11 @@ class PySerialCommunication(CommunicationInterface):
                 # print("Serial connection is open.")
                 try:
                     with self.serial_lock:
-                        line = self.serial_conn.readline().decode('utf-8').strip()
-                    if line:
-                        # print(f"Received line: {line}")
-                        sensor_id, data_str = self.parse_message(line)
-                        if sensor_id and sensor_id in self.callbacks:
-                            data_values = data_str.split(',')
-                            self.callbacks[sensor_id](data_values)
+                        # Drain everything already buffered in one call; when the
+                        # port is idle, block for up to `timeout` waiting for a byte
+                        chunk = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+                    if chunk:
+                        self.handle_bytes(chunk)
                 except serial.SerialException as e:
                     print(f"SerialException occurred: {e}")
                     print("Closing connection and attempting to reconnect...")
@@ -90,23 +359,67 @@ class PySerialCommunication(CommunicationInterface):
             else:
                 print("Serial connection is not open. Attempting to reconnect...")
                 self.connect()
-            time.sleep(0.1)  # Small delay to prevent a tight loop
+
+    def handle_bytes(self, chunk):
+        """
+        Decode received bytes and dispatch the complete messages.
+
+        A trailing partial message is kept and prepended to the next chunk.
+
+        Parameters:
+        - chunk (bytes): Raw bytes read from the port.
+        """
+        self.bytes_read += len(chunk)
+        messages, self._pending = self.codec.decode(self._pending + chunk)
+        self.dispatch_messages(messages)
+
+    def dispatch_messages(self, messages):
+        """
+        Queue a batch of decoded messages for their sensors' callbacks.
+
+        Parameters:
+        - messages: List of (sensor_id, values) pairs.
+        """
+        has_callback = self.has_callback
+        self.dispatch([message for message in messages if has_callback(message[0])])
 
     def parse_message(self, message):
-        parts = message.split(':', 1)
-        if len(parts) == 2:
-            return parts[0].strip(), parts[1].strip()
-        else:
-            return None, None
+        return AsciiCodec.parse_message(message)
+
+    def connection_stats(self):
+        """
+        Get the serial link's health counters.
+
+        Returns:
+        - Dictionary with connected, bytes_read, parse_errors (messages the
+          codec discarded), reconnects and disconnected_seconds (including
+          the current outage, if any).
+        """
+        since = self._disconnected_since
+        disconnected = self.disconnected_seconds
+        if since is not None:
+            disconnected += time.monotonic() - since
+        return {
+            'connected': since is None,
+            'bytes_read': self.bytes_read,
+            'parse_errors': self.codec.parse_errors,
+            'reconnects': self.reconnects,
+            'disconnected_seconds': disconnected,
+        }
 
     def close(self):
         self.running = False
+        self._stop.set()
         if self.serial_conn and self.serial_conn.is_open:
             try:
                 self.serial_conn.close()
                 print("Serial connection closed.")
             except Exception as e:
                 print(f"Error closing serial connection: {e}")
+        # The reader may be mid-read; let it finish dispatching before the dispatcher stops
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        super().close()
 
 
 # ZCM Communication Implementation
@@ -123,14 +436,14 @@ class ZCMCommunication(CommunicationInterface):
             for channel in channels:
                 subscription = self.zcm_conn.subscribe(channel, self.message_handler)
                 self.subscriptions.append(subscription)
-            self.thread = threading.Thread(target=self.zcm_conn.run)
+            self.thread = threading.Thread(target=self.zcm_conn.run, name="ZCMThread")
             self.thread.daemon = True
             self.thread.start()
 
     def message_handler(self, channel, message):
-        if channel in self.callbacks:
+        if self.has_callback(channel):
             data_values = self.parse_message(message)
-            self.callbacks[channel](data_values)
+            self.dispatch([(channel, data_values)])
 
     def parse_message(self, message):
         # Implement message parsing based on your ZCM message format
@@ -142,3 +455,251 @@ class ZCMCommunication(CommunicationInterface):
         if self.zcm_conn:
             self.zcm_conn.stop()
             self.zcm_conn = None
+        super().close()
+
+
+class ReplayCommunication(CommunicationInterface):
+    """
+    Replays a recorded session through the registered callbacks.
+
+    The source is either a text log of "SENSOR_ID:v1,v2,..." lines, each
+    optionally prefixed by its time (epoch seconds, epoch nanoseconds or ISO
+    8601) and whitespace, or a binary recording made by BaseSensor.start_recording:
+    one sensor's segment directory, or a directory with one subdirectory per
+    sensor id. Samples are paced by their original timestamps at `speed`
+    times real time, or delivered as fast as the dispatcher takes them.
+    """
+
+    def __init__(self, source, speed=1.0, rebase=True, loop=False, start_delay=2.0, line_interval=0.01,
+                 batch_size=5000, queue_size=10000, overflow=BLOCK):
+        """
+        Initialize and start the replay.
+
+        Parameters:
+        - source: Path of a text log, or of a recording directory.
+        - speed: Replay speed relative to the recording (1.0 real time, 10.0
+          ten times faster), or None for as fast as possible.
+        - rebase: Shift the timestamps so the replay starts now, keeping their
+          spacing; False delivers the recorded times unchanged.
+        - loop: Start over at the end; each pass continues after the previous one in time.
+        - start_delay: Seconds to wait before replaying, so sensors can register.
+        - line_interval: Seconds between log lines that have no timestamp.
+        - batch_size: Maximum samples dispatched per sensor at once.
+        - queue_size: Maximum number of messages waiting for delivery.
+        - overflow: Policy when the queue is full; BLOCK makes fast replays
+          wait for the consumers instead of dropping samples.
+        """
+        super().__init__(queue_size=queue_size, overflow=overflow)
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for as fast as possible")
+        if not os.path.exists(source):
+            raise FileNotFoundError(source)
+        self.source = source
+        self.speed = speed
+        self.rebase = rebase
+        self.loop = loop
+        self.start_delay = start_delay
+        self.line_interval_ns = int(line_interval * 1e9)
+        self.batch_size = batch_size
+        self.tick = 0.005  # Minimum sleep between paced batches in seconds
+        self.replayed = 0  # Samples dispatched so far
+        self.passes = 0  # Completed passes over the source
+        self._last_timestamp = 0  # Last timestamp dispatched, to continue looped passes from
+        self.finished = threading.Event()  # Set once the replay has ended
+        self._stop = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self.replay_loop, name="ReplayThread")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def replay_loop(self):
+        try:
+            if self._stop.wait(self.start_delay):
+                return
+            shift = 0
+            while self.running:
+                streams = [_ReplayStream(chunks) for chunks in self.open_sources()]
+                starts = [t for t in (stream.next_time() for stream in streams) if t is not None]
+                if not starts:
+                    print(f"Nothing to replay in {self.source}")
+                    return
+                first = min(starts)
+                if self.rebase:
+                    shift = now_ns() - first
+                elif self.passes:
+                    shift = self._last_timestamp + 1_000_000 - first  # 1 ms after the previous pass
+                self._replay_pass(streams, first, shift)
+                if not (self.loop and self.running):
+                    return
+                self.passes += 1
+        except (OSError, ValueError) as e:
+            print(f"Error replaying {self.source}: {e}")
+        finally:
+            self.finished.set()
+
+    def _replay_pass(self, streams, first, shift):
+        wall_start = time.monotonic()
+        while self.running:
+            next_times = [t for t in (stream.next_time() for stream in streams) if t is not None]
+            if not next_times:
+                break
+            # Cap the batch at batch_size samples per stream, keeping all streams in time order
+            end = min(stream.horizon(self.batch_size) for stream in streams if stream.next_time() is not None)
+            if self.speed is not None:
+                due = first + int((time.monotonic() - wall_start) * self.speed * 1e9)
+                if min(next_times) > due:
+                    delay = (min(next_times) - first) / self.speed / 1e9 - (time.monotonic() - wall_start)
+                    self._stop.wait(max(delay, self.tick))
+                    continue
+                end = min(end, due)
+            items = []
+            for stream in streams:
+                stream.take_until(end, shift, items)
+            if len(streams) > 1:
+                items.sort(key=lambda item: item[2])
+            has_callback = self.has_callback
+            items = [item for item in items if has_callback(item[0])]
+            if items:
+                self._last_timestamp = items[-1][2]
+                self.dispatch_timed(items)
+                self.replayed += len(items)
+
+    def open_sources(self):
+        """
+        Open the source for one pass.
+
+        Returns:
+        - List of chunk iterators, each yielding (sensor_ids, timestamps, rows)
+          in time order; sensor_ids is one id or a list parallel to timestamps.
+        """
+        if os.path.isfile(self.source):
+            return [self.iter_log_chunks(self.source)]
+        if any(name.endswith('.seg') for name in os.listdir(self.source)):
+            return [self.iter_recording_chunks(os.path.basename(os.path.normpath(self.source)), self.source)]
+        sources = []
+        for name in sorted(os.listdir(self.source)):
+            directory = os.path.join(self.source, name)
+            if os.path.isdir(directory) and any(entry.endswith('.seg') for entry in os.listdir(directory)):
+                sources.append(self.iter_recording_chunks(name, directory))
+        return sources
+
+    def iter_log_chunks(self, path):
+        previous = None
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            while True:
+                lines = f.readlines(1 << 20)
+                if not lines:
+                    break
+                sensor_ids, timestamps, rows = [], [], []
+                for line in lines:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    timestamp, message = self.parse_log_line(line)
+                    sensor_id, data_str = AsciiCodec.parse_message(message)
+                    if not sensor_id:
+                        continue
+                    if timestamp is None:
+                        timestamp = now_ns() if previous is None else previous + self.line_interval_ns
+                    elif previous is not None and timestamp < previous:
+                        timestamp = previous  # Keep time order through clock steps in the log
+                    previous = timestamp
+                    sensor_ids.append(sensor_id)
+                    timestamps.append(timestamp)
+                    rows.append(data_str.split(','))
+                if timestamps:
+                    yield sensor_ids, np.array(timestamps, dtype=np.int64), rows
+
+    def iter_recording_chunks(self, sensor_id, directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.seg'):
+                continue
+            try:
+                segment = Segment(os.path.join(directory, name))
+            except (OSError, ValueError) as e:
+                print(f"Skipping segment {name}: {e}")
+                continue
+            records = segment.records
+            for start in range(0, len(records), self.batch_size):
+                chunk = records[start:start + self.batch_size]
+                yield sensor_id, chunk['time'], chunk['values']
+
+    @staticmethod
+    def parse_log_line(line):
+        """
+        Split a log line into its timestamp and message.
+
+        Parameters:
+        - line (str): A stripped log line.
+
+        Returns:
+        - (timestamp, message): Epoch nanoseconds, or None if the line has no
+          timestamp prefix, and the "SENSOR_ID:v1,v2,..." message.
+        """
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            token = parts[0]
+            seconds, _, fraction = token.partition('.')
+            if seconds.isdigit() and (fraction.isdigit() or not fraction):
+                if not fraction and len(seconds) >= 16:
+                    return int(seconds), parts[1]  # Epoch nanoseconds
+                # Epoch seconds, parsed exactly rather than through a float
+                return int(seconds) * 10**9 + int(fraction[:9].ljust(9, '0') or 0), parts[1]
+            try:
+                return to_ns(datetime.fromisoformat(token)), parts[1]
+            except ValueError:
+                pass
+        return None, line
+
+    def wait(self, timeout=None):
+        """
+        Block until the replay has ended.
+
+        Parameters:
+        - timeout: Maximum time to wait in seconds, None to wait indefinitely.
+
+        Returns:
+        - True if the replay ended, False on timeout.
+        """
+        return self.finished.wait(timeout)
+
+    def close(self):
+        self.running = False
+        self._stop.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        super().close()
+
+
+class _ReplayStream:
+    # Cursor over one source's time-ordered chunks
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = None
+        self._position = 0
+
+    def next_time(self):
+        """Timestamp of the next sample, or None at the end."""
+        while self._chunk is None or self._position >= len(self._chunk[1]):
+            self._chunk = next(self._chunks, None)
+            self._position = 0
+            if self._chunk is None:
+                return None
+        return int(self._chunk[1][self._position])
+
+    def horizon(self, count):
+        """Timestamp of the count-th next sample within the current chunk."""
+        timestamps = self._chunk[1]
+        return int(timestamps[min(self._position + count, len(timestamps)) - 1])
+
+    def take_until(self, end, shift, items):
+        """Append (sensor_id, values, timestamp + shift) for every sample up to end."""
+        while self.next_time() is not None and self.next_time() <= end:
+            sensor_ids, timestamps, rows = self._chunk
+            stop = int(np.searchsorted(timestamps, end, side='right'))
+            start, self._position = self._position, stop
+            shifted = (timestamps[start:stop] + shift).tolist()
+            if isinstance(sensor_ids, str):
+                items.extend((sensor_ids, row, timestamp) for row, timestamp in zip(rows[start:stop], shifted))
+            else:
+                items.extend(zip(sensor_ids[start:stop], rows[start:stop], shifted))
@@ -0,0 +1,250 @@
+import threading
+from collections import deque
+import numpy as np
+from .metrics import Histogram
+from .timebase import now_ns
+
+# Overflow policies for a full queue
+DROP_OLDEST = 'drop-oldest'  # Discard the oldest queued messages to make room
+DROP_NEWEST = 'drop-newest'  # Discard the incoming messages
+BLOCK = 'block'  # Make the reader wait until the dispatcher catches up
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class Dispatcher:
+    """
+    Hands decoded messages from a reader thread to sensor callbacks on a
+    separate dispatcher thread, so slow consumers cannot stall reading.
+
+    The queue is a bounded deque. A lock is held only while a whole batch is
+    appended or popped, together with the counters it changes, and an Event
+    wakes the dispatcher. Messages drained together are grouped per sensor
+    before delivery.
+    """
+
+    def __init__(self, callbacks, batch_callbacks=None, maxsize=10000, overflow=DROP_OLDEST, batch_size=5000,
+                 name='DispatchThread'):
+        """
+        Initialize and start the dispatcher.
+
+        Parameters:
+        - callbacks: Dict of {sensor_id: callback}, shared with the communication
+          object so registrations take effect immediately.
+        - batch_callbacks: Dict of {sensor_id: (callback, n_fields)} for consumers
+          that take whole batches as arrays, shared the same way.
+        - maxsize: Maximum number of queued messages.
+        - overflow: One of DROP_OLDEST, DROP_NEWEST or BLOCK.
+        - batch_size: Maximum number of messages delivered per drain.
+        - name: Name of the dispatcher thread.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.callbacks = callbacks
+        self.batch_callbacks = batch_callbacks if batch_callbacks is not None else {}
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self._queue = deque(maxlen=maxsize if overflow == DROP_OLDEST else None)
+        self._lock = threading.Lock()  # Guards the queue and the enqueued and dropped counters
+        self._wakeup = threading.Event()
+        self._space = threading.Event()
+        # delivered, callback_errors and parse_errors are only written by the dispatcher thread
+        self.enqueued = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.callback_errors = 0
+        self.parse_errors = 0
+        self.latency = Histogram()  # Seconds from receive time to delivery, per sample
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, sensor_id, values, timestamp):
+        """
+        Queue one message.
+
+        Parameters:
+        - sensor_id: Sensor the message belongs to.
+        - values: Field values as decoded.
+        - timestamp: Receive time in epoch nanoseconds.
+        """
+        self.put_many([(sensor_id, values)], timestamp)
+
+    def put_many(self, messages, timestamp):
+        """
+        Queue a batch of messages that arrived together.
+
+        Parameters:
+        - messages: List of (sensor_id, values) pairs.
+        - timestamp: Receive time in epoch nanoseconds, shared by the batch.
+        """
+        if messages:
+            self.put_items([(sensor_id, values, timestamp) for sensor_id, values in messages])
+
+    def put_items(self, items):
+        """
+        Queue messages that each carry their own timestamp. Once the
+        dispatcher is stopped, messages are counted as dropped instead.
+
+        Parameters:
+        - items: List of (sensor_id, values, timestamp) triples, timestamps in
+          epoch nanoseconds.
+        """
+        if not items:
+            return
+        if self.overflow == DROP_OLDEST:
+            with self._lock:
+                if not self.running:
+                    self.dropped += len(items)
+                    return
+                # The deque's maxlen discards the oldest entries on its own
+                self.dropped += max(len(self._queue) + len(items) - self.maxsize, 0)
+                self._queue.extend(items)
+                self.enqueued += len(items)
+        elif self.overflow == DROP_NEWEST:
+            with self._lock:
+                if not self.running:
+                    self.dropped += len(items)
+                    return
+                space = max(self.maxsize - len(self._queue), 0)
+                if space < len(items):
+                    self.dropped += len(items) - space
+                    items = items[:space]
+                self._queue.extend(items)
+                self.enqueued += len(items)
+        else:
+            pending = items
+            while pending:
+                with self._lock:
+                    if not self.running:
+                        # Stopped while waiting for room: nothing will drain the queue any more
+                        self.dropped += len(pending)
+                        return
+                    space = self.maxsize - len(self._queue)
+                    if space > 0:
+                        self._queue.extend(pending[:space])
+                        self.enqueued += len(pending[:space])
+                        pending = pending[space:]
+                        continue
+                    self._space.clear()
+                self._wakeup.set()
+                self._space.wait(0.1)
+        self._wakeup.set()
+
+    def _run(self):
+        while self.running:
+            self._wakeup.wait(0.1)
+            self._wakeup.clear()
+            while self._queue and self.running:
+                self._drain()
+        # Stopped: deliver whatever is still queued before the thread ends
+        while self._queue:
+            self._drain()
+
+    def _drain(self):
+        # Pop up to batch_size messages and group them per sensor
+        queue = self._queue
+        with self._lock:
+            items = [queue.popleft() for _ in range(min(len(queue), self.batch_size))]
+        batches = {}
+        for sensor_id, values, timestamp in items:
+            batch = batches.get(sensor_id)
+            if batch is None:
+                batch = batches[sensor_id] = []
+            batch.append((values, timestamp))
+        self._space.set()
+        for sensor_id, batch in batches.items():
+            self._deliver(sensor_id, batch)
+
+    def _deliver(self, sensor_id, batch):
+        batch_callback = self.batch_callbacks.get(sensor_id)
+        if batch_callback is not None:
+            self._deliver_batch(sensor_id, batch, *batch_callback)
+            return
+        callback = self.callbacks.get(sensor_id)
+        if callback is None:
+            return
+        self.latency.observe_many((now_ns() - np.fromiter((timestamp for _, timestamp in batch), dtype=np.int64,
+                                                           count=len(batch))) / 1e9)
+        for values, _ in batch:
+            try:
+                callback(values)
+            except Exception as e:
+                self.callback_errors += 1
+                print(f"Error in callback for {sensor_id}: {e}")
+        self.delivered += len(batch)
+
+    def _deliver_batch(self, sensor_id, batch, callback, n_fields):
+        # Convert the whole batch with one NumPy call; fall back to row by row
+        # only if some rows are malformed
+        rows = [values for values, _ in batch]
+        timestamps = np.fromiter((timestamp for _, timestamp in batch), dtype=np.int64, count=len(batch))
+        try:
+            values = np.array(rows, dtype=np.float64)
+            if values.ndim != 2 or values.shape[1] < n_fields:
+                raise ValueError("rows have missing fields")
+            values = values[:, :n_fields]
+        except ValueError:
+            timestamps, values = self._convert_rows(sensor_id, rows, timestamps, n_fields)
+        if not len(timestamps):
+            return
+        self.latency.observe_many((now_ns() - timestamps) / 1e9)
+        try:
+            callback(timestamps, values)
+        except Exception as e:
+            self.callback_errors += 1
+            print(f"Error in batch callback for {sensor_id}: {e}")
+        self.delivered += len(timestamps)
+
+    def _convert_rows(self, sensor_id, rows, timestamps, n_fields):
+        keep = []
+        converted = []
+        for index, row in enumerate(rows):
+            try:
+                if len(row) < n_fields:
+                    raise ValueError(f"expected {n_fields} values, got {len(row)}")
+                converted.append(np.asarray(row[:n_fields], dtype=np.float64))
+                keep.append(index)
+            except ValueError as e:
+                self.parse_errors += 1
+                print(f"Invalid data for {sensor_id}: {row} - {e}")
+        values = np.array(converted, dtype=np.float64).reshape(len(converted), n_fields)
+        return timestamps[keep], values
+
+    def stats(self):
+        """
+        Get the dispatcher counters.
+
+        Returns:
+        - Dictionary with queue_depth, enqueued, delivered, dropped,
+          callback_errors and parse_errors.
+        """
+        with self._lock:
+            queue_depth, enqueued, dropped = len(self._queue), self.enqueued, self.dropped
+        return {
+            'queue_depth': queue_depth,
+            'enqueued': enqueued,
+            'delivered': self.delivered,
+            'dropped': dropped,
+            'callback_errors': self.callback_errors,
+            'parse_errors': self.parse_errors,
+        }
+
+    def stop(self):
+        """
+        Stop the dispatcher thread, delivering whatever is still queued.
+
+        Returns once the thread has delivered the last batch, unless called
+        from a callback on the dispatcher thread itself.
+        """
+        with self._lock:
+            if not self.running:
+                return
+            # Under the lock, so every put either lands before the final drain or counts as dropped
+            self.running = False
+        self._wakeup.set()
+        self._space.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join()
@@ -0,0 +1,165 @@
+import numpy as np
+
+PARQUET = 'parquet'
+ARROW = 'arrow'  # Arrow IPC file format, readable with pandas.read_feather
+EXPORT_FORMATS = (PARQUET, ARROW)
+DEFAULT_ROWS_PER_GROUP = 100_000
+
+
+def iter_batches(sensor, start=None, end=None, rows_per_group=DEFAULT_ROWS_PER_GROUP):
+    """
+    Read a sensor's history as fixed-size pyarrow record batches.
+
+    Only one batch is held in memory at a time: the history is read in
+    chunks and regrouped into batches of rows_per_group rows (the last one
+    may be shorter).
+
+    Parameters:
+    - sensor: BaseSensor to export.
+    - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+    - end: End of the range (datetime, or epoch nanoseconds), None for now.
+    - rows_per_group: Rows per batch.
+
+    Yields:
+    - pyarrow.RecordBatch with a UTC 'Time' column and one float64 column per channel.
+    """
+    import pyarrow as pa
+    schema = get_schema(sensor)
+    pending = []
+    pending_rows = 0
+
+    def make_batch(parts):
+        timestamps = np.concatenate([timestamps for timestamps, _ in parts])
+        values = np.hstack([values for _, values in parts])
+        columns = [pa.array(timestamps, type=pa.timestamp('ns', tz='UTC'))]
+        columns += [pa.array(column) for column in values]
+        return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+    for timestamps, values in sensor.iter_window(start, end):
+        offset = 0
+        while offset < len(timestamps):
+            take = min(rows_per_group - pending_rows, len(timestamps) - offset)
+            pending.append((timestamps[offset:offset + take], values[:, offset:offset + take]))
+            pending_rows += take
+            offset += take
+            if pending_rows == rows_per_group:
+                yield make_batch(pending)
+                pending, pending_rows = [], 0
+    if pending:
+        yield make_batch(pending)
+
+
+def get_schema(sensor):
+    """Arrow schema of an export: 'Time' followed by the sensor's channels."""
+    import pyarrow as pa
+    return pa.schema([('Time', pa.timestamp('ns', tz='UTC'))] + [(channel, pa.float64()) for channel in sensor.channels])
+
+
+def write_export(sensor, destination, format=PARQUET, start=None, end=None, rows_per_group=DEFAULT_ROWS_PER_GROUP):
+    """
+    Write a sensor's history to a Parquet or Arrow IPC file, one row group per batch.
+
+    Parameters:
+    - sensor: BaseSensor to export.
+    - destination: File path or writable binary file object.
+    - format: PARQUET or ARROW.
+    - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+    - end: End of the range (datetime, or epoch nanoseconds), None for now.
+    - rows_per_group: Rows per row group (Parquet) or record batch (Arrow).
+
+    Returns:
+    - Number of rows written.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {EXPORT_FORMATS}, got {format!r}")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = get_schema(sensor)
+    if format == PARQUET:
+        writer = pq.ParquetWriter(destination, schema)
+    else:
+        writer = pa.ipc.new_file(destination, schema)
+    rows = 0
+    try:
+        for batch in iter_batches(sensor, start, end, rows_per_group):
+            if format == PARQUET:
+                writer.write_batch(batch, row_group_size=rows_per_group)
+            else:
+                writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+
+class _ChunkSink:
+    # Write-only file object collecting what the writer produced since the last drain
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_export(sensor, format=PARQUET, start=None, end=None, rows_per_group=DEFAULT_ROWS_PER_GROUP):
+    """
+    Produce an export file as a stream of bytes, e.g. for an HTTP download.
+
+    Parameters:
+    - sensor: BaseSensor to export.
+    - format: PARQUET or ARROW.
+    - start: Start of the range (datetime, or epoch nanoseconds), None for all history.
+    - end: End of the range (datetime, or epoch nanoseconds), None for now.
+    - rows_per_group: Rows per row group (Parquet) or record batch (Arrow).
+
+    Yields:
+    - bytes: The file's contents, roughly one row group at a time.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {EXPORT_FORMATS}, got {format!r}")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _ChunkSink()
+    schema = get_schema(sensor)
+    if format == PARQUET:
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+    try:
+        for batch in iter_batches(sensor, start, end, rows_per_group):
+            if format == PARQUET:
+                writer.write_batch(batch, row_group_size=rows_per_group)
+            else:
+                writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        # Also runs when the client disconnects (GeneratorExit) or a batch fails
+        writer.close()
+    yield sink.drain()
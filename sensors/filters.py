@@ -0,0 +1,289 @@
+import copy
+import warnings
+from abc import ABC, abstractmethod
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Filter(ABC):
+    """
+    Streaming filter over one field.
+
+    process() is called with consecutive batches of samples and keeps whatever
+    state it needs between calls, so each sample is only processed once.
+    """
+    passes_dc = True  # Whether a constant input passes through unchanged
+
+    @abstractmethod
+    def process(self, x):
+        """
+        Filter the next batch of samples.
+
+        Parameters:
+        - x: 1-D float64 array of samples in time order.
+
+        Returns:
+        - 1-D float64 array of filtered samples, same length as x.
+        """
+
+
+class MovingAverage(Filter):
+    def __init__(self, window):
+        """
+        Mean of the last window samples, ignoring NaNs.
+
+        Parameters:
+        - window: Number of samples averaged.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = int(window)
+        self._history = np.full(self.window - 1, np.nan)  # Last window - 1 inputs
+
+    def process(self, x):
+        data = np.concatenate((self._history, x))
+        valid = ~np.isnan(data)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(valid, data, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        ends = np.arange(len(self._history) + 1, len(data) + 1)
+        starts = ends - self.window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            y = (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
+        self._history = data[len(data) - len(self._history):]
+        return y
+
+
+class Median(Filter):
+    def __init__(self, window):
+        """
+        Median of the last window samples, ignoring NaNs.
+
+        Parameters:
+        - window: Number of samples in the median, typically odd.
+        """
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = int(window)
+        self._history = np.full(self.window - 1, np.nan)
+
+    def process(self, x):
+        data = np.concatenate((self._history, x))
+        windows = sliding_window_view(data, self.window)
+        if np.isnan(windows).any():
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN windows give NaN
+                y = np.nanmedian(windows, axis=1)
+        else:
+            y = np.median(windows, axis=1)
+        self._history = data[len(data) - len(self._history):]
+        return y
+
+
+class LinearFilter(Filter):
+    """
+    IIR filter given by its transfer function coefficients.
+
+    The recursion is written in state-space form (transposed direct form II)
+    and run a block of samples at a time: precomputed block matrices map the
+    state at the start of a block and the block's inputs to its outputs and
+    the next state, so a batch costs a few matrix products instead of a
+    Python loop per sample. The state is just the filter order's worth of
+    floats.
+
+    NaN inputs produce NaN outputs and are otherwise skipped by holding the
+    previous input. The state starts at the steady state of the first sample
+    so the output does not ramp up from zero.
+    """
+    block_size = 256
+
+    def __init__(self, b, a):
+        """
+        Initialize the filter.
+
+        Parameters:
+        - b: Numerator (feed-forward) coefficients.
+        - a: Denominator (feedback) coefficients, a[0] != 0.
+        """
+        b = np.asarray(b, dtype=np.float64)
+        a = np.asarray(a, dtype=np.float64)
+        if a[0] == 0:
+            raise ValueError("a[0] must not be zero")
+        b, a = b / a[0], a / a[0]
+        order = max(len(a), len(b)) - 1
+        b = np.pad(b, (0, order + 1 - len(b)))
+        a = np.pad(a, (0, order + 1 - len(a)))
+        self.b, self.a = b, a
+        self.order = order
+
+        A = np.zeros((order, order))
+        A[:, 0] = -a[1:]
+        A[:order - 1, 1:] += np.eye(order - 1)
+        B = b[1:] - a[1:] * b[0]
+        D = b[0]
+        self._A, self._B = A, B
+        self._steady = np.linalg.solve(np.eye(order) - A, B) if order else np.zeros(0)
+
+        L = self.block_size
+        powers = np.empty((L + 1, order, order))
+        powers[0] = np.eye(order)
+        for k in range(1, L + 1):
+            powers[k] = A @ powers[k - 1]
+        self._powers = powers
+        self._G = powers[:L, 0, :]  # Row k: C A^k with C = e1
+        impulse = np.concatenate(([D], (powers[:L - 1] @ B)[:, 0]))  # D, C A^k B
+        lag = np.subtract.outer(np.arange(L), np.arange(L))
+        self._H = np.where(lag >= 0, impulse[np.clip(lag, 0, None)], 0.0)
+        self._Q = (powers[:L][::-1] @ B).T  # Column j: A^(L-1-j) B
+        self._state = None
+        self._last_input = np.nan
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        missing = np.isnan(x)
+        if missing.any():
+            # Hold the previous input over NaNs so they do not poison the state
+            index = np.where(missing, -1, np.arange(len(x)))
+            np.maximum.accumulate(index, out=index)
+            held = np.where(index >= 0, x[np.maximum(index, 0)], self._last_input)
+        else:
+            held = x
+        if len(held):
+            self._last_input = held[-1]
+        if self._state is None:
+            first = held[~np.isnan(held)]
+            if not len(first):
+                return np.full(len(x), np.nan)
+            self._state = self._steady * first[0]
+            held = np.where(np.isnan(held), first[0], held)
+
+        y = np.empty(len(held))
+        L = self.block_size
+        state = self._state
+        for start in range(0, len(held), L):
+            block = held[start:start + L]
+            m = len(block)
+            y[start:start + m] = self._H[:m, :m] @ block + self._G[:m] @ state
+            state = self._powers[m] @ state + self._Q[:, L - m:] @ block
+        self._state = state
+        y[missing] = np.nan
+        return y
+
+
+class ExponentialMovingAverage(LinearFilter):
+    def __init__(self, alpha):
+        """
+        y[n] = alpha * x[n] + (1 - alpha) * y[n - 1].
+
+        Parameters:
+        - alpha: Smoothing factor in (0, 1]; smaller is smoother.
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        super().__init__([alpha, 0.0], [1.0, alpha - 1.0])
+
+
+class Biquad(LinearFilter):
+    def __init__(self, b, a):
+        """
+        Second-order IIR section.
+
+        Parameters:
+        - b: Three numerator coefficients.
+        - a: Three denominator coefficients.
+        """
+        if len(b) != 3 or len(a) != 3:
+            raise ValueError("A biquad needs three b and three a coefficients")
+        super().__init__(b, a)
+
+
+class LowPass(Biquad):
+    def __init__(self, cutoff_hz, sample_rate_hz, q=0.7071):
+        """
+        Second-order low-pass filter (Butterworth for the default q).
+
+        Parameters:
+        - cutoff_hz: Cutoff frequency.
+        - sample_rate_hz: Nominal sample rate of the sensor.
+        - q: Quality factor.
+        """
+        w0 = 2 * np.pi * cutoff_hz / sample_rate_hz
+        alpha = np.sin(w0) / (2 * q)
+        cos_w0 = np.cos(w0)
+        super().__init__([(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2],
+                         [1 + alpha, -2 * cos_w0, 1 - alpha])
+
+
+class HighPass(Biquad):
+    passes_dc = False
+
+    def __init__(self, cutoff_hz, sample_rate_hz, q=0.7071):
+        """
+        Second-order high-pass filter (Butterworth for the default q).
+
+        Parameters:
+        - cutoff_hz: Cutoff frequency.
+        - sample_rate_hz: Nominal sample rate of the sensor.
+        - q: Quality factor.
+        """
+        w0 = 2 * np.pi * cutoff_hz / sample_rate_hz
+        alpha = np.sin(w0) / (2 * q)
+        cos_w0 = np.cos(w0)
+        super().__init__([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2],
+                         [1 + alpha, -2 * cos_w0, 1 - alpha])
+
+
+class FilterStage:
+    """
+    Runs a sensor's filters on each ingested batch and appends the filtered
+    channels after the raw fields.
+
+    Channels are named '<field>_<filter name>'.
+    """
+
+    def __init__(self, data_fields, filters):
+        """
+        Initialize the stage.
+
+        Parameters:
+        - data_fields: The sensor's raw field names.
+        - filters: Dictionary of {name: Filter} applied to every field, or
+          {name: (Filter, [fields])} to limit it to some fields. Each channel
+          gets its own copy of the filter.
+        """
+        self.data_fields = list(data_fields)
+        self.channels = list(data_fields)
+        self.sources = {}  # channel -> (index of the raw field, Filter)
+        for name, spec in filters.items():
+            template, fields = spec if isinstance(spec, tuple) else (spec, self.data_fields)
+            for field in fields:
+                channel = f'{field}_{name}'
+                self.sources[channel] = (self.data_fields.index(field), copy.deepcopy(template))
+                self.channels.append(channel)
+
+    def source_field(self, channel):
+        """Raw field a channel is computed from."""
+        if channel in self.sources:
+            return self.data_fields[self.sources[channel][0]]
+        return channel
+
+    def get_filter(self, channel):
+        """Filter computing a channel, or None for raw fields."""
+        source = self.sources.get(channel)
+        return source[1] if source else None
+
+    def process(self, values):
+        """
+        Filter a batch.
+
+        Parameters:
+        - values: float64 array of shape (n, len(data_fields)).
+
+        Returns:
+        - float64 array of shape (n, len(channels)).
+        """
+        out = np.empty((len(values), len(self.channels)))
+        n_fields = len(self.data_fields)
+        out[:, :n_fields] = values
+        for column, (field_index, channel_filter) in enumerate(self.sources.values(), start=n_fields):
+            out[:, column] = channel_filter.process(values[:, field_index])
+        return out
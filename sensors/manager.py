@@ -0,0 +1,140 @@
+import json
+from .communication import PySerialCommunication, ReplayCommunication, ZCMCommunication, AsciiCodec, BinaryFrameCodec
+from .async_serial import AsyncSerialCommunication
+
+
+class CommunicationManager:
+    """
+    Owns several communication backends (serial ports, replays, ZCM) and
+    routes each sensor id to the backend its messages arrive on.
+
+    Sensors use the manager exactly like a single communication object.
+    Every backend keeps its own reader thread, reconnect backoff and
+    dispatcher, so ingestion scales with the number of ports and a failing
+    port does not hold up the others.
+    """
+
+    def __init__(self, backends, routes=None):
+        """
+        Initialize the manager.
+
+        Parameters:
+        - backends: Dictionary of {name: CommunicationInterface}.
+        - routes: Dictionary of {sensor_id: backend name}. Sensors without a
+          route listen on every backend.
+        """
+        self.backends = dict(backends)
+        self.routes = dict(routes or {})
+        for sensor_id, name in self.routes.items():
+            if name not in self.backends:
+                raise KeyError(f"Route for {sensor_id} names unknown backend {name!r}")
+
+    def backends_for(self, sensor_id):
+        """Backends a sensor's messages can arrive on."""
+        name = self.routes.get(sensor_id)
+        return [self.backends[name]] if name is not None else list(self.backends.values())
+
+    def register_callback(self, sensor_id, callback):
+        for backend in self.backends_for(sensor_id):
+            backend.register_callback(sensor_id, callback)
+
+    def register_batch_callback(self, sensor_id, callback, n_fields):
+        for backend in self.backends_for(sensor_id):
+            backend.register_batch_callback(sensor_id, callback, n_fields)
+
+    def deregister_callback(self, sensor_id):
+        for backend in self.backends.values():
+            backend.deregister_callback(sensor_id)
+
+    def has_callback(self, sensor_id):
+        return any(backend.has_callback(sensor_id) for backend in self.backends.values())
+
+    def dispatch_stats(self):
+        """Dispatcher counters summed over all backends."""
+        totals = {}
+        for backend in self.backends.values():
+            for name, value in backend.dispatch_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a manager from a configuration dictionary, e.g. loaded from JSON:
+
+            {
+              "backends": {
+                "usb0": {"type": "serial", "port": "/dev/ttyUSB0", "baudrate": 115200},
+                "usb1": {"type": "serial", "port": "/dev/ttyUSB1", "codec": "binary",
+                         "frame_ids": {"1": "ACCEL_SENSOR"}},
+                "log": {"type": "replay", "source": "session.log", "speed": 2.0}
+              },
+              "routes": {"TEMP_SENSOR": "usb0", "ACCEL_SENSOR": "usb1"}
+            }
+
+        Backend options other than type, codec and frame_ids are passed to the
+        backend class as keyword arguments.
+
+        Parameters:
+        - config: The configuration dictionary.
+
+        Returns:
+        - CommunicationManager.
+        """
+        backends = {}
+        try:
+            for name, options in config['backends'].items():
+                backends[name] = create_backend(options, name)
+            return cls(backends, config.get('routes'))
+        except Exception:
+            for backend in backends.values():
+                backend.close()
+            raise
+
+    @classmethod
+    def from_file(cls, path):
+        """Build a manager from a JSON configuration file, see from_config."""
+        with open(path) as f:
+            return cls.from_config(json.load(f))
+
+
+BACKEND_TYPES = {
+    'serial': PySerialCommunication,
+    'async-serial': AsyncSerialCommunication,
+    'replay': ReplayCommunication,
+    'zcm': ZCMCommunication,
+}
+
+
+def create_backend(options, name='backend'):
+    """
+    Create one backend from its configuration.
+
+    Parameters:
+    - options: Dictionary with 'type' (serial, async-serial, replay or zcm), optionally
+      'codec' ('ascii' or 'binary') and 'frame_ids' ({frame id: sensor id}, required
+      by the binary codec), and keyword arguments for the backend class.
+    - name: Name of the backend, used in error messages.
+
+    Returns:
+    - The CommunicationInterface.
+    """
+    options = dict(options)
+    backend_type = options.pop('type', 'serial')
+    if backend_type not in BACKEND_TYPES:
+        raise ValueError(f"Backend {name!r} has unknown type {backend_type!r}, expected one of {list(BACKEND_TYPES)}")
+    codec = options.pop('codec', None)
+    frame_ids = options.pop('frame_ids', None)
+    if codec == 'binary':
+        if not frame_ids:
+            raise ValueError(f"Backend {name!r} uses the binary codec but has no 'frame_ids' mapping")
+        options['codec'] = BinaryFrameCodec({int(frame_id): sensor_id for frame_id, sensor_id in frame_ids.items()})
+    elif codec == 'ascii':
+        options['codec'] = AsciiCodec()
+    elif codec is not None:
+        raise ValueError(f"Backend {name!r} has unknown codec {codec!r}, expected 'ascii' or 'binary'")
+    return BACKEND_TYPES[backend_type](**options)
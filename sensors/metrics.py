@@ -0,0 +1,104 @@
+import math
+import numpy as np
+
+# Histogram buckets in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus model.
+
+    Observations only increment NumPy counters, so recording a whole batch
+    costs one searchsorted and one bincount. Like the dispatcher counters,
+    a histogram takes no lock: give it a single writer, or guard it.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Parameters:
+        - buckets: Upper bounds of the buckets; +Inf is added implicitly.
+        """
+        self.bounds = np.asarray(sorted(buckets), dtype=np.float64)
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[np.searchsorted(self.bounds, value, side='left')] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_many(self, values):
+        """
+        Record several observations at once.
+
+        Parameters:
+        - values: Array of observed values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.counts += np.bincount(np.searchsorted(self.bounds, values, side='left'), minlength=len(self.counts))
+        self.sum += float(values.sum())
+        self.count += len(values)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+def format_metric(name, metric_type, help_text, samples):
+    """
+    Format one metric family in the Prometheus text exposition format.
+
+    Parameters:
+    - name: Metric name.
+    - metric_type: 'counter' or 'gauge'.
+    - help_text: One-line description.
+    - samples: List of (labels, value) pairs, labels being a dictionary.
+
+    Returns:
+    - List of lines.
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    lines.extend(f'{name}{_labels(labels)} {_number(value)}' for labels, value in samples)
+    return lines
+
+
+def format_histogram(name, help_text, histograms):
+    """
+    Format a histogram family in the Prometheus text exposition format.
+
+    Parameters:
+    - name: Metric name, without the _bucket/_sum/_count suffixes.
+    - help_text: One-line description.
+    - histograms: List of (labels, Histogram) pairs.
+
+    Returns:
+    - List of lines.
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, histogram in histograms:
+        cumulative = np.cumsum(histogram.counts)
+        for bound, count in zip(list(histogram.bounds) + [math.inf], cumulative.tolist()):
+            lines.append(f'{name}_bucket{_labels(dict(labels, le=_number(bound)))} {count}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(histogram.sum)}')
+        lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+    return lines
@@ -0,0 +1,491 @@
+import json
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+import numpy as np
+from .dispatcher import DROP_OLDEST, DROP_NEWEST
+
+try:
+    import fcntl
+except ImportError:  # Windows: a second writer is not detected
+    fcntl = None
+
+MAGIC = b'SENSSEG1'
+HEADER_SIZE = 4096  # Magic, record count, capacity, then the field list as JSON
+DEFAULT_SEGMENT_RECORDS = 1_000_000
+DEFAULT_MAX_SEGMENTS = 64
+DEFAULT_MAX_PENDING = 1_000_000  # Records waiting for the writer thread before some are dropped
+LOCK_NAME = 'writer.lock'
+
+
+def record_dtype(fields):
+    """Fixed-width record: int64 epoch-nanosecond time and one float64 per field."""
+    return np.dtype([('time', '<i8'), ('values', '<f8', (len(fields),))])
+
+
+class Segment:
+    """
+    One preallocated, memory-mapped segment file of fixed-width records.
+
+    The record count in the header is only advanced after the records
+    themselves are written, so a reader (or a restart after a crash) never
+    sees a partly written record.
+    """
+
+    def __init__(self, path, fields=None, capacity=DEFAULT_SEGMENT_RECORDS, read_only=False):
+        """
+        Open an existing segment, or create it if fields are given.
+
+        Parameters:
+        - path: Path of the segment file.
+        - fields: Field names; required to create a new segment.
+        - capacity: Number of records a new segment holds.
+        - read_only: Map an existing segment read-only, e.g. one another process writes.
+        """
+        self.path = path
+        self.read_only = read_only
+        if not os.path.exists(path):
+            if fields is None or read_only:
+                raise FileNotFoundError(path)
+            meta = json.dumps({'fields': list(fields)}).encode()
+            if 28 + len(meta) > HEADER_SIZE:
+                raise ValueError("Too many fields for the segment header")
+            with open(path, 'wb') as f:
+                f.write(MAGIC + np.array([0, capacity], dtype='<i8').tobytes()
+                        + np.array([len(meta)], dtype='<i4').tobytes() + meta)
+                f.truncate(HEADER_SIZE + capacity * record_dtype(fields).itemsize)
+        self._map = np.memmap(path, dtype=np.uint8, mode='r' if read_only else 'r+')
+        if len(self._map) < 28 or bytes(self._map[:8]) != MAGIC:
+            raise ValueError(f"Not a segment file: {path}")
+        self._header = self._map[8:24].view('<i8')  # [count, capacity]
+        meta_length = int(self._map[24:28].view('<i4')[0])
+        self.fields = json.loads(bytes(self._map[28:28 + meta_length]))['fields']
+        self.capacity = int(self._header[1])
+        dtype = record_dtype(self.fields)
+        if len(self._map) < HEADER_SIZE + self.capacity * dtype.itemsize:
+            raise ValueError(f"Truncated segment file: {path}")
+        self._records = self._map[HEADER_SIZE:HEADER_SIZE + self.capacity * dtype.itemsize].view(dtype)
+        self.closed = False
+
+    @property
+    def count(self):
+        return 0 if self.closed else int(self._header[0])
+
+    @property
+    def records(self):
+        """Zero-copy view of the written records."""
+        return self._records[:self.count]
+
+    def append(self, timestamps, values):
+        """
+        Write as many records as fit.
+
+        Parameters:
+        - timestamps: int64 epoch nanoseconds, shape (n,).
+        - values: float64 array of shape (n, n_fields).
+
+        Returns:
+        - Number of records written.
+        """
+        count = self.count
+        n = min(len(timestamps), self.capacity - count)
+        if n > 0:
+            target = self._records[count:count + n]
+            target['time'] = timestamps[:n]
+            target['values'] = values[:n]
+            self._header[0] = count + n
+        return n
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def flush(self):
+        if not self.read_only:
+            self._map.flush()
+
+    def close(self):
+        # The mapping itself is released once no reader holds a view into it
+        if not self.closed:
+            self.flush()
+            self.closed = True
+
+
+class Recording:
+    """
+    Append-only on-disk history of one sensor in rolling segment files.
+
+    append() only queues the batch; a writer thread copies queued batches
+    into the current segment, starts a new segment when it is full and
+    deletes the oldest ones beyond max_segments. Queries slice the mapped
+    segments directly, so only the requested range is ever copied. If the
+    disk falls behind, at most max_pending records wait in the queue and the
+    overflow policy decides which ones are dropped, as in the dispatcher.
+
+    Only one process may write a directory: the writer holds a lock file
+    for as long as it is open. A read-only recording follows one that
+    another process writes: it never writes, and picks up the segments the
+    writer adds or deletes at each query.
+    """
+
+    def __init__(self, directory, fields, segment_records=DEFAULT_SEGMENT_RECORDS,
+                 max_segments=DEFAULT_MAX_SEGMENTS, flush_interval=1.0, read_only=False,
+                 max_pending=DEFAULT_MAX_PENDING, overflow=DROP_OLDEST):
+        """
+        Open or create a recording.
+
+        Parameters:
+        - directory: Directory holding this sensor's segment files.
+        - fields: Field names stored per record.
+        - segment_records: Records per segment file.
+        - max_segments: Segments kept; older ones are deleted. None keeps all.
+        - flush_interval: Seconds between flushes of written data to disk.
+        - read_only: Follow a recording another process writes, without writing.
+        - max_pending: Maximum number of records queued for the writer thread.
+        - overflow: DROP_OLDEST or DROP_NEWEST, which records to drop when the queue is full.
+
+        Raises:
+        - RuntimeError: If another process (or recording) already writes the directory.
+        """
+        if overflow not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"overflow must be {DROP_OLDEST!r} or {DROP_NEWEST!r}, got {overflow!r}")
+        self.directory = directory
+        self.fields = list(fields)
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.read_only = read_only
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.segments = []
+        self._lock = threading.Lock()  # Guards the segment list
+        self.running = True
+        if read_only:
+            self.thread = None
+            self._refresh()
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._lock_directory()
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.seg'))
+        for name in names:
+            try:
+                segment = self._open_segment(name)
+            except ValueError as e:
+                print(f"Skipping segment {name}: {e}")
+                continue
+            self.segments.append(segment)
+        # Number past skipped segments too, so a new segment never lands on one
+        indices = [int(name[:-4]) for name in names if name[:-4].isdigit()]
+        self._next_index = max(indices) + 1 if indices else 0
+        self._queue = deque()
+        self._queue_lock = threading.Lock()  # Guards the queue, pending, dropped and the queued states
+        self.pending = 0  # Records queued
+        self.dropped = 0  # Records dropped because the queue was full
+        self._dropping = False  # Dropping since the queue last emptied; warned once
+        self._states = {}  # {name: arrays} queued by save_state
+        self._wakeup = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='RecordingThread')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _lock_directory(self):
+        # Each writer numbers, rolls and deletes segments on its own, so two
+        # writers on one directory would corrupt each other's segments
+        if fcntl is None:
+            return None
+        lock_file = open(os.path.join(self.directory, LOCK_NAME), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(f"Recording in {self.directory} is already written by another process; "
+                               "run a single ingestion process and let the others follow it read-only")
+        return lock_file
+
+    def _open_segment(self, name):
+        segment = Segment(os.path.join(self.directory, name), read_only=self.read_only)
+        if segment.fields != self.fields:
+            segment.close()
+            raise ValueError(f"recorded fields {segment.fields} differ from {self.fields}")
+        return segment
+
+    def _refresh(self):
+        # Follow the writing process: open the segments it added, drop the ones it deleted
+        if not self.read_only:
+            return
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        except FileNotFoundError:
+            names = []
+        with self._lock:
+            current = {os.path.basename(segment.path): segment for segment in self.segments}
+            if list(current) == names:
+                return
+            segments = []
+            for name in names:
+                segment = current.pop(name, None)
+                if segment is None:
+                    try:
+                        segment = self._open_segment(name)
+                    except (OSError, ValueError):
+                        continue  # Still being created, or just deleted; retried at the next query
+                segments.append(segment)
+            for old in current.values():
+                old.close()
+            self.segments = segments
+
+    def append(self, timestamps, values):
+        """
+        Queue a batch for writing.
+
+        Parameters:
+        - timestamps: int64 epoch nanoseconds, shape (n,).
+        - values: float64 array of shape (n, n_fields).
+        """
+        if self.read_only:
+            raise ValueError(f"Recording in {self.directory} is read-only")
+        count = len(timestamps)
+        if not count:
+            return
+        with self._queue_lock:
+            excess = self.pending + count - self.max_pending
+            if excess > 0:
+                if not self._dropping:
+                    print(f"Recording in {self.directory} is falling behind; dropping records")
+                    self._dropping = True
+                if self.overflow == DROP_NEWEST:
+                    self.dropped += count
+                    return
+                while excess > 0 and self._queue:
+                    old_timestamps, _ = self._queue.popleft()
+                    self.pending -= len(old_timestamps)
+                    self.dropped += len(old_timestamps)
+                    excess -= len(old_timestamps)
+                if count > self.max_pending:
+                    self.dropped += count - self.max_pending
+                    timestamps, values = timestamps[-self.max_pending:], values[-self.max_pending:]
+                    count = self.max_pending
+            self._queue.append((timestamps, values))
+            self.pending += count
+        self._wakeup.set()
+
+    def stats(self):
+        """
+        Get the writer queue counters.
+
+        Returns:
+        - Dictionary with pending (records queued) and dropped (records
+          dropped because the queue was full).
+        """
+        if self.read_only:
+            return {'pending': 0, 'dropped': 0}
+        with self._queue_lock:
+            return {'pending': self.pending, 'dropped': self.dropped}
+
+    def save_state(self, name, arrays):
+        """
+        Save arrays next to the segments as '<name>.npz', e.g. derived data
+        that is expensive to rebuild from the records.
+
+        The file is written by the writer thread after the records queued
+        before it, and replaced atomically; a later call for the same name
+        that comes before the write replaces the queued arrays.
+
+        Parameters:
+        - name: File name without extension.
+        - arrays: Dictionary of {key: array}.
+        """
+        if self.read_only:
+            raise ValueError(f"Recording in {self.directory} is read-only")
+        with self._queue_lock:
+            self._states[name] = arrays
+        self._wakeup.set()
+
+    def load_state(self, name):
+        """
+        Load arrays saved with save_state.
+
+        Parameters:
+        - name: File name without extension.
+
+        Returns:
+        - Dictionary of {key: array}, or None if nothing readable was saved.
+        """
+        path = os.path.join(self.directory, f'{name}.npz')
+        try:
+            with np.load(path) as data:
+                return {key: data[key] for key in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Ignoring unreadable {path}: {e}")
+            return None
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while self.running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._write_pending()
+            if self.segments and time.monotonic() - last_flush >= self.flush_interval:
+                self.segments[-1].flush()
+                last_flush = time.monotonic()
+        # Closed: write what is still queued before giving up the segments and the directory
+        self._write_pending()
+        self._close_segments()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def _write_pending(self):
+        while True:
+            with self._queue_lock:
+                if not self._queue:
+                    self._dropping = False
+                    states, self._states = self._states, {}
+                    break
+                timestamps, values = self._queue.popleft()
+                self.pending -= len(timestamps)
+            try:
+                while len(timestamps):
+                    if not self.segments or self.segments[-1].full:
+                        self._roll()
+                    written = self.segments[-1].append(timestamps, values)
+                    timestamps, values = timestamps[written:], values[written:]
+            except OSError as e:
+                print(f"Error writing recording in {self.directory}: {e}")
+        for name, arrays in states.items():
+            path = os.path.join(self.directory, f'{name}.npz')
+            try:
+                with open(f'{path}.tmp', 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(f'{path}.tmp', path)
+            except OSError as e:
+                print(f"Error saving {path}: {e}")
+
+    def _roll(self):
+        if self.segments:
+            self.segments[-1].flush()
+        path = os.path.join(self.directory, f'{self._next_index:08d}.seg')
+        self._next_index += 1
+        segment = Segment(path, self.fields, self.segment_records)
+        with self._lock:
+            self.segments.append(segment)
+            expired = []
+            if self.max_segments is not None:
+                while len(self.segments) > self.max_segments:
+                    expired.append(self.segments.pop(0))
+        for old in expired:
+            old.close()
+            os.remove(old.path)
+
+    def iter_window(self, start=None, end=None):
+        """
+        Iterate over the records within a time range, one zero-copy chunk per segment.
+
+        Parameters:
+        - start: int64 epoch nanoseconds, or None for no lower bound.
+        - end: int64 epoch nanoseconds, or None for no upper bound.
+
+        Yields:
+        - (timestamps, values): Views into the mapped segment, shapes (m,) and (m, n_fields).
+        """
+        self._refresh()
+        with self._lock:
+            segments = list(self.segments)
+        for segment in segments:
+            records = segment.records
+            if not len(records):
+                continue
+            timestamps = records['time']
+            if (end is not None and timestamps[0] > end) or (start is not None and timestamps[-1] < start):
+                continue
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(records) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+            if hi > lo:
+                yield timestamps[lo:hi], records['values'][lo:hi]
+
+    def window(self, start=None, end=None):
+        """
+        Get the records within a time range as arrays.
+
+        Parameters:
+        - start: int64 epoch nanoseconds, or None for no lower bound.
+        - end: int64 epoch nanoseconds, or None for no upper bound.
+
+        Returns:
+        - (timestamps, values): Arrays of shape (m,) and (n_fields, m), as RingBuffer.window.
+        """
+        chunks = list(self.iter_window(start, end))
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty((len(self.fields), 0))
+        if len(chunks) == 1:
+            timestamps, values = chunks[0]
+            return timestamps, values.T
+        return (np.concatenate([timestamps for timestamps, _ in chunks]),
+                np.concatenate([values for _, values in chunks]).T)
+
+    def count_window(self, start=None, end=None):
+        """Number of records within a time range."""
+        return sum(len(timestamps) for timestamps, _ in self.iter_window(start, end))
+
+    def latest(self, n):
+        """
+        Get the most recent records.
+
+        Parameters:
+        - n: Maximum number of records.
+
+        Returns:
+        - (timestamps, values): Arrays of shape (m,) and (m, n_fields), oldest first.
+        """
+        self._refresh()
+        with self._lock:
+            segments = list(self.segments)
+        chunks = []
+        for segment in reversed(segments):
+            if n <= 0:
+                break
+            records = segment.records[-n:]
+            chunks.append(records)
+            n -= len(records)
+        records = np.concatenate(chunks[::-1]) if chunks else np.empty(0, dtype=record_dtype(self.fields))
+        return records['time'], records['values']
+
+    def oldest(self):
+        """Time of the oldest record in epoch nanoseconds, or None if empty."""
+        self._refresh()
+        with self._lock:
+            for segment in self.segments:
+                if segment.count:
+                    return int(segment.records['time'][0])
+        return None
+
+    def close(self, timeout=5):
+        """
+        Write everything still queued, flush and close the segments.
+
+        The writer thread does this as it exits. If it has not finished
+        within timeout seconds (e.g. on a stalled disk), it is left to
+        finish in the background.
+
+        Parameters:
+        - timeout: Seconds to wait for the writer thread.
+        """
+        if not self.running:
+            return
+        self.running = False
+        if self.thread is None:
+            self._close_segments()
+            return
+        self._wakeup.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"Recording in {self.directory} is still writing; it closes once the queue is written")
+
+    def _close_segments(self):
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
@@ -0,0 +1,203 @@
+import threading
+import numpy as np
+
+DEFAULT_CAPACITY = 100_000
+
+
+class RingBuffer:
+    """
+    Fixed-capacity columnar sample store.
+
+    Holds an int64 timestamp column and one float64 column per field. Once
+    full, each new sample overwrites the oldest one, so memory use is constant.
+
+    Each appended sample gets a sequence number, starting at 0 and never
+    reused, so readers can ask for just the samples added since their last read.
+
+    Every row is written twice, at index i and i + capacity. That keeps the
+    retained rows contiguous in the doubled arrays no matter where the write
+    head is, so reads copy plain slices instead of stitching two halves.
+    Reads copy under the lock and return arrays the caller owns.
+    """
+
+    def __init__(self, fields, capacity=DEFAULT_CAPACITY):
+        """
+        Initialize the ring buffer.
+
+        Parameters:
+        - fields: List of field names, one float64 column each.
+        - capacity: Maximum number of samples retained.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.fields = list(fields)
+        self.capacity = int(capacity)
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._values = np.zeros((len(self.fields), 2 * self.capacity), dtype=np.float64)
+        self._row = np.zeros(len(self.fields), dtype=np.float64)  # Scratch row for appends
+        self._head = 0  # Next write index in [0, capacity)
+        self._size = 0
+        self._sequence = 0  # Sequence number of the next sample
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """Memory held by the sample arrays in bytes."""
+        return self._timestamps.nbytes + self._values.nbytes
+
+    @property
+    def sequence(self):
+        """Sequence number the next appended sample will get (total samples appended)."""
+        return self._sequence
+
+    def append(self, timestamp, values):
+        """
+        Append one sample, overwriting the oldest one when full.
+
+        Parameters:
+        - timestamp: int64 epoch nanoseconds.
+        - values: Sequence with one value per field (anything float() accepts).
+
+        Raises:
+        - ValueError: If the number of values does not match the fields or a
+          value cannot be converted to float.
+        """
+        if len(values) != len(self.fields):
+            raise ValueError(f"expected {len(self.fields)} values, got {len(values)}")
+        with self._lock:
+            # Convert into the scratch row first so a bad value leaves the buffer untouched
+            self._row[:] = values
+            head = self._head
+            mirror = head + self.capacity
+            self._timestamps[head] = timestamp
+            self._timestamps[mirror] = timestamp
+            self._values[:, head] = self._row
+            self._values[:, mirror] = self._row
+            self._head = head + 1 if head + 1 < self.capacity else 0
+            if self._size < self.capacity:
+                self._size += 1
+            self._sequence += 1
+
+    def extend(self, timestamps, values):
+        """
+        Append a batch of samples, overwriting the oldest ones when full.
+
+        Parameters:
+        - timestamps: int64 epoch nanoseconds, shape (n,).
+        - values: Array of shape (n, n_fields).
+
+        Raises:
+        - ValueError: If the shapes do not match.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        count = len(timestamps)
+        if values.shape != (count, len(self.fields)):
+            raise ValueError(f"expected values of shape ({count}, {len(self.fields)}), got {values.shape}")
+        with self._lock:
+            self._sequence += count
+            if count > self.capacity:
+                # Only the newest `capacity` rows would survive anyway
+                timestamps = timestamps[-self.capacity:]
+                values = values[-self.capacity:]
+                count = self.capacity
+            head = self._head
+            # Write in at most two runs: up to the end of the ring, then from its start
+            first = min(count, self.capacity - head)
+            for src, dst in ((slice(0, first), head), (slice(first, count), 0)):
+                n = src.stop - src.start
+                if n == 0:
+                    continue
+                for offset in (dst, dst + self.capacity):
+                    self._timestamps[offset:offset + n] = timestamps[src]
+                    self._values[:, offset:offset + n] = values[src].T
+            self._head = (head + count) % self.capacity
+            self._size = min(self._size + count, self.capacity)
+
+    def oldest(self):
+        """Timestamp of the oldest retained sample in epoch nanoseconds, or None if empty."""
+        with self._lock:
+            if not self._size:
+                return None
+            return int(self._timestamps[self._head + self.capacity - self._size])
+
+    def snapshot(self):
+        """
+        Get all retained samples in time order.
+
+        Returns:
+        - (timestamps, values): int64 array of shape (n,) and float64 array of
+          shape (n_fields, n), copied while holding the lock.
+        """
+        with self._lock:
+            end = self._head + self.capacity
+            return self._copy(end - self._size, end)
+
+    def read_since(self, sequence):
+        """
+        Get the samples appended since a given sequence number.
+
+        If some of those samples were already overwritten, reading starts at
+        the oldest retained sample. A cursor that is ahead of the buffer (e.g.
+        one kept across a restart) is treated as a fresh read.
+
+        Parameters:
+        - sequence: Sequence number of the first wanted sample, typically the
+          cursor returned by the previous call. None reads everything.
+
+        Returns:
+        - (timestamps, values, cursor): Copies as in snapshot(), plus the cursor
+          to pass to the next call.
+        """
+        with self._lock:
+            oldest = self._sequence - self._size
+            if sequence is None or sequence > self._sequence:
+                sequence = oldest
+            count = self._sequence - max(sequence, oldest)
+            end = self._head + self.capacity
+            timestamps, values = self._copy(end - count, end)
+            return timestamps, values, self._sequence
+
+    def window(self, start=None, end=None):
+        """
+        Get the samples with start <= timestamp <= end.
+
+        Samples are appended in time order, so the bounds are found with a
+        binary search and the cost does not depend on how much history is kept.
+
+        Parameters:
+        - start: int64 epoch nanoseconds, or None for the oldest sample.
+        - end: int64 epoch nanoseconds, or None for the newest sample.
+
+        Returns:
+        - (timestamps, values): Copies as in snapshot().
+        """
+        with self._lock:
+            last = self._head + self.capacity
+            first = last - self._size
+            timestamps = self._timestamps[first:last]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = self._size if end is None else int(np.searchsorted(timestamps, end, side='right'))
+            return self._copy(first + lo, first + max(lo, hi))
+
+    def _copy(self, start, end):
+        # Reads copy while the caller holds the lock: once the buffer is full,
+        # the oldest retained row is the next one an append overwrites
+        return self._timestamps[start:end].copy(), self._values[:, start:end].copy()
+
+    def clear(self, sequence=None):
+        """
+        Remove all samples.
+
+        Parameters:
+        - sequence: Sequence number for the next appended sample, e.g. to keep
+          a derived buffer's numbering in step with its source. None keeps counting.
+        """
+        with self._lock:
+            self._head = 0
+            self._size = 0
+            if sequence is not None:
+                self._sequence = int(sequence)
@@ -0,0 +1,298 @@
+import json
+import threading
+import numpy as np
+from .ring_buffer import RingBuffer
+
+# (bucket width in seconds, buckets kept): 1 day of 1 s, 1 week of 10 s,
+# 30 days of 1 min and 1 year of 10 min buckets. A preset for sensors that
+# opt in; see tiers_nbytes for what it costs.
+DEFAULT_TIERS = ((1, 86_400), (10, 60_480), (60, 43_200), (600, 52_560))
+
+STATS = ('min', 'max', 'mean')
+
+
+def tiers_nbytes(n_fields, tiers):
+    """
+    Memory a RollupPyramid allocates up front.
+
+    Each bucket holds a timestamp plus min, max and mean per field and a
+    count, and like every RingBuffer row it is stored twice.
+
+    Parameters:
+    - n_fields: Number of fields (channels) rolled up.
+    - tiers: Sequence of (bucket width in seconds, buckets kept).
+
+    Returns:
+    - Size in bytes.
+    """
+    return sum(capacity for _, capacity in tiers) * 2 * 8 * (1 + len(STATS) * n_fields + 1)
+
+
+class RollupTier:
+    """
+    Fixed-width time buckets with min/max/mean/count per field.
+
+    Closed buckets are kept in a RingBuffer with the bucket start as the
+    timestamp and columns '<field>_min', '<field>_max', '<field>_mean' and
+    'count'. The bucket currently being filled is kept separately and updated
+    in place as samples arrive.
+    """
+
+    def __init__(self, fields, width_seconds, capacity):
+        """
+        Initialize the tier.
+
+        Parameters:
+        - fields: List of field names.
+        - width_seconds: Bucket width in seconds.
+        - capacity: Number of closed buckets retained.
+        """
+        self.fields = list(fields)
+        self.width_seconds = width_seconds
+        self.width_ns = int(width_seconds * 1e9)
+        columns = [f'{field}_{stat}' for field in self.fields for stat in STATS] + ['count']
+        self.buffer = RingBuffer(columns, capacity)
+        n_fields = len(self.fields)
+        self._open_bucket = None  # Index (timestamp // width_ns) of the bucket being filled
+        self._min = np.empty(n_fields)
+        self._max = np.empty(n_fields)
+        self._sum = np.empty(n_fields)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def extend(self, timestamps, values):
+        """
+        Fold a batch of samples into the buckets.
+
+        Parameters:
+        - timestamps: int64 epoch nanoseconds, shape (n,), in time order.
+        - values: float64 array of shape (n, n_fields).
+        """
+        if not len(timestamps):
+            return
+        buckets = timestamps // self.width_ns
+        # Runs of consecutive samples that fall in the same bucket
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        counts = np.diff(np.append(starts, len(buckets)))
+        run_buckets = buckets[starts]
+        mins = np.minimum.reduceat(values, starts, axis=0)
+        maxs = np.maximum.reduceat(values, starts, axis=0)
+        sums = np.add.reduceat(values, starts, axis=0)
+
+        with self._lock:
+            closed = []
+            first = 0
+            if self._open_bucket is not None:
+                if run_buckets[0] == self._open_bucket:
+                    np.minimum(self._min, mins[0], out=self._min)
+                    np.maximum(self._max, maxs[0], out=self._max)
+                    self._sum += sums[0]
+                    self._count += counts[0]
+                    first = 1
+                if first < len(starts):
+                    closed.append(self._open_row())
+            if first < len(starts):
+                # Every run but the last is complete; the last one becomes the open bucket
+                last = len(starts) - 1
+                if first < last:
+                    closed.append(self._rows(run_buckets[first:last], mins[first:last], maxs[first:last],
+                                             sums[first:last], counts[first:last]))
+                self._open_bucket = int(run_buckets[last])
+                self._min[:] = mins[last]
+                self._max[:] = maxs[last]
+                self._sum[:] = sums[last]
+                self._count = int(counts[last])
+            if closed:
+                timestamps = np.concatenate([bucket_times for bucket_times, _ in closed])
+                rows = np.concatenate([rows for _, rows in closed])
+                self.buffer.extend(timestamps, rows)
+
+    def _rows(self, buckets, mins, maxs, sums, counts):
+        counts = np.asarray(counts, dtype=np.float64).reshape(-1, 1)
+        stats = np.stack([mins, maxs, sums / counts], axis=2).reshape(len(counts), -1)
+        return np.asarray(buckets, dtype=np.int64) * self.width_ns, np.hstack([stats, counts])
+
+    def _open_row(self):
+        return self._rows([self._open_bucket], self._min[None, :], self._max[None, :],
+                          self._sum[None, :], [self._count])
+
+    def window(self, start=None, end=None):
+        """
+        Get the buckets starting within a time range, including the open bucket.
+
+        Parameters:
+        - start: int64 epoch nanoseconds, or None for no lower bound.
+        - end: int64 epoch nanoseconds, or None for no upper bound.
+
+        Returns:
+        - (timestamps, values): Bucket start times, shape (m,), and an array of
+          shape (n_columns, m) ordered as buffer.fields.
+        """
+        with self._lock:
+            timestamps, values = self.buffer.window(start, end)
+            if self._open_bucket is None:
+                return timestamps, values
+            open_time, open_row = self._open_row()
+        if (start is not None and open_time[0] < start) or (end is not None and open_time[0] > end):
+            return timestamps, values
+        return np.append(timestamps, open_time), np.hstack([values, open_row.T])
+
+    def state(self):
+        """
+        Copy the tier's buckets, for RollupPyramid.state.
+
+        Returns:
+        - (timestamps, values, open_state, open_stats): The closed buckets as in
+          window(), [has open bucket, open bucket index, count] and the open
+          bucket's min, max and sum per field.
+        """
+        with self._lock:
+            timestamps, values = self.buffer.snapshot()
+            has_open = self._open_bucket is not None
+            open_state = np.array([has_open, self._open_bucket if has_open else 0, self._count], dtype=np.int64)
+            return timestamps, values, open_state, np.stack([self._min, self._max, self._sum])
+
+    def restore(self, timestamps, values, open_state, open_stats):
+        """Replace the tier's buckets with ones from state()."""
+        with self._lock:
+            self.buffer.clear()
+            self.buffer.extend(timestamps[-self.buffer.capacity:], values.T[-self.buffer.capacity:])
+            self._open_bucket = int(open_state[1]) if open_state[0] else None
+            self._count = int(open_state[2])
+            self._min[:], self._max[:], self._sum[:] = open_stats
+
+    def oldest(self):
+        """Start time of the oldest bucket in epoch nanoseconds, or None if empty."""
+        with self._lock:
+            oldest = self.buffer.oldest()
+            if oldest is not None:
+                return oldest
+            if self._open_bucket is not None:
+                return self._open_bucket * self.width_ns
+        return None
+
+
+class RollupPyramid:
+    """
+    A stack of rollup tiers, from the finest to the coarsest bucket width,
+    all updated incrementally from the same samples.
+    """
+
+    def __init__(self, fields, tiers=DEFAULT_TIERS):
+        """
+        Initialize the pyramid.
+
+        Parameters:
+        - fields: List of field names.
+        - tiers: Sequence of (bucket width in seconds, buckets kept).
+        """
+        self.tiers = [RollupTier(fields, width, capacity) for width, capacity in sorted(tiers)]
+        self.first_timestamp = None  # Time of the first sample ever folded in
+        self.last_timestamp = None  # Time of the last sample folded in
+
+    def extend(self, timestamps, values):
+        if not len(timestamps):
+            return
+        if self.first_timestamp is None:
+            self.first_timestamp = int(timestamps[0])
+        for tier in self.tiers:
+            tier.extend(timestamps, values)
+        self.last_timestamp = int(timestamps[-1])
+
+    @property
+    def nbytes(self):
+        """Memory held by the tiers' buffers in bytes."""
+        return sum(tier.buffer.nbytes for tier in self.tiers)
+
+    @property
+    def span_ns(self):
+        """Longest time any tier retains, in nanoseconds."""
+        return max((tier.width_ns * tier.buffer.capacity for tier in self.tiers), default=0)
+
+    def _description(self):
+        # Identifies the layout a saved state fits
+        return json.dumps({'fields': self.tiers[0].fields if self.tiers else [],
+                           'tiers': [[tier.width_seconds, tier.buffer.capacity] for tier in self.tiers]})
+
+    def state(self):
+        """
+        Copy the pyramid's contents, e.g. to save them with numpy.savez so
+        they need not be rebuilt from every recorded sample after a restart.
+
+        Returns:
+        - Dictionary of {key: array} for restore(), or None if nothing was folded in yet.
+        """
+        if self.last_timestamp is None:
+            return None
+        state = {'layout': np.array(self._description()),
+                 'times': np.array([self.first_timestamp, self.last_timestamp], dtype=np.int64)}
+        for index, tier in enumerate(self.tiers):
+            for key, array in zip(('timestamps', 'values', 'open', 'open_stats'), tier.state()):
+                state[f'{index}.{key}'] = array
+        return state
+
+    def restore(self, state):
+        """
+        Replace the pyramid's contents with a state().
+
+        Parameters:
+        - state: Dictionary from state().
+
+        Returns:
+        - True if restored, False if the state is for different fields or tiers.
+        """
+        try:
+            if str(state['layout']) != self._description():
+                return False
+            for index, tier in enumerate(self.tiers):
+                tier.restore(*(state[f'{index}.{key}'] for key in ('timestamps', 'values', 'open', 'open_stats')))
+        except (KeyError, ValueError) as e:
+            print(f"Ignoring saved rollups: {e}")
+            return False
+        self.first_timestamp, self.last_timestamp = (int(t) for t in state['times'])
+        return True
+
+    def oldest(self):
+        """Earliest time still covered by the coarsest tier, or None if empty."""
+        oldest = self.tiers[-1].oldest() if self.tiers else None
+        if oldest is None:
+            return None
+        return max(oldest, self.first_timestamp)
+
+    def covers(self, tier, start):
+        """Whether a tier still holds the bucket containing start."""
+        oldest = tier.oldest()
+        return oldest is not None and oldest <= max(start, self.first_timestamp)
+
+    def select(self, start, end, min_points):
+        """
+        Pick the coarsest tier that still has at least min_points buckets
+        across a time range and holds data back to its start.
+
+        Parameters:
+        - start: int64 epoch nanoseconds.
+        - end: int64 epoch nanoseconds.
+        - min_points: Minimum number of buckets wanted across the range.
+
+        Returns:
+        - RollupTier, or None if even the finest tier is too coarse.
+        """
+        for tier in reversed(self.tiers):
+            if (end - start) / tier.width_ns >= min_points and self.covers(tier, start):
+                return tier
+        return None
+
+    def finest_covering(self, start):
+        """
+        Get the finest tier that still holds data back to start.
+
+        Parameters:
+        - start: int64 epoch nanoseconds.
+
+        Returns:
+        - RollupTier, or None if no tier reaches back that far.
+        """
+        for tier in self.tiers:
+            if self.covers(tier, start):
+                return tier
+        return None
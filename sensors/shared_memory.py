@@ -0,0 +1,554 @@
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+from types import SimpleNamespace
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: a second writer is not detected
+    fcntl = None
+from .ring_buffer import RingBuffer
+from .rollup import RollupTier, RollupPyramid, STATS
+from .metrics import Histogram
+
+MAGIC = b'SENSSHM1'
+HEADER_SIZE = 64  # Magic, layout digest, sequence lock
+ALIGNMENT = 64  # Arrays start on cache line boundaries
+DEFAULT_PREFIX = 'sensor-gui-'
+STATS_NAME = 'stats'  # Block of the ingestion process's communication counters, after the prefix
+STATS_BYTES = 1 << 20
+POLL_INTERVAL = 0.02  # Seconds between checks for new samples in a block written by another process
+READ_RETRY_SECONDS = 0.1  # How long readers retry a read overlapped by writes before taking it as is
+
+
+class SharedBlock:
+    """
+    A named shared memory block holding a fixed set of NumPy arrays.
+
+    One process creates the block and writes to it, holding an exclusive
+    lock on it so a second writer fails to start; any number of processes
+    attach to it by name and get the arrays as read-only views. A sequence
+    lock in the header lets readers detect writes that overlap a read: the
+    writer makes the counter odd while it writes and even again afterwards,
+    and readers retry until they see the same even value before and after.
+
+    Blocks outlive the processes using them. A writer that finds a block
+    with the same layout reuses it, so restarting the ingestion process keeps
+    the samples in memory and readers stay attached; unlink() removes it.
+    """
+
+    def __init__(self, name, layout, create=False, timeout=0, meta=None):
+        """
+        Create or attach to a block.
+
+        Parameters:
+        - name: Block name, shared by the writer and the readers.
+        - layout: List of (key, shape, dtype) of the arrays in the block.
+        - create: Create the block, or reuse one with the same layout, and
+          write to it. False attaches read-only to an existing block.
+        - timeout: Seconds to wait for the block to appear when attaching.
+        - meta: JSON-serializable description (e.g. field names) that must
+          match between the writer and the readers, like the layout.
+
+        Raises:
+        - FileNotFoundError: If the block does not appear within timeout.
+        - ValueError: If the block's layout differs from the expected one.
+        - RuntimeError: If create is set and another process writes the block.
+        """
+        self.name = name
+        self.read_only = not create
+        description = [[key, [int(n) for n in np.atleast_1d(shape)], np.dtype(dtype).str] for key, shape, dtype in layout]
+        self._digest = hashlib.sha1(json.dumps([description, meta]).encode()).digest()[:8]
+        offsets = []
+        size = HEADER_SIZE
+        for key, shape, dtype in layout:
+            offsets.append(size)
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // ALIGNMENT) * ALIGNMENT
+        self.size = size
+        self.shm = self._create() if create else self._attach(timeout)
+        self._memory = np.ndarray((self.size,), dtype=np.uint8, buffer=self.shm.buf)
+        self._seqlock = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=16)
+        self._write_depth = 0
+        self.arrays = {}
+        for (key, shape, dtype), offset in zip(layout, offsets):
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            array.flags.writeable = create
+            self.arrays[key] = array
+
+    def _create(self):
+        try:
+            shm = self._open(create=False)
+        except FileNotFoundError:
+            shm = None
+        if shm is not None:
+            self._lock_writer(shm)
+            if shm.size >= self.size and bytes(shm.buf[:16]) == MAGIC + self._digest:
+                # Left by a previous run with the same layout: keep its samples.
+                # Clear the lock in case that run died in the middle of a write.
+                np.ndarray((1,), dtype=np.int64, buffer=shm.buf, offset=16)[0] &= ~1
+                return shm
+            print(f"Replacing shared memory block {self.name} with a different layout")
+            shm.close()
+            _unlink(shm)
+        shm = self._open(create=True)
+        self._lock_writer(shm)
+        shm.buf[8:16] = self._digest
+        shm.buf[:8] = MAGIC  # Last, so readers never attach to a half-initialized block
+        return shm
+
+    def _lock_writer(self, shm):
+        # Two writers would interleave appends and corrupt the sequence lock.
+        # The lock is held until the block is closed or the process exits.
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(shm._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            shm.close()
+            raise RuntimeError(f"Shared memory block {self.name} is already written by another process; "
+                               "run only one ingestion process per prefix") from None
+
+    def _attach(self, timeout):
+        deadline = time.monotonic() + timeout
+        waiting = False
+        while True:
+            try:
+                shm = self._open(create=False)
+                if shm.size >= self.size and bytes(shm.buf[:8]) == MAGIC:
+                    break
+                shm.close()
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= deadline:
+                raise FileNotFoundError(f"Shared memory block {self.name} does not exist; is the ingestion process running?")
+            if not waiting:
+                print(f"Waiting for shared memory block {self.name}...")
+                waiting = True
+            time.sleep(0.5)
+        if bytes(shm.buf[8:16]) != self._digest:
+            shm.close()
+            raise ValueError(f"Shared memory block {self.name} was created for a different sensor configuration")
+        return shm
+
+    def _open(self, create):
+        shm = shared_memory.SharedMemory(name=self.name, create=create, size=self.size if create else 0)
+        # The block's lifetime is managed explicitly; stop the resource tracker
+        # from unlinking it when this process exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+    @contextmanager
+    def write(self):
+        """Mark the block as being written for the duration of the with-block."""
+        if self.read_only:
+            raise ValueError(f"Shared memory block {self.name} is attached read-only")
+        # Nested writes (a tier writing its buffer) keep the lock odd until the outermost one ends
+        if self._write_depth == 0:
+            self._seqlock[0] += 1
+        self._write_depth += 1
+        try:
+            yield
+        finally:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._seqlock[0] += 1
+
+    def read(self, function):
+        """
+        Call a function that reads the block, retrying it if a write overlapped it.
+
+        Arrays in the result that are views into the block are copied before
+        the sequence lock is checked again, so a returned array is never
+        changed by a later write.
+
+        Parameters:
+        - function: Callable without arguments that reads the arrays.
+
+        Returns:
+        - The function's result.
+        """
+        if not self.read_only:
+            return self._detach(function())  # The writing process orders its own reads with its locks
+        deadline = None
+        while True:
+            before = int(self._seqlock[0])
+            if not before & 1:
+                result = self._detach(function())
+                if int(self._seqlock[0]) == before:
+                    return result
+            if deadline is None:
+                deadline = time.monotonic() + READ_RETRY_SECONDS
+            elif time.monotonic() > deadline:
+                return self._detach(function())  # Don't wait forever on a writer that died mid-write
+            time.sleep(0)
+
+    def _detach(self, result):
+        # Copy the arrays (also inside tuples) that may share memory with the block
+        if isinstance(result, tuple):
+            return tuple(self._detach(item) for item in result)
+        if isinstance(result, np.ndarray) and np.may_share_memory(result, self._memory):
+            return result.copy()
+        return result
+
+    def close(self):
+        """Release this process's mapping once no array views into it remain."""
+        self.arrays = {}
+        self._memory = None
+        self._seqlock = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Views are still in use; the mapping is released with them
+
+    def unlink(self):
+        """Remove the block's name, so it is freed once every process has closed it."""
+        try:
+            _unlink(self.shm)
+        except FileNotFoundError:
+            pass
+
+
+def _unlink(shm):
+    # SharedMemory.unlink() also unregisters the name from the resource
+    # tracker, which _open already did; register it again to keep them paired
+    resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+
+
+def _state_slot(index):
+    # Property backed by one element of the shared '_state' array
+    def get(self):
+        return int(self._state[index])
+
+    def set(self, value):
+        self._state[index] = value
+    return property(get, set)
+
+
+class SharedRingBuffer(RingBuffer):
+    """
+    RingBuffer whose arrays and write position live in a SharedBlock.
+
+    Reads go through SharedBlock.read, so in an attached process they are
+    retried when the writer appended during them and return copies.
+    """
+
+    def __init__(self, block, key, fields, capacity):
+        """
+        Initialize the buffer on a block's arrays.
+
+        Parameters:
+        - block: SharedBlock whose layout includes layout(key, ...).
+        - key: Prefix of this buffer's array keys.
+        - fields: List of field names.
+        - capacity: Maximum number of samples retained.
+        """
+        # The storage comes from the block, so RingBuffer.__init__, which allocates it, is not called
+        self.block = block
+        self.fields = list(fields)
+        self.capacity = int(capacity)
+        self._state = block.arrays[f'{key}.state']  # [head, size, sequence]
+        self._timestamps = block.arrays[f'{key}.timestamps']
+        self._values = block.arrays[f'{key}.values']
+        self._row = np.zeros(len(self.fields), dtype=np.float64)
+        self._lock = threading.Lock()
+
+    _head = _state_slot(0)
+    _size = _state_slot(1)
+    _sequence = _state_slot(2)
+
+    @staticmethod
+    def layout(key, n_fields, capacity):
+        return [
+            (f'{key}.state', (3,), np.int64),
+            (f'{key}.timestamps', (2 * capacity,), np.int64),
+            (f'{key}.values', (n_fields, 2 * capacity), np.float64),
+        ]
+
+    def append(self, timestamp, values):
+        with self.block.write():
+            super().append(timestamp, values)
+
+    def extend(self, timestamps, values):
+        with self.block.write():
+            super().extend(timestamps, values)
+
+    def clear(self, sequence=None):
+        with self.block.write():
+            super().clear(sequence)
+
+    def snapshot(self):
+        return self.block.read(super().snapshot)
+
+    def read_since(self, sequence):
+        return self.block.read(lambda: RingBuffer.read_since(self, sequence))
+
+    def window(self, start=None, end=None):
+        return self.block.read(lambda: RingBuffer.window(self, start, end))
+
+    def oldest(self):
+        return self.block.read(super().oldest)
+
+
+class SharedRollupTier(RollupTier):
+    """RollupTier whose closed buckets and open bucket live in a SharedBlock."""
+
+    def __init__(self, block, key, fields, width_seconds, capacity):
+        """
+        Initialize the tier on a block's arrays.
+
+        Parameters:
+        - block: SharedBlock whose layout includes layout(key, ...).
+        - key: Prefix of this tier's array keys.
+        - fields: List of field names.
+        - width_seconds: Bucket width in seconds.
+        - capacity: Number of closed buckets retained.
+        """
+        # As in SharedRingBuffer, the block provides the storage RollupTier.__init__ would allocate
+        self.block = block
+        self.fields = list(fields)
+        self.width_seconds = width_seconds
+        self.width_ns = int(width_seconds * 1e9)
+        columns = [f'{field}_{stat}' for field in self.fields for stat in STATS] + ['count']
+        self.buffer = SharedRingBuffer(block, key, columns, capacity)
+        self._state = block.arrays[f'{key}.open']  # [has open bucket, bucket index, count]
+        self._min, self._max, self._sum = block.arrays[f'{key}.open_stats']
+        self._lock = threading.Lock()
+
+    _count = _state_slot(2)
+
+    @property
+    def _open_bucket(self):
+        return int(self._state[1]) if self._state[0] else None
+
+    @_open_bucket.setter
+    def _open_bucket(self, bucket):
+        self._state[1] = 0 if bucket is None else bucket
+        self._state[0] = bucket is not None
+
+    @staticmethod
+    def layout(key, n_fields, capacity):
+        return SharedRingBuffer.layout(key, n_fields * len(STATS) + 1, capacity) + [
+            (f'{key}.open', (3,), np.int64),
+            (f'{key}.open_stats', (3, n_fields), np.float64),
+        ]
+
+    def extend(self, timestamps, values):
+        with self.block.write():
+            super().extend(timestamps, values)
+
+    def restore(self, timestamps, values, open_state, open_stats):
+        with self.block.write():
+            super().restore(timestamps, values, open_state, open_stats)
+
+    def window(self, start=None, end=None):
+        return self.block.read(lambda: RollupTier.window(self, start, end))
+
+    def oldest(self):
+        return self.block.read(super().oldest)
+
+
+class SharedRollupPyramid(RollupPyramid):
+    """RollupPyramid made of SharedRollupTiers in one SharedBlock."""
+
+    def __init__(self, block, key, fields, tiers):
+        """
+        Initialize the pyramid on a block's arrays.
+
+        Parameters:
+        - block: SharedBlock whose layout includes layout(key, ...).
+        - key: Prefix of the pyramid's array keys.
+        - fields: List of field names.
+        - tiers: Sequence of (bucket width in seconds, buckets kept).
+        """
+        self.tiers = [SharedRollupTier(block, f'{key}.{index}', fields, width, capacity)
+                      for index, (width, capacity) in enumerate(sorted(tiers))]
+        self._first = block.arrays[f'{key}.first']  # [has first timestamp, first timestamp]
+        self.last_timestamp = None  # Only used by the writing process, see RollupPyramid.state
+
+    @property
+    def first_timestamp(self):
+        return int(self._first[1]) if self._first[0] else None
+
+    @first_timestamp.setter
+    def first_timestamp(self, timestamp):
+        self._first[1] = 0 if timestamp is None else timestamp
+        self._first[0] = timestamp is not None
+
+    @staticmethod
+    def layout(key, n_fields, tiers):
+        layout = [(f'{key}.first', (2,), np.int64)]
+        for index, (width, capacity) in enumerate(sorted(tiers)):
+            layout += SharedRollupTier.layout(f'{key}.{index}', n_fields, capacity)
+        return layout
+
+
+def sensor_storage(name, channels, capacity, rollup_tiers=None, create=False, timeout=0):
+    """
+    Create or attach to the shared memory block of one sensor.
+
+    Parameters:
+    - name: Block name.
+    - channels: Channel names stored per sample.
+    - capacity: Raw samples kept.
+    - rollup_tiers: Sequence of (bucket width in seconds, buckets kept), None for no rollups.
+    - create: Create (or reuse) and write the block; False attaches read-only.
+    - timeout: Seconds to wait for the block to appear when attaching.
+
+    Returns:
+    - (block, buffer, rollups): The SharedBlock, its SharedRingBuffer and
+      its SharedRollupPyramid (None without tiers).
+    """
+    layout = SharedRingBuffer.layout('raw', len(channels), capacity)
+    if rollup_tiers:
+        layout += SharedRollupPyramid.layout('rollups', len(channels), rollup_tiers)
+    block = SharedBlock(name, layout, create=create, timeout=timeout, meta={'channels': list(channels)})
+    buffer = SharedRingBuffer(block, 'raw', channels, capacity)
+    rollups = SharedRollupPyramid(block, 'rollups', channels, rollup_tiers) if rollup_tiers else None
+    return block, buffer, rollups
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def communication_stats(communication):
+    """
+    Collect the counters of a communication object (or each backend of a
+    CommunicationManager) in a JSON-serializable form.
+
+    Parameters:
+    - communication: The communication object.
+
+    Returns:
+    - Dictionary of {backend name: {port, dispatch, connection, ports, latency}}.
+    """
+    backends = getattr(communication, 'backends', None) or {'default': communication}
+    stats = {}
+    for name, backend in backends.items():
+        latency = backend.dispatcher.latency
+        stats[name] = {
+            'port': getattr(backend, 'port', ''),
+            'dispatch': backend.dispatch_stats(),
+            'connection': backend.connection_stats(),
+            'ports': backend.port_stats() if hasattr(backend, 'port_stats') else None,
+            'latency': {'bounds': latency.bounds.tolist(), 'counts': latency.counts.tolist(),
+                        'sum': latency.sum, 'count': latency.count},
+        }
+    return stats
+
+
+class SharedStats:
+    """A JSON document in a SharedBlock, published by one process and read by others."""
+
+    def __init__(self, name, create=False, timeout=0):
+        """
+        Create or attach to the block.
+
+        Parameters:
+        - name: Block name.
+        - create: Create the block to publish to; False attaches read-only.
+        - timeout: Seconds to wait for the block to appear when attaching.
+        """
+        self.block = SharedBlock(name, [('length', (1,), np.int64), ('data', (STATS_BYTES,), np.uint8)],
+                                 create=create, timeout=timeout)
+
+    def publish(self, document):
+        data = np.frombuffer(json.dumps(document, default=_json_value).encode(), dtype=np.uint8)
+        if len(data) > STATS_BYTES:
+            print(f"Stats of {len(data)} bytes do not fit in {self.block.name}")
+            return
+        with self.block.write():
+            self.block.arrays['data'][:len(data)] = data
+            self.block.arrays['length'][0] = len(data)
+
+    def read(self):
+        """The last published document, or None if nothing was published yet."""
+        def load():
+            length = int(self.block.arrays['length'][0])
+            return bytes(self.block.arrays['data'][:length])
+        data = self.block.read(load)
+        return json.loads(data) if data else None
+
+    def close(self):
+        self.block.close()
+
+
+class IngestClient:
+    """
+    Communication object of a process that only reads the shared memory an
+    ingestion process (ingest.py) writes.
+
+    Sensors register with it as with any communication object, but their
+    samples arrive through shared memory, so nothing is ever delivered. The
+    counters come from the ingestion process, which publishes them once a
+    second, so /metrics reports the real ports in every worker.
+    """
+
+    def __init__(self, prefix=DEFAULT_PREFIX, timeout=30):
+        """
+        Attach to the ingestion process's counters.
+
+        Parameters:
+        - prefix: Shared memory name prefix the ingestion process uses.
+        - timeout: Seconds to wait for the ingestion process to start.
+        """
+        self.prefix = prefix
+        self.stats = SharedStats(f'{prefix}{STATS_NAME}', timeout=timeout)
+
+    def register_callback(self, sensor_id, callback):
+        pass  # Samples arrive through shared memory
+
+    def register_batch_callback(self, sensor_id, callback, n_fields):
+        pass
+
+    def deregister_callback(self, sensor_id):
+        pass
+
+    def has_callback(self, sensor_id):
+        return False
+
+    @property
+    def backends(self):
+        """The ingestion process's backends, as {name: object with the backend's stats methods}."""
+        return {name: _PublishedBackend(stats) for name, stats in (self.stats.read() or {}).items()}
+
+    def dispatch_stats(self):
+        totals = {}
+        for backend in self.backends.values():
+            for name, value in backend.dispatch_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def connection_stats(self):
+        return {}
+
+    def close(self):
+        self.stats.close()
+
+
+class _PublishedBackend:
+    """Read-only stand-in for one backend of the ingestion process, built from its published stats."""
+
+    def __init__(self, stats):
+        self.port = stats['port']
+        self._stats = stats
+        latency = Histogram(stats['latency']['bounds'])
+        latency.counts = np.array(stats['latency']['counts'], dtype=np.int64)
+        latency.sum = stats['latency']['sum']
+        latency.count = stats['latency']['count']
+        self.dispatcher = SimpleNamespace(latency=latency)
+
+    def dispatch_stats(self):
+        return self._stats['dispatch']
+
+    def connection_stats(self):
+        return self._stats['connection']
+
+    def port_stats(self):
+        return self._stats['ports']
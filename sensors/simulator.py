@@ -0,0 +1,355 @@
+import argparse
+import errno
+import os
+import threading
+import time
+import tty
+from abc import ABC, abstractmethod
+import numpy as np
+from .communication import AsciiCodec, BinaryFrameCodec
+
+
+class Waveform(ABC):
+    """Signal of one field as a function of time, evaluated for many times at once."""
+
+    @abstractmethod
+    def values(self, t):
+        """
+        Evaluate the waveform.
+
+        Parameters:
+        - t: float64 array of seconds since the simulator started.
+
+        Returns:
+        - float64 array of values, same shape as t.
+        """
+
+    def __add__(self, other):
+        return Sum(self, other)
+
+
+class Constant(Waveform):
+    def __init__(self, value):
+        self.value = float(value)
+
+    def values(self, t):
+        return np.full(len(t), self.value)
+
+
+class Sine(Waveform):
+    def __init__(self, amplitude=1.0, frequency_hz=1.0, offset=0.0, phase=0.0):
+        """
+        offset + amplitude * sin(2 pi frequency t + phase).
+
+        Parameters:
+        - amplitude: Peak deviation from the offset.
+        - frequency_hz: Frequency in Hz.
+        - offset: Center value.
+        - phase: Phase in radians.
+        """
+        self.amplitude = amplitude
+        self.frequency_hz = frequency_hz
+        self.offset = offset
+        self.phase = phase
+
+    def values(self, t):
+        return self.offset + self.amplitude * np.sin(2 * np.pi * self.frequency_hz * t + self.phase)
+
+
+class Noise(Waveform):
+    def __init__(self, std=1.0, mean=0.0, seed=None):
+        """
+        Gaussian white noise.
+
+        Parameters:
+        - std: Standard deviation.
+        - mean: Mean value.
+        - seed: Random seed, for repeatable runs.
+        """
+        self.std = std
+        self.mean = mean
+        self.rng = np.random.default_rng(seed)
+
+    def values(self, t):
+        return self.rng.normal(self.mean, self.std, len(t))
+
+
+class Steps(Waveform):
+    def __init__(self, levels, period_s=10.0):
+        """
+        Cycles through constant levels, holding each for period_s seconds.
+
+        Parameters:
+        - levels: Sequence of values.
+        - period_s: Seconds per level.
+        """
+        self.levels = np.asarray(levels, dtype=np.float64)
+        self.period_s = period_s
+
+    def values(self, t):
+        return self.levels[(t // self.period_s).astype(np.int64) % len(self.levels)]
+
+
+class Sum(Waveform):
+    def __init__(self, *waveforms):
+        self.waveforms = waveforms
+
+    def values(self, t):
+        return sum(waveform.values(t) for waveform in self.waveforms)
+
+
+class SimulatedSensor:
+    def __init__(self, sensor_id, waveforms, rate_hz=100.0):
+        """
+        One simulated sensor.
+
+        Parameters:
+        - sensor_id: Sensor id written in each message.
+        - waveforms: One Waveform per field.
+        - rate_hz: Samples per second.
+        """
+        self.sensor_id = sensor_id
+        self.waveforms = list(waveforms)
+        self.rate_hz = float(rate_hz)
+        self.emitted = 0  # Samples generated so far
+
+    def generate(self, elapsed):
+        """
+        Generate the samples due up to a point in time.
+
+        Parameters:
+        - elapsed: Seconds since the simulator started.
+
+        Returns:
+        - (t, values): Sample times in seconds, shape (n,), and values of shape (n, n_fields).
+        """
+        due = int(elapsed * self.rate_hz)
+        t = np.arange(self.emitted, due) / self.rate_hz
+        self.emitted = max(due, self.emitted)
+        return t, np.column_stack([waveform.values(t) for waveform in self.waveforms])
+
+
+def default_sensors(rate_hz=100.0):
+    """
+    Simulated versions of the sensors in this package.
+
+    Parameters:
+    - rate_hz: Samples per second of each sensor.
+
+    Returns:
+    - List of SimulatedSensor.
+    """
+    return [
+        SimulatedSensor('TEMP_SENSOR', [Sine(2.0, 0.05, 22.0) + Noise(0.05)], rate_hz),
+        SimulatedSensor('PRESSURE_SENSOR', [Steps([1013.25, 1005.0, 1020.0], 10.0) + Noise(0.2)], rate_hz),
+        SimulatedSensor('ACCEL_SENSOR', [Sine(0.5, 2.0) + Noise(0.02), Sine(0.5, 2.0, phase=np.pi / 2) + Noise(0.02),
+                                         Constant(9.81) + Noise(0.02)], rate_hz),
+    ]
+
+
+def generated_sensors(count, n_fields=1, rate_hz=100.0, prefix='SIM_SENSOR'):
+    """
+    Additional sensors named '<prefix>_<n>', each field a sine plus noise.
+
+    Parameters:
+    - count: Number of sensors.
+    - n_fields: Fields per sensor.
+    - rate_hz: Samples per second of each sensor.
+    - prefix: Sensor id prefix.
+
+    Returns:
+    - List of SimulatedSensor.
+    """
+    return [
+        SimulatedSensor(f'{prefix}_{index}',
+                        [Sine(1.0, 0.1 * (index + 1), float(field), phase=field) + Noise(0.05) for field in range(n_fields)],
+                        rate_hz)
+        for index in range(1, count + 1)
+    ]
+
+
+class SerialSimulator:
+    """
+    Emits simulated sensor messages on a pseudo-terminal.
+
+    The pty's slave end behaves like a serial device, so PySerialCommunication
+    reads it unchanged through the real byte path and codec. A stable symlink
+    can be given as the port name; disconnect() closes the pty and opens a new
+    one behind the same link to exercise the reader's reconnect logic.
+
+    If the reader stops draining the pty, output beyond max_pending bytes is
+    dropped, like a device whose transmit buffer overflows.
+    """
+
+    def __init__(self, sensors=None, codec=None, link=None, tick=0.01, max_pending=1 << 20):
+        """
+        Create the pty and start emitting.
+
+        Parameters:
+        - sensors: List of SimulatedSensor, defaults to default_sensors().
+        - codec: Codec for the wire format, AsciiCodec by default.
+        - link: Path of a symlink to the pty's slave device, e.g. '/tmp/ttySIM0'.
+        - tick: Seconds between writes; each write carries all samples due.
+        - max_pending: Bytes buffered while the pty is full before output is dropped.
+        """
+        self.sensors = sensors if sensors is not None else default_sensors()
+        self.codec = codec or AsciiCodec()
+        self.link = link
+        self.tick = tick
+        self.max_pending = max_pending
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.samples_emitted = 0
+        self._master = None
+        self._slave = None
+        self._pending = b''
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.open()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='SimulatorThread')
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def aggregate_rate_hz(self):
+        return sum(sensor.rate_hz for sensor in self.sensors)
+
+    @property
+    def port(self):
+        """Port name to give PySerialCommunication: the symlink, or the slave device."""
+        return self.link or self.device
+
+    def open(self):
+        """Open a new pty pair, pointing the symlink at its slave end."""
+        with self._lock:
+            master, slave = os.openpty()
+            tty.setraw(slave)  # No echo or newline translation, like a real serial device
+            os.set_blocking(master, False)
+            self._master, self._slave = master, slave
+            self.device = os.ttyname(slave)
+            self._pending = b''
+            if self.link:
+                temporary = f'{self.link}.tmp'
+                if os.path.lexists(temporary):
+                    os.remove(temporary)
+                os.symlink(self.device, temporary)
+                os.replace(temporary, self.link)
+
+    def close_pty(self):
+        with self._lock:
+            for fd in (self._master, self._slave):
+                if fd is not None:
+                    os.close(fd)
+            self._master = self._slave = None
+
+    def disconnect(self, duration=1.0):
+        """
+        Simulate unplugging the device for a while.
+
+        The reader sees an I/O error and the port disappears; after duration
+        seconds a new pty is opened behind the same link. Samples due meanwhile
+        are discarded.
+
+        Parameters:
+        - duration: Seconds until the device comes back.
+        """
+        self.close_pty()
+        if self.link and os.path.lexists(self.link):
+            os.remove(self.link)
+        self._stop.wait(duration)
+        if self.running:
+            self.open()
+
+    def run(self):
+        start = time.monotonic()
+        while not self._stop.wait(self.tick):
+            self.emit(time.monotonic() - start)
+
+    def emit(self, elapsed):
+        """
+        Encode and write every sample due up to a point in time.
+
+        Parameters:
+        - elapsed: Seconds since the simulator started.
+        """
+        times, messages = [], []
+        for sensor in self.sensors:
+            t, values = sensor.generate(elapsed)
+            times.append(t)
+            sensor_id = sensor.sensor_id
+            messages.extend((sensor_id, row) for row in np.round(values, 4).tolist())
+        if not messages:
+            return
+        order = np.argsort(np.concatenate(times), kind='stable')  # Interleave sensors by sample time
+        encode = self.codec.encode
+        data = b''.join([encode(*messages[index]) for index in order.tolist()])
+        self.samples_emitted += len(messages)
+        with self._lock:
+            if self._master is None:
+                self.bytes_dropped += len(data)
+                return
+            self._pending += data
+            try:
+                written = os.write(self._master, self._pending)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EIO):
+                    raise
+                written = 0
+            self.bytes_written += written
+            self._pending = self._pending[written:]
+            if len(self._pending) > self.max_pending:
+                self.bytes_dropped += len(self._pending)
+                self._pending = b''
+
+    def close(self):
+        self.running = False
+        self._stop.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.close_pty()
+        if self.link and os.path.islink(self.link):
+            os.remove(self.link)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emit simulated sensor data on a pseudo-terminal.")
+    parser.add_argument('--link', default='/tmp/ttySIM0', help="Symlink to the pty to use as the serial port")
+    parser.add_argument('--rate', type=float, default=100.0, help="Samples per second per sensor")
+    parser.add_argument('--total-rate', type=float, help="Aggregate samples per second, split evenly (overrides --rate)")
+    parser.add_argument('--generated', type=int, default=0, help="Number of extra SIM_SENSOR_<n> sensors")
+    parser.add_argument('--fields', type=int, default=1, help="Fields per generated sensor")
+    parser.add_argument('--codec', choices=('ascii', 'binary'), default='ascii', help="Wire format")
+    parser.add_argument('--disconnect-every', type=float, help="Seconds between simulated unplugs of 2 seconds")
+    args = parser.parse_args()
+
+    sensors = default_sensors() + generated_sensors(args.generated, args.fields)
+    rate = args.total_rate / len(sensors) if args.total_rate else args.rate
+    for sensor in sensors:
+        sensor.rate_hz = rate
+    codec = AsciiCodec()
+    if args.codec == 'binary':
+        frame_ids = {index: sensor.sensor_id for index, sensor in enumerate(sensors, start=1)}
+        codec = BinaryFrameCodec(frame_ids)
+        print(f"Binary frame ids: {frame_ids}")
+
+    simulator = SerialSimulator(sensors, codec, link=args.link)
+    print(f"Simulating {len(sensors)} sensors at {simulator.aggregate_rate_hz:g} samples/s on {simulator.port} "
+          f"({simulator.device})")
+    try:
+        while True:
+            if args.disconnect_every:
+                time.sleep(args.disconnect_every)
+                print("Disconnecting")
+                simulator.disconnect(2.0)
+                print(f"Reconnected on {simulator.device}")
+            else:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.close()
+
+
+if __name__ == '__main__':
+    main()
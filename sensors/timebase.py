@@ -0,0 +1,119 @@
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# Sample timestamps are stored as int64 nanoseconds since the Unix epoch.
+# The dashboard works in naive local time (datetime.now()), so conversion
+# helpers live here to keep the two consistent. Each time is shifted by the
+# UTC offset in effect at that time, so history from before a daylight
+# saving change stays where it happened.
+
+_EPOCH = datetime(1970, 1, 1)
+_DAY = 86400
+
+
+def now_ns():
+    return time.time_ns()
+
+
+def to_ns(value):
+    """
+    Convert a point in time to int64 epoch nanoseconds.
+
+    Parameters:
+    - value: None, int (already nanoseconds), datetime (naive means local time),
+             pd.Timestamp or np.datetime64 in local time.
+
+    Returns:
+    - int nanoseconds, or None if value is None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, np.datetime64):
+        local = int(value.astype('datetime64[ns]').astype(np.int64))
+        return local - _naive_offset_ns(_EPOCH + timedelta(microseconds=local // 1000))
+    if isinstance(value, datetime):
+        # Integer arithmetic keeps the conversion exact; pd.Timestamp is a
+        # datetime subclass and carries its own nanoseconds.
+        nanosecond = getattr(value, 'nanosecond', 0)
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            offset = 0
+        else:
+            offset = _naive_offset_ns(value)
+        delta = value - _EPOCH
+        seconds = delta.days * 86400 + delta.seconds
+        return seconds * 10**9 + delta.microseconds * 1000 + nanosecond - offset
+    raise TypeError(f"Unsupported time value: {value!r}")
+
+
+def local_offset_ns(timestamp_ns=None):
+    """
+    Offset of local time from UTC in nanoseconds.
+
+    Parameters:
+    - timestamp_ns: Epoch nanoseconds the offset applies at, None for now.
+    """
+    seconds = time.time() if timestamp_ns is None else timestamp_ns // 10**9
+    offset = datetime.fromtimestamp(seconds, timezone.utc).astimezone().utcoffset()
+    return int(offset.total_seconds()) * 10**9
+
+
+def _naive_offset_ns(value):
+    # Offset in effect at a naive local time; the earlier one if it is ambiguous
+    plain = datetime(value.year, value.month, value.day, value.hour, value.minute, value.second)
+    return int(plain.astimezone().utcoffset().total_seconds()) * 10**9
+
+
+def local_offsets_ns(timestamps_ns):
+    """
+    Offset of local time from UTC at each of many times.
+
+    The offset is probed once a day across the array's range and each change
+    is located to the second by bisection, so the cost depends on the number
+    of days spanned rather than the number of timestamps.
+
+    Parameters:
+    - timestamps_ns: int64 array of epoch nanoseconds.
+
+    Returns:
+    - int64 array of offsets in nanoseconds, or a single int if the offset
+      is the same for all of them.
+    """
+    if not len(timestamps_ns):
+        return local_offset_ns()
+    seconds = timestamps_ns // 10**9
+    first, last = int(seconds.min()), int(seconds.max())
+    probes = list(range(first, last, _DAY)) + [last]
+    offsets = [local_offset_ns(probe * 10**9) for probe in probes]
+    if len(set(offsets)) == 1:
+        return offsets[0]
+    changes, values = [], [offsets[0]]
+    for before, after, offset_before, offset_after in zip(probes, probes[1:], offsets, offsets[1:]):
+        if offset_before == offset_after:
+            continue
+        while after - before > 1:  # First second with the new offset
+            middle = (before + after) // 2
+            if local_offset_ns(middle * 10**9) == offset_before:
+                before = middle
+            else:
+                after = middle
+        changes.append(after)
+        values.append(offset_after)
+    return np.asarray(values, dtype=np.int64)[np.searchsorted(changes, seconds, side='right')]
+
+
+def to_datetime64(timestamps_ns):
+    """
+    Convert an array of epoch nanoseconds to naive local datetime64[ns] values.
+
+    Parameters:
+    - timestamps_ns: Array-like of int64 nanoseconds.
+
+    Returns:
+    - np.ndarray of dtype datetime64[ns].
+    """
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    return (timestamps_ns + local_offsets_ns(timestamps_ns)).view('datetime64[ns]')
@@ -1,9 +1,26 @@
 # tabs/sensor_tab/callbacks.py
-from dash.dependencies import Input, Output, State
+import time
+from dash import ctx, no_update
+from dash.dependencies import Input, Output, State, ALL
 from dash.exceptions import PreventUpdate
-from .components import create_sensor_card
+from .components import create_sensor_card, get_sensor_card, DASHBOARD_TICK_MS
+from .push import register_push
 import dash_bootstrap_components as dbc
 
+
+def values_by_sensor(items, values):
+    """
+    Map the values of an ALL pattern-matching dependency to sensor names.
+
+    Parameters:
+    - items: The dependency's entry in ctx.inputs_list, ctx.states_list or ctx.outputs_list.
+    - values: The values passed to the callback for that dependency.
+
+    Returns:
+    - Dictionary of {sensor_name: value}.
+    """
+    return {item['id']['sensor_name']: value for item, value in zip(items, values)}
+
 def register_callbacks(app, sensors):
     """
     Register sensor-specific callbacks.
@@ -13,6 +30,7 @@ def register_callbacks(app, sensors):
     - sensors: List of sensor objects.
     """
     sensor_dict = {sensor.name: sensor for sensor in sensors}
+    register_push(app, sensor_dict)
 
     # Callback to generate sensor cards based on selected sensors
     @app.callback(
@@ -40,6 +58,70 @@ def register_callbacks(app, sensors):
             )
         return cards
 
+    # One interval and one request per browser refresh every visible card;
+    # cards whose update interval has not elapsed yet are skipped
+    @app.callback(
+        Output({'type': 'sensor-graph', 'sensor_name': ALL, 'field': ALL}, 'figure'),
+        Output({'type': 'sensor-graph', 'sensor_name': ALL, 'field': ALL}, 'extendData'),
+        Output({'type': 'stream-cursor', 'sensor_name': ALL}, 'data'),
+        Output({'type': 'current-values', 'sensor_name': ALL}, 'children'),
+        Input('dashboard-interval', 'n_intervals'),
+        Input({'type': 'time-window', 'sensor_name': ALL}, 'value'),
+        Input({'type': 'card-parameter', 'sensor_name': ALL, 'parameter': ALL}, 'value'),
+        State({'type': 'interval-control', 'sensor_name': ALL}, 'value'),
+        State({'type': 'stream-cursor', 'sensor_name': ALL}, 'data'),
+    )
+    def update_all_sensor_cards(n_intervals, time_windows, parameter_values, intervals, cursors):
+        """
+        Refresh every sensor card that is due on this dashboard tick.
+
+        Parameters:
+        - n_intervals: Number of dashboard ticks so far.
+        - time_windows: Time window values of all cards.
+        - parameter_values: Values of all sensor-specific parameter controls.
+        - intervals: Update interval values of all cards, in seconds.
+        - cursors: Streaming cursors of all cards.
+
+        Returns:
+        - Lists of figures, extendData, cursors and current values, with
+          no_update for every card that was skipped.
+        """
+        now_ms = int(time.time() * 1000)
+        time_windows = values_by_sensor(ctx.inputs_list[1], time_windows)
+        intervals = values_by_sensor(ctx.states_list[0], intervals)
+        cursors = values_by_sensor(ctx.states_list[1], cursors)
+        parameters = {}
+        for item, value in zip(ctx.inputs_list[2], parameter_values):
+            parameters.setdefault(item['id']['sensor_name'], {})[item['id']['parameter']] = value
+        # Cards whose controls changed are refreshed right away
+        forced = {prop_id['sensor_name'] for prop_id in ctx.triggered_prop_ids.values() if isinstance(prop_id, dict)}
+
+        graph_updates = {}
+        cursor_updates = {}
+        value_updates = {}
+        for sensor_name, cursor in cursors.items():
+            if sensor_name not in sensor_dict:
+                continue
+            card = get_sensor_card(app, sensor_name, sensor_dict[sensor_name])
+            if sensor_name not in forced and not card.is_due(cursor, intervals.get(sensor_name), now_ms,
+                                                             tolerance_ms=DASHBOARD_TICK_MS // 2):
+                continue
+            update = card.update_content(time_windows.get(sensor_name), cursor, parameters.get(sensor_name))
+            for field, figure, extend_data in zip(card.data_fields, update['figures'], update['extend_data']):
+                graph_updates[(sensor_name, field)] = (figure, extend_data)
+            new_cursor = cursor if update['cursor'] is no_update else update['cursor']
+            cursor_updates[sensor_name] = dict(new_cursor or {}, updated_at=now_ms)
+            value_updates[sensor_name] = update['current_values']
+
+        graphs = [graph_updates.get((item['id']['sensor_name'], item['id']['field']), (no_update, no_update))
+                  for item in ctx.outputs_list[0]]
+        return (
+            [figure for figure, _ in graphs],
+            [extend_data for _, extend_data in graphs],
+            [cursor_updates.get(item['id']['sensor_name'], no_update) for item in ctx.outputs_list[2]],
+            [value_updates.get(item['id']['sensor_name'], no_update) for item in ctx.outputs_list[3]],
+        )
+
     @app.callback(
         Output('callback-store', 'data'),
         Input('data', 'modified_timestamp'),
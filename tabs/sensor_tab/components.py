@@ -4,10 +4,16 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 from .sensor_cards.base_sensor_card import BaseSensorCard
 
+# Base period of the dashboard tick; card update intervals are rounded up to it
+DASHBOARD_TICK_MS = 1000
 
-def create_sensor_card(app, sensor_name, sensor):
+# Card instances by sensor name, shared by the layout and the dashboard tick
+sensor_cards = {}
+
+
+def get_sensor_card(app, sensor_name, sensor):
     """
-    Create a sensor card, dynamically loading sensor-specific classes if available.
+    Get the card instance for a sensor, dynamically loading sensor-specific classes if available.
 
     Parameters:
     - app: The Dash app instance.
@@ -15,8 +21,11 @@ def create_sensor_card(app, sensor_name, sensor):
     - sensor: The sensor object containing data and metadata.
 
     Returns:
-    - A Dash Bootstrap Card component representing the sensor.
+    - The sensor's BaseSensorCard instance, created on first use.
     """
+    if sensor_name in sensor_cards:
+        return sensor_cards[sensor_name]
+
     # Normalize sensor name to create a valid module/class name
     class_name = sensor_name.replace(' ', '').replace('-', '').replace('_', '')
     module_name = f'tabs.sensor_tab.sensor_cards.{class_name.lower()}_card'
@@ -33,6 +42,23 @@ def create_sensor_card(app, sensor_name, sensor):
 
     # Instantiate the card class, passing the app instance
     sensor_card = card_class(app, sensor_name, sensor)
+    sensor_cards[sensor_name] = sensor_card
+    return sensor_card
+
+
+def create_sensor_card(app, sensor_name, sensor):
+    """
+    Create a sensor card component.
+
+    Parameters:
+    - app: The Dash app instance.
+    - sensor_name: The name of the sensor.
+    - sensor: The sensor object containing data and metadata.
+
+    Returns:
+    - A Dash Bootstrap Card component representing the sensor.
+    """
+    sensor_card = get_sensor_card(app, sensor_name, sensor)
 
     # Register sensor-specific callbacks if not already registered
     
@@ -40,6 +66,16 @@ def create_sensor_card(app, sensor_name, sensor):
 
     return sensor_card.create_card()
 
+
+def create_dashboard_interval():
+    """
+    Create the single interval that drives updates of every sensor card.
+
+    Returns:
+    - A dcc.Interval component.
+    """
+    return dcc.Interval(id='dashboard-interval', interval=DASHBOARD_TICK_MS, n_intervals=0)
+
 def create_all_sensor_cards(app, sensors):
     """
     Create all sensor cards and register their callbacks.
@@ -49,12 +85,21 @@ def create_all_sensor_cards(app, sensors):
     - sensors: List of sensor objects.
 
     Returns:
-    - A dictionary mapping sensor names to their card components.
+    - A list of the card components, in the order of sensors.
     """
-    sensor_cards = []
+    cards = []
     for sensor in sensors:
         sensor_name = sensor.name
         # Create the sensor card
         card = create_sensor_card(app, sensor_name, sensor)
-        sensor_cards.append(card)
-    return sensor_cards
\ No newline at end of file
+        cards.append(card)
+    return cards
+
+def create_push_store():
+    """
+    Create the store updated by the client-side push handler.
+
+    Returns:
+    - A dcc.Store holding the number of open sample streams.
+    """
+    return dcc.Store(id='sensor-stream-status', data=0)
@@ -1,27 +1,25 @@
 # tabs/sensor_tab/data_handlers/accelerometersensor_data_handler.py
 from .base_data_handler import BaseSensorDataHandler
+from .transforms import Scale
 
 class AccelerometerSensorDataHandler(BaseSensorDataHandler):
-    def process_data(self, df, parameters=None):
+    def get_transforms(self, parameters=None):
         """
-        Process accelerometer data by applying scaling factors to each axis.
+        Apply the scaling factor to each acceleration axis.
         
         Parameters:
-        - df (pd.DataFrame): DataFrame containing accelerometer data with columns 
-                             ['Time', 'Acceleration_X', 'Acceleration_Y', 'Acceleration_Z'].
         - parameters (dict): Dictionary containing sensor-specific parameters, e.g., 
                              {'scaling_factor': 1.0}.
                              
         Returns:
-        - pd.DataFrame: Processed DataFrame with scaled acceleration data.
+        - dict: Dictionary of {field: [Transform, ...]}.
         """
-        if df is not None and not df.empty and parameters:
-            scaling_factor = parameters.get('scaling_factor', 1.0)
-            # Apply scaling factor to each acceleration axis
-            for axis in ['Acceleration_X', 'Acceleration_Y', 'Acceleration_Z']:
-                if axis in df.columns:
-                    df[axis] = df[axis] * scaling_factor
-        return df
+        transforms = super().get_transforms(parameters)
+        scaling_factor = parameters.get('scaling_factor', 1.0) if parameters else 1.0
+        if scaling_factor != 1.0:
+            for axis in self.sensor.data_fields:
+                transforms.setdefault(axis, []).append(Scale(scaling_factor))
+        return transforms
 
     def format_current_values(self, latest_data, parameters=None):
         """
@@ -37,12 +35,8 @@ class AccelerometerSensorDataHandler(BaseSensorDataHandler):
         """
         current_values = {}
         for field in self.sensor.data_fields:
-            if field.startswith('Acceleration_'):
-                value = latest_data[field]
-                current_values[field] = f"{value:.2f} m/s²"
-            else:
-                # For any other fields, return as-is or format accordingly
-                current_values[field] = latest_data[field]
+            value = latest_data[field]
+            current_values[field] = f"{value:.2f} m/s²"
         return current_values
 
     def get_yaxis_title(self, field, parameters=None):
@@ -50,13 +44,13 @@ class AccelerometerSensorDataHandler(BaseSensorDataHandler):
         Get the y-axis title for the acceleration graph, including units.
         
         Parameters:
-        - field (str): The data field name (e.g., 'Acceleration_X').
+        - field (str): The data field name (e.g., 'x').
         - parameters (dict): Dictionary containing sensor-specific parameters, e.g., 
                              {'scaling_factor': 1.0}.
                              
         Returns:
         - str: Y-axis title with units.
         """
-        if field.startswith('Acceleration_'):
+        if field in self.sensor.data_fields:
             return "Acceleration (m/s²)"
         return field.capitalize()
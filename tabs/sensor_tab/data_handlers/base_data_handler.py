@@ -1,6 +1,56 @@
 # tabs/sensor_tab/data_handlers/base_data_handler.py
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+from sensors.ring_buffer import RingBuffer
+from sensors.timebase import to_ns
+from .transforms import Pipeline, Polynomial, Scale
+
+
+class ProcessedHistory:
+    """
+    Transformed copy of a sensor's samples for one parameter set.
+
+    Uses the same sequence numbers as the sensor's buffer. Each read first
+    transforms only the samples stored since the previous read.
+    """
+
+    def __init__(self, sensor, pipeline):
+        """
+        Initialize the history.
+
+        Parameters:
+        - sensor: The sensor object whose buffer is mirrored.
+        - pipeline: Pipeline applied to every sample.
+        """
+        self.sensor = sensor
+        self.pipeline = pipeline
+        self.buffer = RingBuffer(sensor.channels, sensor.buffer.capacity)
+        self.cursor = None
+        self._lock = threading.Lock()
+
+    def update(self):
+        """Transform the samples stored since the last update."""
+        with self._lock:
+            timestamps, values, cursor = self.sensor.buffer.read_since(self.cursor)
+            first = cursor - len(timestamps)
+            if first != self.cursor:
+                # First read, or samples were overwritten before we saw them
+                self.buffer.clear(sequence=first)
+            if len(timestamps):
+                self.pipeline.apply_array(self.sensor.channels, values)
+                self.buffer.extend(timestamps, values.T)
+            self.cursor = cursor
+
 
 class BaseSensorDataHandler:
+    # Calibration polynomials applied before any other transform, as
+    # {field: [coefficients from the highest degree down]}
+    calibration = {}
+    # Parameter sets whose processed samples are kept; least recently used are dropped
+    max_cached_parameter_sets = 4
+
     def __init__(self, sensor_name, sensor):
         """
         Initialize the base sensor data handler.
@@ -11,20 +61,174 @@ class BaseSensorDataHandler:
         """
         self.sensor_name = sensor_name
         self.sensor = sensor
+        self._pipelines = {}
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_transforms(self, parameters=None):
+        """
+        Declare the transforms applied to each field.
+
+        Subclasses extend the result of this method with their own
+        transforms (Scale, Offset, UnitConversion, Polynomial, Clip).
+
+        Parameters:
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - Dictionary of {field: [Transform, ...]}, applied in order.
+        """
+        return {field: [Polynomial(coefficients)] for field, coefficients in self.calibration.items()}
+
+    def get_pipeline(self, parameters=None):
+        """
+        Get the compiled pipeline for a parameter set, building it on first use.
+
+        Parameters:
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - A Pipeline.
+        """
+        key = json.dumps(parameters, sort_keys=True)
+        pipeline = self._pipelines.get(key)
+        if pipeline is None:
+            transforms = self.get_transforms(parameters)
+            stage = self.sensor.filter_stage
+            if stage:
+                # Filtered channels get their field's transforms; channels that block
+                # a constant input (high-pass) only get the scaling
+                for channel in stage.channels[len(self.sensor.data_fields):]:
+                    field_transforms = transforms.get(stage.source_field(channel))
+                    if field_transforms and channel not in transforms:
+                        keep_offsets = stage.get_filter(channel).passes_dc
+                        transforms[channel] = [
+                            transform if keep_offsets or transform.affine is None else Scale(transform.affine[0])
+                            for transform in field_transforms]
+            pipeline = self._pipelines[key] = Pipeline(transforms)
+        return pipeline
+
+    def select_channels(self, df, parameters=None):
+        """
+        Show the filtered channel chosen with the 'filter' parameter in place of each field.
+
+        Parameters:
+        - df: DataFrame from the sensor, modified in place.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - The same DataFrame.
+        """
+        name = parameters.get('filter') if parameters else None
+        if not name:
+            return df
+        for field in self.sensor.data_fields:
+            for suffix in ('', '_min', '_max'):
+                channel = f'{field}_{name}{suffix}'
+                if channel in df.columns:
+                    df[field + suffix] = df[channel]
+        return df
+
+    def get_history(self, parameters=None):
+        """
+        Get the up-to-date processed samples for a parameter set.
+
+        Parameters:
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - A ProcessedHistory, or None if the pipeline does not change the data
+          or the samples are read from another process's shared memory, where
+          a copy per worker would duplicate the whole buffer; callers then
+          transform the samples on the fly.
+        """
+        pipeline = self.get_pipeline(parameters)
+        shared = self.sensor.shared_memory
+        if pipeline.is_identity or (shared is not None and shared.read_only):
+            return None
+        key = json.dumps(parameters, sort_keys=True)
+        with self._lock:
+            history = self._histories.get(key)
+            if history is None:
+                history = self._histories[key] = ProcessedHistory(self.sensor, pipeline)
+                while len(self._histories) > self.max_cached_parameter_sets:
+                    self._histories.popitem(last=False)
+            self._histories.move_to_end(key)
+        history.update()
+        return history
 
     def process_data(self, df, parameters=None):
         """
         Process the sensor data.
 
         Parameters:
-        - df: Pandas DataFrame containing sensor data.
+        - df: Pandas DataFrame containing sensor data, modified in place.
         - parameters: Dictionary of sensor-specific parameters.
 
         Returns:
         - Processed DataFrame.
         """
-        # General data processing (if any)
-        return df
+        if df is None or df.empty:
+            return df
+        return self.get_pipeline(parameters).apply(df)
+
+    def get_plot_window(self, start=None, min_points=None, parameters=None):
+        """
+        Get processed data for a plot, as BaseSensor.get_plot_window.
+
+        Raw samples come from the processed history, if there is one, so only
+        samples stored since the last call are transformed. Rollup buckets are transformed
+        on the fly; for nonlinear transforms the bucket mean is approximate.
+
+        Parameters:
+        - start: Start of the range as a datetime, or None for all data.
+        - min_points: Minimum number of points wanted.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - (df, resolution) as returned by BaseSensor.get_plot_window.
+        """
+        tier = self.sensor.get_plot_tier(start, min_points=min_points)
+        if tier is not None:
+            df = self.get_pipeline(parameters).apply(self.sensor.get_tier_window(tier, start),
+                                                     suffixes=('', '_min', '_max'))
+            for field in self.sensor.channels:
+                # A decreasing transform swaps the bucket extremes
+                low, high = df[f'{field}_min'].to_numpy(), df[f'{field}_max'].to_numpy()
+                df[f'{field}_min'], df[f'{field}_max'] = np.fmin(low, high), np.fmax(low, high)
+            return self.select_channels(df, parameters), tier.width_seconds
+        history = self.get_history(parameters)
+        if history is None:
+            df = self.get_pipeline(parameters).apply(self.sensor.get_window(start))
+            return self.select_channels(df, parameters), None
+        start_ns = self.sensor.oldest_raw_timestamp() if start is None else to_ns(start)
+        oldest = history.buffer.oldest()
+        if start_ns is not None and oldest is not None and start_ns < oldest:
+            # Reaches back past the samples in memory to the recording; transform on the fly
+            df = self.get_pipeline(parameters).apply(self.sensor.get_window(start))
+            return self.select_channels(df, parameters), None
+        timestamps, values = history.buffer.window(to_ns(start), None)
+        return self.select_channels(self.sensor.to_dataframe(timestamps, values), parameters), None
+
+    def get_data_since(self, cursor=None, parameters=None):
+        """
+        Get the processed samples stored since a cursor, as BaseSensor.get_data_since.
+
+        Parameters:
+        - cursor: Cursor returned by the previous call, or None for all data.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - (df, cursor): DataFrame of the new processed samples and the next cursor.
+        """
+        history = self.get_history(parameters)
+        if history is None:
+            df, cursor = self.sensor.get_data_since(cursor)
+            df = self.process_data(df, parameters)
+        else:
+            timestamps, values, cursor = history.buffer.read_since(cursor)
+            df = self.sensor.to_dataframe(timestamps, values)
+        return self.select_channels(df, parameters), cursor
 
     def format_current_values(self, latest_data, parameters=None):
         """
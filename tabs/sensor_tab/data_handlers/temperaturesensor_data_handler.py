@@ -1,24 +1,25 @@
 # tabs/sensor_tab/data_handlers/temperaturesensor_data_handler.py
 from .base_data_handler import BaseSensorDataHandler
+from .transforms import UnitConversion
 
 class TemperatureSensorDataHandler(BaseSensorDataHandler):
-    def process_data(self, df, parameters=None):
+    def get_transforms(self, parameters=None):
         """
-        Process temperature data based on the selected unit.
+        Convert temperatures to the selected unit.
 
         Parameters:
-        - df: Pandas DataFrame containing sensor data.
         - parameters: Dictionary containing 'temp_unit'.
 
         Returns:
-        - Processed DataFrame with temperature converted if needed.
+        - Dictionary of {field: [Transform, ...]}.
         """
-        if df is not None and not df.empty and parameters:
-            temp_unit = parameters.get('temp_unit', 'C')
-            if temp_unit == 'F':
-                # Convert Celsius to Fahrenheit
-                df['Temperature'] = df['Temperature'] * 9 / 5 + 32
-        return df
+        transforms = super().get_transforms(parameters)
+        if parameters and parameters.get('temp_unit', 'C') == 'F':
+            # Convert Celsius to Fahrenheit
+            for field in self.sensor.data_fields:
+                if field.lower() == 'temperature':
+                    transforms.setdefault(field, []).append(UnitConversion('degC', 'degF'))
+        return transforms
 
     def format_current_values(self, latest_data, parameters=None):
         """
@@ -38,7 +39,7 @@ class TemperatureSensorDataHandler(BaseSensorDataHandler):
             temp_unit = 'C'
         unit = '°F' if temp_unit == 'F' else '°C'
         for field in self.sensor.data_fields:
-            if field == 'Temperature':
+            if field.lower() == 'temperature':
                 value = latest_data[field]
                 current_values[field] = f"{value:.2f} {unit}"
             else:
@@ -61,6 +62,6 @@ class TemperatureSensorDataHandler(BaseSensorDataHandler):
         else:
             temp_unit = 'C'
         unit = '°F' if temp_unit == 'F' else '°C'
-        if field == 'Temperature':
+        if field.lower() == 'temperature':
             return f"Temperature ({unit})"
         return field.capitalize()
@@ -0,0 +1,185 @@
+# tabs/sensor_tab/data_handlers/transforms.py
+import numpy as np
+
+# Linear unit conversions as (factor, offset) into each quantity's base unit:
+# base = value * factor + offset
+UNITS = {
+    'temperature': {'degC': (1.0, 0.0), 'degF': (5 / 9, -32 * 5 / 9), 'K': (1.0, -273.15)},
+    'pressure': {'Pa': (1.0, 0.0), 'hPa': (100.0, 0.0), 'kPa': (1000.0, 0.0), 'bar': (1e5, 0.0),
+                 'psi': (6894.757293168, 0.0), 'atm': (101325.0, 0.0)},
+    'acceleration': {'m/s^2': (1.0, 0.0), 'g': (9.80665, 0.0)},
+}
+
+
+class Transform:
+    """
+    One in-place operation on a float64 column.
+
+    Affine transforms (value * scale + offset) report their coefficients
+    through the affine property so a pipeline can fuse consecutive ones into
+    a single pass.
+    """
+    affine = None  # (scale, offset) for affine transforms
+
+    def apply(self, values):
+        """
+        Transform a column in place.
+
+        Parameters:
+        - values: 1-D float64 array, modified in place.
+        """
+        scale, offset = self.affine
+        if scale != 1.0:
+            values *= scale
+        if offset != 0.0:
+            values += offset
+
+
+class Scale(Transform):
+    def __init__(self, factor):
+        self.affine = (float(factor), 0.0)
+
+
+class Offset(Transform):
+    def __init__(self, offset):
+        self.affine = (1.0, float(offset))
+
+
+class UnitConversion(Transform):
+    def __init__(self, from_unit, to_unit):
+        """
+        Convert between two units of the same quantity in UNITS.
+
+        Parameters:
+        - from_unit: Unit of the incoming values (e.g., 'degC').
+        - to_unit: Unit to convert to (e.g., 'degF').
+        """
+        for units in UNITS.values():
+            if from_unit in units and to_unit in units:
+                from_factor, from_offset = units[from_unit]
+                to_factor, to_offset = units[to_unit]
+                # Into the base unit, then out of it
+                self.affine = (from_factor / to_factor, (from_offset - to_offset) / to_factor)
+                return
+        raise ValueError(f"Cannot convert {from_unit!r} to {to_unit!r}")
+
+
+class Polynomial(Transform):
+    def __init__(self, coefficients):
+        """
+        Calibration polynomial, evaluated with Horner's method.
+
+        Parameters:
+        - coefficients: Coefficients from the highest degree down, as for np.polyval.
+        """
+        self.coefficients = [float(c) for c in coefficients]
+        if not self.coefficients:
+            raise ValueError("A polynomial needs at least one coefficient")
+        if len(self.coefficients) == 1:
+            self.affine = (0.0, self.coefficients[0])
+        elif len(self.coefficients) == 2:
+            self.affine = tuple(self.coefficients)
+
+    def apply(self, values):
+        if self.affine is not None:
+            return super().apply(values)
+        x = values.copy()
+        values.fill(self.coefficients[0])
+        for coefficient in self.coefficients[1:]:
+            values *= x
+            values += coefficient
+
+
+class Clip(Transform):
+    def __init__(self, low=None, high=None):
+        """
+        Limit values to a range.
+
+        Parameters:
+        - low: Lower bound, None for none.
+        - high: Upper bound, None for none.
+        """
+        self.low = low
+        self.high = high
+
+    def apply(self, values):
+        np.clip(values, self.low, self.high, out=values)
+
+
+class Pipeline:
+    """
+    Per-field transforms compiled once and applied in place.
+
+    Runs of affine transforms are fused into a single multiply-add, so e.g.
+    a scale, an offset and a unit conversion cost one pass over the data.
+    """
+
+    def __init__(self, transforms):
+        """
+        Compile a pipeline.
+
+        Parameters:
+        - transforms: Dictionary of {field: [Transform, ...]}, applied in order.
+        """
+        self.steps = {}
+        for field, field_transforms in transforms.items():
+            steps = []
+            for transform in field_transforms:
+                if transform.affine is not None and steps and steps[-1].affine is not None:
+                    scale, offset = steps[-1].affine
+                    next_scale, next_offset = transform.affine
+                    fused = Transform()
+                    fused.affine = (scale * next_scale, offset * next_scale + next_offset)
+                    steps[-1] = fused
+                else:
+                    steps.append(transform)
+            if steps:
+                self.steps[field] = steps
+
+    @property
+    def is_identity(self):
+        """Whether the pipeline leaves every field unchanged."""
+        return not self.steps
+
+    def apply_column(self, field, values):
+        """
+        Transform one field's values in place.
+
+        Parameters:
+        - field: The data field name.
+        - values: 1-D float64 array, modified in place.
+        """
+        for step in self.steps.get(field, ()):
+            step.apply(values)
+
+    def apply_array(self, fields, values):
+        """
+        Transform a columnar array in place.
+
+        Parameters:
+        - fields: Field names of the rows of values.
+        - values: float64 array of shape (n_fields, n), modified in place.
+        """
+        for field, column in zip(fields, values):
+            self.apply_column(field, column)
+
+    def apply(self, df, suffixes=('',)):
+        """
+        Transform DataFrame columns.
+
+        Parameters:
+        - df: DataFrame to modify.
+        - suffixes: Column name suffixes transformed like their field, e.g.
+          ('', '_min', '_max') for rollup buckets.
+
+        Returns:
+        - The same DataFrame.
+        """
+        for field in self.steps:
+            for suffix in suffixes:
+                column = field + suffix
+                if column in df.columns:
+                    values = df[column].to_numpy(dtype=np.float64, copy=True)
+                    self.apply_column(field, values)
+                    df[column] = values
+        return df
@@ -0,0 +1,133 @@
+# tabs/sensor_tab/downsampling.py
+import numpy as np
+
+LTTB = 'lttb'
+MINMAX = 'minmax'
+
+
+def downsample(x, y, max_points, mode=LTTB):
+    """
+    Reduce a series to at most max_points points for plotting.
+
+    Parameters:
+    - x: Array-like of x values (numbers or datetime64), sorted ascending.
+    - y: Array-like of y values, same length as x.
+    - max_points: Maximum number of points to keep.
+    - mode: LTTB (shape-preserving) or MINMAX (keeps each bucket's extremes).
+
+    Returns:
+    - (x, y) arrays; the input unchanged if it already fits.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    indices = downsample_indices(x, y, max_points, mode)
+    if indices is None:
+        return x, y
+    return x[indices], y[indices]
+
+
+def downsample_indices(x, y, max_points, mode=LTTB):
+    """
+    Pick the indices downsample() would keep, e.g. to apply them to related columns.
+
+    Returns:
+    - Sorted integer index array, or None if the series already fits.
+    """
+    if mode is None or max_points is None or len(y) <= max_points:
+        return None
+    if mode == LTTB:
+        return lttb_indices(x, y, max_points)
+    if mode == MINMAX:
+        return minmax_indices(x, y, max_points)
+    raise ValueError(f"Unknown downsampling mode: {mode!r}")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick n_out points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Every other bucket keeps the
+    point forming the largest triangle with the neighbouring buckets. To do
+    this in one vectorized pass, the left corner of the triangle is the
+    previous bucket's centroid instead of its selected point.
+
+    Parameters:
+    - x: Array of x values (numbers or datetime64), sorted ascending.
+    - y: Array of y values.
+    - n_out: Number of points to keep.
+
+    Returns:
+    - Sorted integer index array.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        # Too few points for a bucket between the ends
+        return np.array([0, n - 1][-n_out:] if n_out > 0 else [], dtype=np.int64)
+    xf = _as_float(x)
+    yf = np.asarray(y, dtype=np.float64)
+
+    # Points 1..n-2 are split into n_out - 2 buckets
+    starts = np.linspace(1, n - 1, n_out - 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, n - 1))
+    mid_x = xf[1:n - 1]
+    mid_y = yf[1:n - 1]
+    offsets = starts - 1
+    centroid_x = np.add.reduceat(mid_x, offsets) / counts
+    centroid_y = np.add.reduceat(np.nan_to_num(mid_y), offsets) / counts
+
+    a_x = np.concatenate(([xf[0]], centroid_x[:-1]))
+    a_y = np.concatenate(([yf[0]], centroid_y[:-1]))
+    c_x = np.concatenate((centroid_x[1:], [xf[-1]]))
+    c_y = np.concatenate((centroid_y[1:], [yf[-1]]))
+    bucket = np.repeat(np.arange(len(starts)), counts)
+
+    area = np.abs((a_x[bucket] - c_x[bucket]) * (mid_y - a_y[bucket])
+                  - (a_x[bucket] - mid_x) * (c_y[bucket] - a_y[bucket]))
+    area = np.nan_to_num(area, nan=-1.0)
+    chosen = _first_match_per_bucket(area, np.maximum.reduceat(area, offsets), bucket, counts) + 1
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Keep the minimum and maximum of each bucket so peaks are never lost.
+
+    Parameters:
+    - x: Array of x values (unused, kept for a uniform signature).
+    - y: Array of y values.
+    - n_out: Maximum number of points to keep.
+
+    Returns:
+    - Sorted integer index array.
+    """
+    n = len(y)
+    n_buckets = (n_out - 2) // 2
+    if n_out >= n:
+        return np.arange(n)
+    if n_buckets < 1:
+        # No room for a min/max pair besides the ends; LTTB still fits n_out
+        return lttb_indices(x, y, n_out)
+    yf = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, n))
+    bucket = np.repeat(np.arange(n_buckets), counts)
+    lows = _first_match_per_bucket(yf, np.minimum.reduceat(yf, starts), bucket, counts)
+    highs = _first_match_per_bucket(yf, np.maximum.reduceat(yf, starts), bucket, counts)
+    return np.unique(np.concatenate(([0], lows, highs, [n - 1])))
+
+
+def _first_match_per_bucket(values, bucket_values, bucket, counts):
+    # Index of the first element in each bucket equal to that bucket's reduced value
+    matches = np.flatnonzero(values == np.repeat(bucket_values, counts))
+    _, first = np.unique(bucket[matches], return_index=True)
+    return matches[first]
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+        return (x - x[0]).astype(np.float64)
+    return x.astype(np.float64)
@@ -0,0 +1,90 @@
+# tabs/sensor_tab/figure_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class FigureCache:
+    """
+    LRU cache of rendered figures shared by all browser sessions.
+
+    Entries are stored under a key describing the view (sensor, fields, time
+    window, parameters) together with the data version they were rendered
+    from. A lookup hits if the versions match, or if the entry is younger than
+    max_age so sessions refreshing a moment apart share one render.
+
+    Lookups are single-flight: while one caller renders a key, concurrent
+    callers for the same key wait for its result instead of rendering it again.
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        Initialize the cache.
+
+        Parameters:
+        - maxsize: Maximum number of entries; the least recently used are evicted first.
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (version, created, value)
+        self._pending = {}  # key -> Event set when the render in progress finishes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, render, max_age=0):
+        """
+        Get a cached value, rendering it if needed.
+
+        Parameters:
+        - key: Hashable description of the view.
+        - version: Data version the caller wants, e.g. the sensor's sequence number.
+        - render: Function with no arguments producing the value on a miss.
+        - max_age: Seconds an entry from an older version may still be served.
+
+        Returns:
+        - The cached or newly rendered value.
+        """
+        waited_since = None
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and (
+                        entry[0] == version
+                        or time.monotonic() - entry[1] <= max_age
+                        or (waited_since is not None and entry[1] >= waited_since)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another caller is rendering this key; use its result once it is done
+            waited_since = time.monotonic()
+            pending.wait()
+
+        try:
+            value = render()
+            with self._lock:
+                self._entries[key] = (version, time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache shared by all sensor cards
+figure_cache = FigureCache()
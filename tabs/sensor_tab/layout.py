@@ -1,7 +1,7 @@
 # tabs/sensor_tab/layout.py
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from .components import create_all_sensor_cards
+from .components import create_all_sensor_cards, create_dashboard_interval, create_push_store
 
 def get_layout(sensors, app):
     """
@@ -29,5 +29,7 @@ def get_layout(sensors, app):
         dbc.Row(
             id='sensor-cards',
             children=sensor_cards  # Sensor cards will be dynamically inserted here
-        )
+        ),
+        create_dashboard_interval(),
+        create_push_store()
     ], fluid=True)
@@ -0,0 +1,78 @@
+# tabs/sensor_tab/push.py
+import json
+import threading
+from flask import Response, request, abort
+from dash import ClientsideFunction
+from dash.dependencies import Input, Output, ALL
+from .components import get_sensor_card
+
+# Route of the Server-Sent Events stream; assets/sensor_stream.js connects to it
+STREAM_ROUTE = '/sensor-stream'
+# Streams open at once per process; each holds a server thread while open
+MAX_STREAMS = 32
+BUSY_RETRY_MS = 5000  # Reconnect delay sent to browsers turned away at the limit
+
+
+def register_push(app, sensor_dict, max_streams=MAX_STREAMS):
+    """
+    Register the live sample stream and its client-side handler.
+
+    The browser opens one EventSource per streaming card, starting at the
+    sequence stored in the card's stream cursor, and appends each pushed batch
+    to the card's graphs with Plotly.extendTraces.
+
+    Parameters:
+    - app: The Dash app instance.
+    - sensor_dict: Dictionary mapping sensor names to sensor objects.
+    - max_streams: Streams served at once. Requests beyond it get an empty
+      stream that tells the browser to retry after BUSY_RETRY_MS, so the
+      remaining server threads stay free for the Dash callbacks.
+    """
+    slots = threading.BoundedSemaphore(max_streams)
+
+    def limited(events):
+        # Take a slot when the response starts, so a stream that is never iterated never holds one
+        if not slots.acquire(blocking=False):
+            yield f'retry: {BUSY_RETRY_MS}\n\n'
+            return
+        try:
+            yield from events
+        finally:
+            events.close()
+            slots.release()
+
+    @app.server.route(STREAM_ROUTE)
+    def sensor_stream():
+        """
+        Stream a sensor's new samples as Server-Sent Events.
+
+        Query parameters:
+        - sensor: The sensor name.
+        - since: Cursor to stream from; the Last-Event-ID header takes precedence.
+        - time_window: The card's time window in seconds, empty for all data.
+        - parameters: JSON object of sensor-specific parameters.
+        """
+        sensor = sensor_dict.get(request.args.get('sensor'))
+        if sensor is None:
+            abort(404)
+        card = get_sensor_card(app, sensor.name, sensor)
+        if not (card.streaming and card.push):
+            return Response(status=204)  # Tells EventSource not to reconnect
+        try:
+            cursor = int(request.headers.get('Last-Event-ID') or request.args['since'])
+            parameters = json.loads(request.args.get('parameters') or 'null')
+        except (KeyError, ValueError):
+            abort(400)
+        events = card.stream_samples(request.args.get('time_window'), cursor, parameters)
+        return Response(
+            limited(events),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    # Open, keep or close each card's stream whenever its cursor changes
+    app.clientside_callback(
+        ClientsideFunction(namespace='sensorStream', function_name='connect'),
+        Output('sensor-stream-status', 'data'),
+        Input({'type': 'stream-cursor', 'sensor_name': ALL}, 'data')
+    )
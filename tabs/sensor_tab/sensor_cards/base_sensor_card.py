@@ -1,11 +1,43 @@
 # tabs/sensor_tab/sensor_cards/base_sensor_card.py
-from dash import html, dcc, Output, Input, State
+from dash import html, dcc, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
+from plotly.utils import PlotlyJSONEncoder
+import numpy as np
+import importlib
+import json
+import time
 from datetime import datetime, timedelta
+from ..downsampling import downsample, downsample_indices, LTTB
+from ..figure_cache import figure_cache
+from ..data_handlers.base_data_handler import BaseSensorDataHandler
 
 class BaseSensorCard:
     callbacks_registered = {}
+    # Traces are capped at about points_per_pixel points per horizontal pixel
+    graph_width_px = 800
+    points_per_pixel = 2
+    downsample_mode = LTTB  # LTTB, MINMAX, or None to send every point
+    # Append new samples to the graphs with extendData instead of rebuilding
+    # the figures, as long as the window fits in max_points raw samples
+    streaming = True
+    # While streaming, push new samples to the browser over Server-Sent Events
+    # as soon as they are stored instead of waiting for the card's next update
+    push = True
+    push_min_interval = 0.03  # Seconds between pushed batches, coalescing faster data
+    push_keepalive = 15  # Seconds between keep-alive comments on an idle stream
+    # A stream ends after push_max_duration seconds so its server thread is
+    # freed; the browser reconnects push_reconnect_delay seconds later and
+    # resumes from the last event id
+    push_max_duration = 60
+    push_reconnect_delay = 0.5
+    # Rendered figures are shared between sessions through this cache (None
+    # disables it); a cached render up to figure_cache_max_age seconds old is
+    # served even if newer samples have arrived
+    figure_cache = figure_cache
+    figure_cache_max_age = 1.0
+    show_current_values = False
+
     def __init__(self, app, sensor_name, sensor):
         """
         Initialize the base sensor card.
@@ -19,6 +51,107 @@ class BaseSensorCard:
         self.sensor_name = sensor_name
         self.sensor = sensor
         self.data_fields = sensor.data_fields  # List of data fields (e.g., ['x', 'y', 'z'])
+        self.data_handler = None  # Loaded on first use
+
+    @property
+    def max_points(self):
+        """Maximum number of points sent to the browser per trace."""
+        return self.graph_width_px * self.points_per_pixel
+
+    def downsample(self, x, y):
+        """
+        Downsample one trace to at most max_points points.
+
+        Parameters:
+        - x: Array-like of x values (e.g. the 'Time' column).
+        - y: Array-like of y values.
+
+        Returns:
+        - (x, y) arrays ready to be plotted.
+        """
+        return downsample(x, y, self.max_points, self.downsample_mode)
+
+    def create_traces(self, data, field, resolution=None):
+        """
+        Create the plot traces for one field.
+
+        Parameters:
+        - data: DataFrame from sensor.get_plot_window.
+        - field: The data field name.
+        - resolution: Rollup bucket width in seconds, or None for raw samples.
+
+        Returns:
+        - A list of go.Scatter traces. Raw samples give a single line; rollups
+          give the bucket means plus a shaded min/max band so peaks stay visible.
+        """
+        if resolution is None:
+            x, y = self.downsample(data['Time'], data[field])
+            return [go.Scatter(x=x, y=y, mode='lines', name=field)]
+        x = data['Time'].to_numpy()
+        columns = [data[field].to_numpy(), data[f'{field}_min'].to_numpy(), data[f'{field}_max'].to_numpy()]
+        indices = downsample_indices(x, columns[0], self.max_points, self.downsample_mode)
+        if indices is not None:
+            x = x[indices]
+            columns = [column[indices] for column in columns]
+        mean, low, high = columns
+        band = dict(mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False)
+        return [
+            go.Scatter(x=x, y=high, **band),
+            go.Scatter(x=x, y=low, fill='tonexty', fillcolor='rgba(31, 119, 180, 0.2)', **band),
+            go.Scatter(x=x, y=mean, mode='lines', name=f'{field} ({resolution:g}s mean)'),
+        ]
+
+    def get_data_handler(self):
+        """
+        Get the data handler for this sensor, loading the sensor-specific class if available.
+
+        Returns:
+        - A BaseSensorDataHandler instance.
+        """
+        if self.data_handler is None:
+            class_name = self.sensor_name.replace(' ', '').replace('-', '').replace('_', '')
+            module_name = f'tabs.sensor_tab.data_handlers.{class_name.lower()}_data_handler'
+            class_name = f'{class_name}DataHandler'
+            try:
+                module = importlib.import_module(module_name)
+                data_handler_class = getattr(module, class_name)
+            except (ImportError, AttributeError):
+                data_handler_class = BaseSensorDataHandler
+            self.data_handler = data_handler_class(self.sensor_name, self.sensor)
+        return self.data_handler
+
+    def get_figure_layout(self, field, parameters=None):
+        """
+        Get the layout settings for a field's graph.
+
+        Parameters:
+        - field: The data field name.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - Dictionary of layout properties.
+        """
+        return dict(
+            title=f"{self.sensor_name} - {field.capitalize()}",
+            xaxis_title="Time",
+            yaxis_title=f"{field.capitalize()} Value",
+            margin=dict(l=20, r=20, t=30, b=20),
+        )
+
+    def create_extend_data(self, data, field, max_points):
+        """
+        Create the extendData payload that appends new samples to a field's graph.
+
+        Parameters:
+        - data: DataFrame of new samples.
+        - field: The data field name.
+        - max_points: Number of points the trace is trimmed to.
+
+        Returns:
+        - [update, trace indices, max points] as expected by dcc.Graph.extendData.
+        """
+        x = np.datetime_as_string(data['Time'].to_numpy(), unit='us').tolist()
+        return [dict(x=[x], y=[data[field].tolist()]), [0], max_points]
 
     def create_interval_control(self):
         """
@@ -56,6 +189,24 @@ class BaseSensorCard:
             ),
         ], className='mb-2')
 
+    def create_filter_control(self):
+        """
+        Create the control choosing between raw samples and the sensor's filtered channels.
+
+        Returns:
+        - A Div containing the filter RadioItems.
+        """
+        return html.Div([
+            html.Label('Filter:'),
+            dbc.RadioItems(
+                id=self.parameter_id('filter'),
+                options=[{'label': 'Raw', 'value': ''}]
+                + [{'label': name.replace('_', ' ').capitalize(), 'value': name} for name in self.sensor.filters],
+                value='',  # Default to the raw samples
+                inline=True
+            )
+        ], className='mb-2')
+
     def create_placeholder_graph(self, field):
         """
         Create a placeholder graph for a given data field.
@@ -68,17 +219,18 @@ class BaseSensorCard:
         """
         return dcc.Graph(
             id={'type': 'sensor-graph', 'sensor_name': self.sensor_name, 'field': field},
-            figure=go.Figure(
-                data=[],
-                layout=go.Layout(
-                    title=f"{self.sensor_name} - {field.capitalize()}",
-                    xaxis={"title": "Time"},
-                    yaxis={"title": f"{field.capitalize()} Value"},
-                    margin=dict(l=20, r=20, t=30, b=20),
-                )
-            )
+            figure=go.Figure(data=[], layout=self.get_figure_layout(field))
         )
 
+    def create_current_values_placeholder(self):
+        """
+        Create the container for the current values display.
+
+        Returns:
+        - An empty Div filled in by the update callback.
+        """
+        return html.Div(id={'type': 'current-values', 'sensor_name': self.sensor_name})
+
     def create_sensor_content(self):
         """
         Create the sensor content with placeholder graphs for each data field.
@@ -87,20 +239,33 @@ class BaseSensorCard:
         - A Div containing placeholder graphs for each data field.
         """
         graphs = [self.create_placeholder_graph(field) for field in self.data_fields]
+        if self.show_current_values:
+            graphs.insert(0, self.create_current_values_placeholder())
         return html.Div(graphs, id={'type': 'sensor-content', 'sensor_name': self.sensor_name})
 
-    def create_sensor_interval(self):
+    def create_stream_store(self):
         """
-        Create the interval component for periodic updates.
+        Create the store holding this browser session's streaming cursor.
 
         Returns:
-        - A dcc.Interval component.
+        - A dcc.Store component.
         """
-        return dcc.Interval(
-            id={'type': 'sensor-interval', 'sensor_name': self.sensor_name},
-            interval=5 * 1000,  # Default interval in milliseconds
-            n_intervals=0
-        )
+        return dcc.Store(id={'type': 'stream-cursor', 'sensor_name': self.sensor_name}, data=None)
+
+    def parameter_id(self, name):
+        """
+        Get the component id for a sensor-specific parameter control.
+
+        Controls with this id are picked up by the dashboard tick and their
+        values passed to update_content as {name: value}.
+
+        Parameters:
+        - name: The parameter name (e.g., 'temp_unit').
+
+        Returns:
+        - A pattern-matching component id.
+        """
+        return {'type': 'card-parameter', 'sensor_name': self.sensor_name, 'parameter': name}
 
     def get_card_body(self):
         """
@@ -109,12 +274,15 @@ class BaseSensorCard:
         Returns:
         - A list of Dash components representing the card body.
         """
-        return [
+        card_body = [
             self.create_interval_control(),
             self.create_time_window_control(),
             self.create_sensor_content(),  # Placeholder graphs for each data field
-            self.create_sensor_interval(),
+            self.create_stream_store(),
         ]
+        if self.sensor.filters:
+            card_body.insert(2, self.create_filter_control())
+        return card_body
 
     def create_card(self):
         """
@@ -132,63 +300,262 @@ class BaseSensorCard:
         id={'type': 'sensor-card', 'sensor_name': self.sensor_name})
         return card
 
-    def register_callbacks(self):
-        # Check if callbacks have already been registered for this sensor
-        if BaseSensorCard.callbacks_registered.get(self.sensor_name, False):
-            BaseSensorCard.callbacks_registered[self.sensor_name] = True
-            return
-        # if self.app.layout[0].data['callbacks_registered'].get(self.sensor_name, False):
-        #     self.app.layout[0].data['callbacks_registered'][self.sensor_name] = True
-        #     self.app.layout[0].data
-        #     return
-        # self.callbacks_registered = True
-        # print(self.app.layout[0].data)
-        # print(f"Callback registered for {self.sensor_name}")
-        # Callback to update the sensor graphs
-        @self.app.callback(
-            [Output({'type': 'sensor-graph', 'sensor_name': self.sensor_name, 'field': field}, 'figure') for field in self.data_fields],
-            Input({'type': 'sensor-interval', 'sensor_name': self.sensor_name}, 'n_intervals'),
-            State({'type': 'time-window', 'sensor_name': self.sensor_name}, 'value')
-        )
-        def update_sensor_graphs(n_intervals, time_window):
-            data = self.sensor.get_data()
-            # print(data)
-            figures = []
-            if data.empty:
-                # Return empty figures
-                for field in self.data_fields:
-                    figures.append(go.Figure(
-                        layout = {
-                            "title":f"{self.sensor_name} - {field.capitalize()}",
-                            "xaxis_title":"Time",
-                            "yaxis_title":f"{field.capitalize()} Value"
-                        }
-                    ))
-            else:
-                # Filter data based on time_window
-                if time_window is not None and time_window > 0:
-                    cutoff_time = datetime.now() - timedelta(seconds=time_window)
-                    data = data[data['Time'] >= cutoff_time]
-                for field in self.data_fields:
-                    figure = go.Figure(data=[
-                        go.Scatter(x=data['Time'], y=data[field], mode='lines', name=field)
-                    ])
-                    figure.update_layout(
-                        title=f"{self.sensor_name} - {field.capitalize()}",
-                        xaxis_title="Time",
-                        yaxis_title=f"{field.capitalize()} Value"
-                    )
-                    figures.append(figure)
-            return figures
-
-        # Callback to update the interval component's interval property
-        @self.app.callback(
-            Output({'type': 'sensor-interval', 'sensor_name': self.sensor_name}, 'interval'),
-            Input({'type': 'interval-control', 'sensor_name': self.sensor_name}, 'value')
+    @staticmethod
+    def parse_time_window(value):
+        """
+        Parse the time window input.
+
+        Parameters:
+        - value: Value of the time window input.
+
+        Returns:
+        - The window in seconds, or None to show all data.
+        """
+        try:
+            seconds = float(value)
+        except (ValueError, TypeError):
+            return None  # If conversion fails, show all data
+        return seconds if seconds > 0 else None
+
+    def create_figure(self, data, field, resolution=None, parameters=None):
+        """
+        Create the full figure for one field.
+
+        Parameters:
+        - data: DataFrame from the data handler's get_plot_window.
+        - field: The data field name.
+        - resolution: Rollup bucket width in seconds, or None for raw samples.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - A go.Figure.
+        """
+        figure = go.Figure(data=self.create_traces(data, field, resolution))
+        figure.update_layout(**self.get_figure_layout(field, parameters))
+        return figure
+
+    def create_current_values(self, latest_data, parameters=None):
+        """
+        Create the current values display.
+
+        Parameters:
+        - latest_data: Pandas Series with the latest processed sample, or None.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - A Div listing the current value of each field.
+        """
+        if latest_data is not None:
+            current_values = self.get_data_handler().format_current_values(latest_data, parameters=parameters)
+        else:
+            current_values = {field: 'N/A' for field in self.data_fields}
+        return html.Div([
+            html.H6('Current Values:'),
+            html.Ul([html.Li(f'{field.capitalize()}: {value}') for field, value in current_values.items()])
+        ])
+
+    def get_current_values(self, parameters=None, sequence=None):
+        """
+        Create the current values display from the latest raw sample.
+
+        Parameters:
+        - parameters: Dictionary of sensor-specific parameters.
+        - sequence: Sequence number just after the sample to show, None for the latest.
+
+        Returns:
+        - A Div listing the current value of each field.
+        """
+        if sequence is None:
+            sequence = self.sensor.sequence
+        latest, _ = self.get_data_handler().get_data_since(sequence - 1, parameters=parameters)
+        return self.create_current_values(latest.iloc[-1] if not latest.empty else None, parameters)
+
+    def update_sensor_graphs(self, time_window, cursor=None, parameters=None):
+        """
+        Compute the graph updates for one refresh.
+
+        While the time window and parameters are unchanged and the window holds
+        no more than max_points raw samples, only the samples added since the
+        cursor are sent, as extendData trimmed to the window's sample count.
+        With push enabled, those samples are sent by stream_samples instead and
+        only the current values are refreshed here. Otherwise the figures are
+        rebuilt.
+
+        Parameters:
+        - time_window: Value of the time window input (seconds, or None for all data).
+        - cursor: Streaming cursor returned by the previous call for this session.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - Dictionary with 'figures' and 'extend_data' (one entry per field,
+          no_update where unchanged), 'cursor' and 'current_values'.
+        """
+        window_seconds = self.parse_time_window(time_window)
+        start = datetime.now() - timedelta(seconds=window_seconds) if window_seconds else None
+        data_handler = self.get_data_handler()
+        key = {'time_window': window_seconds, 'parameters': parameters}
+        unchanged = [no_update] * len(self.data_fields)
+
+        if self.streaming and cursor and cursor.get('key') == key:
+            window_points = self.sensor.count_window(start=start)
+            if window_points <= self.max_points:
+                if self.push:
+                    # New samples reach the graphs over the push stream
+                    return dict(figures=unchanged, extend_data=unchanged, cursor=no_update,
+                                current_values=self.get_current_values(parameters)
+                                if self.show_current_values else no_update)
+                new_data, sequence = data_handler.get_data_since(cursor['sequence'], parameters=parameters)
+                if new_data.empty:
+                    return dict(figures=unchanged, extend_data=unchanged, cursor=no_update, current_values=no_update)
+                return dict(
+                    figures=unchanged,
+                    extend_data=[self.create_extend_data(new_data, field, window_points) for field in self.data_fields],
+                    cursor={'key': key, 'sequence': sequence},
+                    current_values=self.create_current_values(new_data.iloc[-1], parameters)
+                    if self.show_current_values else no_update,
+                )
+
+        # Rebuild the figures; remember where they end so later ticks can stream
+        figures, sequence, streamable = self.render_figures(start, window_seconds, parameters)
+        current_values = self.get_current_values(parameters, sequence) if self.show_current_values else no_update
+        return dict(
+            figures=figures,
+            extend_data=unchanged,
+            cursor={'key': key, 'sequence': sequence} if self.streaming and streamable else None,
+            current_values=current_values,
         )
-        def update_interval(value):
-            if value is None or value < 1:
-                return 5 * 1000  # Default interval in milliseconds
-            else:
-                return int(value * 1000)  # Convert seconds to milliseconds
 
+    def render_figures(self, start, window_seconds, parameters=None):
+        """
+        Build the figures of every field, served from the shared figure cache
+        when another session has just rendered the same view.
+
+        Parameters:
+        - start: Start of the time window as a datetime, or None for all data.
+        - window_seconds: Parsed time window, part of the cache key.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Returns:
+        - (figures, sequence, streamable): One go.Figure per field, the sensor
+          sequence the figures end at, and whether they show raw samples that
+          fit in max_points.
+        """
+        def render():
+            sequence = self.sensor.sequence
+            data, resolution = self.get_data_handler().get_plot_window(start, self.max_points, parameters)
+            figures = [self.create_figure(data, field, resolution, parameters) for field in self.data_fields]
+            return figures, sequence, resolution is None and len(data) <= self.max_points
+
+        if self.figure_cache is None:
+            return render()
+        key = (self.sensor_name, tuple(self.data_fields), window_seconds, json.dumps(parameters, sort_keys=True))
+        return self.figure_cache.get(key, self.sensor.sequence, render, max_age=self.figure_cache_max_age)
+
+    @staticmethod
+    def parse_update_interval(value):
+        """
+        Parse the update interval input.
+
+        Parameters:
+        - value: Value of the interval control, in seconds.
+
+        Returns:
+        - The update period in milliseconds.
+        """
+        try:
+            seconds = float(value)
+        except (ValueError, TypeError):
+            return 5 * 1000  # Default interval in milliseconds
+        return int(max(seconds, 1) * 1000)
+
+    def is_due(self, cursor, interval_value, now_ms, tolerance_ms=0):
+        """
+        Check whether this card should be refreshed on the current dashboard tick.
+
+        Parameters:
+        - cursor: Streaming cursor stored for this session, holding 'updated_at'.
+        - interval_value: Value of the interval control, in seconds.
+        - now_ms: Current time in epoch milliseconds.
+        - tolerance_ms: Slack so periods that are a multiple of the tick are not
+          pushed back by one tick due to jitter.
+
+        Returns:
+        - True if the card has never been updated or its period has elapsed.
+        """
+        if not cursor or cursor.get('updated_at') is None:
+            return True
+        return now_ms - cursor['updated_at'] + tolerance_ms >= self.parse_update_interval(interval_value)
+
+    def update_content(self, time_window, cursor, parameters=None):
+        """
+        Compute the card updates for one refresh; see update_sensor_graphs.
+
+        Parameters:
+        - time_window: Value of the time window input.
+        - cursor: Streaming cursor for this session.
+        - parameters: Dictionary of {name: value} from the controls created
+          with parameter_id.
+        """
+        return self.update_sensor_graphs(time_window, cursor, parameters or None)
+
+    def stream_samples(self, time_window, cursor, parameters=None):
+        """
+        Generate Server-Sent Events carrying the samples stored after a cursor.
+
+        Each event holds the processed samples since the previous one as
+        {'x': [...], 'y': {field: [...]}, 'max_points': n}, where n is the
+        number of samples in the time window, and has the new cursor as its id
+        so a reconnecting browser resumes where it left off. The stream ends
+        with an 'end' event once the window no longer fits in max_points raw
+        samples, leaving the figures to be rebuilt by the dashboard tick, and
+        without one after push_max_duration seconds, which makes the browser
+        reconnect.
+
+        Parameters:
+        - time_window: Value of the time window input (seconds, or None for all data).
+        - cursor: Sequence number to stream from, e.g. from the stream cursor store.
+        - parameters: Dictionary of sensor-specific parameters.
+
+        Yields:
+        - Encoded event strings.
+        """
+        window_seconds = self.parse_time_window(time_window)
+        data_handler = self.get_data_handler()
+        deadline = time.monotonic() + self.push_max_duration
+        last_sent = 0
+        yield f'retry: {int(self.push_reconnect_delay * 1000)}\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.sensor.wait_for_data(cursor, timeout=min(self.push_keepalive, remaining)):
+                yield ': keep-alive\n\n'
+                continue
+            # Coalesce samples arriving faster than the browser can redraw
+            wait = self.push_min_interval - (time.monotonic() - last_sent)
+            if wait > 0:
+                time.sleep(wait)
+            new_data, cursor = data_handler.get_data_since(cursor, parameters=parameters)
+            if new_data.empty:
+                continue
+            start = datetime.now() - timedelta(seconds=window_seconds) if window_seconds else None
+            window_points = self.sensor.count_window(start=start)
+            if window_points > self.max_points:
+                yield f'id: {cursor}\nevent: end\ndata: {{}}\n\n'
+                return
+            payload = {
+                'x': np.datetime_as_string(new_data['Time'].to_numpy(), unit='us').tolist(),
+                'y': {field: new_data[field].to_numpy() for field in self.data_fields},
+                'max_points': window_points,
+            }
+            yield f'id: {cursor}\ndata: {json.dumps(payload, cls=PlotlyJSONEncoder)}\n\n'
+            last_sent = time.monotonic()
+
+    def register_callbacks(self):
+        """
+        Register sensor-specific callbacks beyond the periodic updates.
+
+        Graphs, cursors and current values of every card are refreshed by the
+        single dashboard tick in tabs/sensor_tab/callbacks.py.
+        """
+        pass
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+import tty
+import pytest
+from sensors.async_serial import AsyncSerialCommunication
+from sensors.communication import AsciiCodec
+from sensors.simulator import SerialSimulator
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def open_pty():
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return master, slave
+
+
+class Collector:
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, timestamps, values):
+        with self._lock:
+            self.calls.append(time.monotonic())
+            self.rows.extend(values.tolist())
+
+
+@pytest.fixture
+def ptys():
+    pairs = [open_pty() for _ in range(3)]
+    yield pairs
+    for pair in pairs:
+        for fd in pair:
+            os.close(fd)
+
+
+def connect(names, **options):
+    communication = AsyncSerialCommunication(names, reset_delay=0, **options)
+    assert wait_until(lambda: all(stats['connected'] for stats in communication.port_stats().values()))
+    return communication
+
+
+def test_decodes_every_port(ptys):
+    communication = connect([os.ttyname(slave) for _, slave in ptys])
+    collectors = [Collector() for _ in ptys]
+    try:
+        for index, collector in enumerate(collectors):
+            communication.register_batch_callback(f'SENSOR_{index}', collector, 2)
+        codec = AsciiCodec()
+        for index, (master, _) in enumerate(ptys):
+            os.write(master, b''.join(codec.encode(f'SENSOR_{index}', [index, row]) for row in range(50)))
+        assert wait_until(lambda: all(len(collector.rows) == 50 for collector in collectors))
+        for index, collector in enumerate(collectors):
+            assert collector.rows == [[index, row] for row in range(50)]
+        assert sum(stats['bytes_read'] for stats in communication.port_stats().values()) > 0
+    finally:
+        communication.close()
+
+
+def test_flushes_after_batch_interval(ptys):
+    master, slave = ptys[0]
+    communication = connect([os.ttyname(slave)], batch_interval=0.3, batch_size=1000)
+    collector = Collector()
+    try:
+        communication.register_batch_callback('SENSOR', collector, 1)
+        written = time.monotonic()
+        os.write(master, b'SENSOR:1\nSENSOR:2\n')
+        time.sleep(0.1)
+        assert collector.rows == []
+        assert wait_until(lambda: len(collector.rows) == 2)
+        assert collector.calls[0] - written >= 0.25
+    finally:
+        communication.close()
+
+
+def test_flushes_when_batch_size_is_reached(ptys):
+    master, slave = ptys[0]
+    communication = connect([os.ttyname(slave)], batch_interval=30, batch_size=5)
+    collector = Collector()
+    try:
+        communication.register_batch_callback('SENSOR', collector, 1)
+        os.write(master, b''.join(b'SENSOR:%d\n' % value for value in range(5)))
+        assert wait_until(lambda: len(collector.rows) == 5, timeout=2)
+        assert collector.rows == [[value] for value in range(5)]
+    finally:
+        communication.close()
+
+
+def test_reconnects_after_the_device_goes_away(tmp_path):
+    simulator = SerialSimulator(sensors=[], link=str(tmp_path / 'ttySIM'))
+    communication = connect([simulator.port], reconnect_interval=0.05)
+    port = communication.ports[simulator.port]
+    collector = Collector()
+    try:
+        communication.register_batch_callback('SENSOR', collector, 1)
+        lost = port.lost
+        simulator.disconnect(duration=0.2)  # Closing the pty makes the reader's next read fail with EIO
+        assert lost.done()
+        assert wait_until(lambda: communication.port_stats()[simulator.port]['reconnects'] == 1)
+        assert wait_until(lambda: communication.port_stats()[simulator.port]['connected'])
+        assert port.lost is not lost
+        with simulator._lock:
+            os.write(simulator._master, b'SENSOR:7\n')
+        assert wait_until(lambda: collector.rows == [[7.0]])
+    finally:
+        communication.close()
+        simulator.close()
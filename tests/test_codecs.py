@@ -0,0 +1,85 @@
+import numpy as np
+from sensors.communication import AsciiCodec, BinaryFrameCodec
+
+
+def codec():
+    return BinaryFrameCodec({1: 'TEMP_SENSOR', 2: 'ACCEL_SENSOR'})
+
+
+def test_binary_round_trip_in_arrival_order():
+    c = codec()
+    data = c.encode('TEMP_SENSOR', [21.5]) + c.encode('ACCEL_SENSOR', [0.5, -1.0, 9.75]) + c.encode('TEMP_SENSOR', [22.0])
+    messages, remainder = c.decode(data)
+    assert remainder == b''
+    assert [sensor_id for sensor_id, _ in messages] == ['TEMP_SENSOR', 'ACCEL_SENSOR', 'TEMP_SENSOR']
+    assert [list(values) for _, values in messages] == [[21.5], [0.5, -1.0, 9.75], [22.0]]
+    assert c.parse_errors == 0
+
+
+def test_binary_partial_frame_is_kept_for_the_next_read():
+    c = codec()
+    frame = c.encode('ACCEL_SENSOR', [1.0, 2.0, 3.0])
+    for split in range(1, len(frame)):
+        messages, remainder = c.decode(frame[:split])
+        assert messages == []
+        messages, remainder = c.decode(remainder + frame[split:])
+        assert [list(values) for _, values in messages] == [[1.0, 2.0, 3.0]]
+        assert remainder == b''
+
+
+def test_binary_bad_crc_is_skipped_and_decoding_resyncs():
+    c = codec()
+    bad = bytearray(c.encode('TEMP_SENSOR', [1.0]))
+    bad[5] ^= 0xFF  # Corrupt the payload
+    data = b'noise' + bytes(bad) + c.encode('TEMP_SENSOR', [2.0])
+    messages, remainder = c.decode(data)
+    assert [list(values) for _, values in messages] == [[2.0]]
+    assert remainder == b''
+    assert c.crc_errors == 1 and c.parse_errors == 1
+
+
+def test_binary_resyncs_on_sync_pattern_inside_garbage():
+    c = codec()
+    # A lone sync pattern whose claimed length runs into the next real frame
+    data = b'\xaa\x55\x01\x02' + c.encode('TEMP_SENSOR', [3.0])
+    messages, _ = c.decode(data)
+    assert [list(values) for _, values in messages] == [[3.0]]
+    assert c.crc_errors == 1
+
+
+def test_binary_unknown_frame_id_is_dropped():
+    c = codec()
+    other = BinaryFrameCodec({9: 'OTHER'})
+    messages, remainder = c.decode(other.encode('OTHER', [1.0]) + c.encode('TEMP_SENSOR', [4.0]))
+    assert [sensor_id for sensor_id, _ in messages] == ['TEMP_SENSOR']
+    assert remainder == b''
+
+
+def test_binary_trailing_sync_byte_is_kept():
+    c = codec()
+    frame = c.encode('TEMP_SENSOR', [5.0])
+    messages, remainder = c.decode(b'junk' + frame[:1])
+    assert messages == [] and remainder == frame[:1]
+    messages, _ = c.decode(remainder + frame[1:])
+    assert [list(values) for _, values in messages] == [[5.0]]
+
+
+def test_binary_values_are_float32():
+    c = codec()
+    messages, _ = c.decode(c.encode('TEMP_SENSOR', [0.1]))
+    assert messages[0][1][0] == np.float32(0.1)
+
+
+def test_ascii_lines_and_malformed_messages():
+    c = AsciiCodec()
+    messages, remainder = c.decode(b'TEMP_SENSOR:1.5,2\nnot a message\n\nPRESSURE_SENSOR:3')
+    assert messages == [('TEMP_SENSOR', ['1.5', '2'])]
+    assert remainder == b'PRESSURE_SENSOR:3'
+    assert c.parse_errors == 1
+
+
+def test_ascii_overlong_partial_line_is_discarded():
+    c = AsciiCodec(max_line_length=8)
+    messages, remainder = c.decode(b'x' * 20)
+    assert messages == [] and remainder == b''
+    assert c.parse_errors == 1
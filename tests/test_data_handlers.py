@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.run import NullCommunication
+from sensors.base_sensor import BaseSensor
+from sensors.filters import HighPass, LowPass
+from sensors.timebase import now_ns
+from tabs.sensor_tab.data_handlers.base_data_handler import BaseSensorDataHandler
+from tabs.sensor_tab.data_handlers.transforms import (Clip, Offset, Pipeline, Polynomial, Scale, Transform,
+                                                      UnitConversion)
+
+CHAINS = [
+    [Scale(2.0), Offset(-3.0), UnitConversion('degC', 'degF')],
+    [UnitConversion('kPa', 'psi'), Polynomial([1.5, 0.25]), Scale(-1.0)],
+    [Offset(1.0), Clip(0.0, 4.0), Scale(3.0), Offset(0.5)],
+    [Polynomial([0.1, -0.2, 1.0]), Scale(2.0), Offset(1.0), Polynomial([7.0])],
+]
+
+
+@pytest.mark.parametrize('chain', CHAINS)
+def test_fused_pipeline_equals_applying_each_transform_in_turn(chain):
+    values = np.linspace(-10.0, 10.0, 101)
+    expected = values.copy()
+    for transform in chain:
+        transform.apply(expected)
+    fused = values.copy()
+    Pipeline({'v': chain}).apply_column('v', fused)
+    np.testing.assert_allclose(fused, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_consecutive_affine_transforms_are_fused_into_one_step():
+    pipeline = Pipeline({'v': [Scale(2.0), Offset(1.0), Clip(0.0, 4.0), Scale(3.0), Offset(0.5)]})
+    steps = pipeline.steps['v']
+    assert [step.affine for step in steps] == [(2.0, 1.0), None, (3.0, 0.5)]
+    assert Pipeline({'v': []}).is_identity
+
+
+def make_sensor(**attributes):
+    return type('TestSensor', (BaseSensor,), attributes)('t', NullCommunication(), 'T', ['v'], capacity=10)
+
+
+class Handler(BaseSensorDataHandler):
+    calibration = {'v': [2.0, 10.0]}
+
+
+def test_high_pass_channel_gets_only_the_scale_of_an_affine_transform():
+    sensor = make_sensor(filters={'hp': HighPass(1, 100), 'lp': LowPass(5, 100)})
+    try:
+        pipeline = Handler('T', sensor).get_pipeline()
+        assert [step.affine for step in pipeline.steps['v']] == [(2.0, 10.0)]
+        assert [step.affine for step in pipeline.steps['v_lp']] == [(2.0, 10.0)]
+        assert [step.affine for step in pipeline.steps['v_hp']] == [(2.0, 0.0)]
+    finally:
+        sensor.close()
+
+
+def test_high_pass_channel_keeps_a_nonlinear_transform_whole():
+    class Curved(BaseSensorDataHandler):
+        calibration = {'v': [1.0, 0.0, 0.0]}
+
+    sensor = make_sensor(filters={'hp': HighPass(1, 100)})
+    try:
+        steps = Curved('T', sensor).get_pipeline().steps['v_hp']
+        assert len(steps) == 1 and steps[0].affine is None
+    finally:
+        sensor.close()
+
+
+def test_decreasing_transform_swaps_bucket_min_and_max():
+    class Negated(BaseSensorDataHandler):
+        calibration = {'v': [-1.0, 0.0]}
+
+    sensor = make_sensor(rollup_tiers=((1, 100),))
+    try:
+        start = (now_ns() // 1_000_000_000 - 30) * 1_000_000_000
+        timestamps = start + np.arange(300, dtype=np.int64) * 100_000_000  # 10 samples per 1 s bucket
+        sensor.data_batch_callback(timestamps, np.arange(300.0)[:, None])
+        df, resolution = Negated('T', sensor).get_plot_window(start=start, min_points=5)
+        assert resolution == 1
+        assert len(df) == 30
+        assert (df['v_min'] <= df['v']).all() and (df['v'] <= df['v_max']).all()
+        assert df['v_min'].iloc[0] == -9.0 and df['v_max'].iloc[0] == 0.0
+        assert df['v'].iloc[0] == pytest.approx(-4.5)
+    finally:
+        sensor.close()
+
+
+def test_processed_history_transforms_only_new_samples():
+    calls = []
+
+    class Counting(Transform):
+        def apply(self, values):
+            calls.append(len(values))
+            values *= 2
+
+    class Doubling(BaseSensorDataHandler):
+        def get_transforms(self, parameters=None):
+            return {'v': [Counting()]}
+
+    sensor = make_sensor()
+    try:
+        handler = Doubling('T', sensor)
+        sensor.data_batch_callback(np.arange(4, dtype=np.int64), np.arange(4.0)[:, None])
+        df, cursor = handler.get_data_since(None)
+        sensor.data_batch_callback(np.arange(4, 7, dtype=np.int64), np.arange(4.0, 7.0)[:, None])
+        df, cursor = handler.get_data_since(cursor)
+        assert df['v'].tolist() == [8.0, 10.0, 12.0]
+        assert calls == [4, 3]
+        assert isinstance(df, pd.DataFrame)
+    finally:
+        sensor.close()
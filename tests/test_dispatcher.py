@@ -0,0 +1,84 @@
+import threading
+import time
+import pytest
+from sensors.dispatcher import Dispatcher, DROP_OLDEST, DROP_NEWEST, BLOCK
+
+
+def collect():
+    received = []
+    return received, lambda timestamps, values: received.extend(timestamps.tolist())
+
+
+def test_stop_delivers_everything_queued_before_returning():
+    received, callback = collect()
+    release = threading.Event()
+
+    def slow(timestamps, values):
+        release.wait(1)
+        callback(timestamps, values)
+
+    dispatcher = Dispatcher({}, {'S': (slow, 1)}, maxsize=1000, batch_size=10)
+    dispatcher.put_items([('S', [float(i)], i) for i in range(100)])
+    threading.Timer(0.2, release.set).start()
+    dispatcher.stop()
+    assert not dispatcher.thread.is_alive()
+    assert received == list(range(100))
+    assert dispatcher.stats()['delivered'] == 100
+
+
+@pytest.mark.parametrize('overflow', [DROP_OLDEST, DROP_NEWEST])
+def test_enqueued_and_dropped_add_up_under_concurrent_producers(overflow):
+    received, callback = collect()
+    dispatcher = Dispatcher({}, {'S': (callback, 1)}, maxsize=50, overflow=overflow, batch_size=7)
+
+    def produce():
+        for i in range(500):
+            dispatcher.put_items([('S', [0.0], i), ('S', [0.0], i)])
+            if i % 50 == 0:
+                time.sleep(0)
+
+    producers = [threading.Thread(target=produce) for _ in range(4)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    dispatcher.stop()
+    stats = dispatcher.stats()
+    accepted = stats['enqueued'] if overflow == DROP_NEWEST else stats['enqueued'] - stats['dropped']
+    assert stats['enqueued'] + (stats['dropped'] if overflow == DROP_NEWEST else 0) == 4000
+    assert stats['delivered'] == accepted == len(received)
+    assert stats['queue_depth'] == 0
+
+
+@pytest.mark.parametrize('overflow', [DROP_OLDEST, DROP_NEWEST, BLOCK])
+def test_messages_after_stop_are_counted_as_dropped(overflow):
+    received, callback = collect()
+    dispatcher = Dispatcher({}, {'S': (callback, 1)}, maxsize=10, overflow=overflow)
+    dispatcher.stop()
+    dispatcher.put_items([('S', [0.0], i) for i in range(5)])
+    stats = dispatcher.stats()
+    assert (stats['enqueued'], stats['dropped'], stats['queue_depth']) == (0, 5, 0)
+    assert received == []
+
+
+def test_blocked_producer_counts_what_it_could_not_queue_when_stopped():
+    release = threading.Event()
+    received, callback = collect()
+
+    def stalled(timestamps, values):
+        release.wait(5)
+        callback(timestamps, values)
+
+    dispatcher = Dispatcher({}, {'S': (stalled, 1)}, maxsize=10, overflow=BLOCK, batch_size=10)
+    producer = threading.Thread(target=dispatcher.put_items, args=([('S', [0.0], i) for i in range(100)],))
+    producer.start()
+    time.sleep(0.3)  # The first batch is stuck in the callback and the queue is full
+    stopper = threading.Thread(target=dispatcher.stop)
+    stopper.start()
+    producer.join(5)
+    release.set()
+    stopper.join(5)
+    stats = dispatcher.stats()
+    assert not producer.is_alive()
+    assert stats['enqueued'] + stats['dropped'] == 100
+    assert stats['delivered'] == stats['enqueued'] == len(received)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from tabs.sensor_tab.downsampling import LTTB, MINMAX, downsample, downsample_indices, lttb_indices, minmax_indices
+
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), np.cumsum(rng.standard_normal(n))
+
+
+@pytest.mark.parametrize('select', [lttb_indices, minmax_indices])
+@pytest.mark.parametrize('n, n_out', [(5, 0), (5, 1), (5, 2), (5, 3), (5, 4), (6, 5), (100, 3), (1000, 7),
+                                      (1000, 100), (10_007, 1000)])
+def test_never_keeps_more_than_n_out_points(select, n, n_out):
+    x, y = series(n)
+    indices = select(x, y, n_out)
+    assert len(indices) <= n_out
+    assert np.all(np.diff(indices) > 0)
+    if n_out >= 2:
+        assert indices[0] == 0 and indices[-1] == n - 1
+
+
+def test_series_that_fits_is_returned_unchanged():
+    x, y = series(10)
+    assert downsample_indices(x, y, 10) is None
+    down_x, down_y = downsample(x, y, None)
+    assert down_x is x and down_y is y
+
+
+def test_lttb_keeps_exactly_n_out_points_and_a_spike():
+    x, y = series(1000)
+    y[437] = 100.0
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert 437 in indices
+
+
+def test_lttb_accepts_datetimes_and_nans():
+    x = np.datetime64('2024-01-01T00:00:00') + np.arange(500).astype('timedelta64[s]')
+    _, y = series(500)
+    y[100:110] = np.nan
+    indices = lttb_indices(x, y, 40)
+    assert len(indices) == 40
+    assert not np.isnan(y[indices[1:-1]]).any()
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    x, y = series(1000)
+    n_out = 42
+    indices = minmax_indices(x, y, n_out)
+    starts = np.linspace(0, 1000, (n_out - 2) // 2 + 1).astype(np.int64)
+    for start, end in zip(starts, starts[1:]):
+        assert start + np.argmin(y[start:end]) in indices
+        assert start + np.argmax(y[start:end]) in indices
+
+
+def test_downsample_applies_the_indices_and_rejects_unknown_modes():
+    x, y = series(300)
+    for mode in (LTTB, MINMAX):
+        down_x, down_y = downsample(x, y, 30, mode)
+        assert len(down_x) <= 30
+        np.testing.assert_array_equal(down_y, y[down_x.astype(int)])
+    with pytest.raises(ValueError):
+        downsample(x, y, 30, 'every-other')
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from benchmarks.run import NullCommunication
+from sensors.base_sensor import BaseSensor
+from sensors.filters import (Biquad, ExponentialMovingAverage, FilterStage, HighPass, LinearFilter, LowPass,
+                             MovingAverage)
+
+
+def direct(b, a, x):
+    """Per-sample difference equation, starting as if x[0] had always been the input."""
+    b = np.asarray(b, dtype=np.float64) / a[0]
+    a = np.asarray(a, dtype=np.float64) / a[0]
+    gain = b.sum() / a.sum()
+    xs = [x[0]] * (len(b) - 1)
+    ys = [gain * x[0]] * (len(a) - 1)
+    out = []
+    for sample in x:
+        xs.insert(0, sample)
+        y = sum(bk * xk for bk, xk in zip(b, xs)) - sum(ak * yk for ak, yk in zip(a[1:], ys))
+        ys.insert(0, y)
+        out.append(y)
+    return np.array(out)
+
+
+def signal(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 5.0 + np.sin(np.arange(n) / 7.0) + rng.standard_normal(n) * 0.1
+
+
+FILTERS = [
+    lambda: LowPass(5, 100),
+    lambda: HighPass(2, 100),
+    lambda: Biquad([0.2, 0.3, 0.1], [1.0, -0.5, 0.2]),
+    lambda: ExponentialMovingAverage(0.1),
+    lambda: LinearFilter([0.1, 0.2, 0.3, 0.2], [1.0, -0.3, 0.1, -0.05]),
+]
+
+
+@pytest.mark.parametrize('make', FILTERS)
+def test_block_output_matches_the_direct_recursion(make):
+    f = make()
+    x = signal()
+    np.testing.assert_allclose(f.process(x), direct(f.b, f.a, x), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('make', FILTERS)
+def test_state_carries_across_arbitrary_batch_splits(make):
+    x = signal()
+    whole = make().process(x)
+    f = make()
+    splits = [0, 1, 2, 255, 256, 257, 600, 601, 1000]
+    parts = [f.process(x[start:end]) for start, end in zip(splits, splits[1:])]
+    np.testing.assert_allclose(np.concatenate(parts), whole, rtol=1e-9, atol=1e-9)
+
+
+def test_nan_inputs_give_nan_outputs_and_hold_the_previous_input():
+    x = signal(20)
+    gapped = x.copy()
+    gapped[5:8] = np.nan
+    held = x.copy()
+    held[5:8] = x[4]
+    f = LowPass(5, 100)
+    y = f.process(gapped)
+    assert np.isnan(y[5:8]).all()
+    expected = direct(f.b, f.a, held)
+    np.testing.assert_allclose(np.delete(y, [5, 6, 7]), np.delete(expected, [5, 6, 7]))
+
+
+def test_high_pass_blocks_a_constant_and_low_pass_keeps_it():
+    x = np.full(500, 3.0)
+    np.testing.assert_allclose(HighPass(2, 100).process(x), 0.0, atol=1e-9)
+    np.testing.assert_allclose(LowPass(5, 100).process(x), 3.0)
+
+
+def test_moving_average_across_batches():
+    f = MovingAverage(3)
+    y = np.concatenate([f.process(np.array([1.0, 2.0])), f.process(np.array([3.0, 4.0]))])
+    np.testing.assert_allclose(y, [1.0, 1.5, 2.0, 3.0])
+
+
+def test_each_channel_gets_its_own_filter():
+    template = LowPass(5, 100)
+    stage = FilterStage(['x', 'y'], {'lp': template})
+    assert stage.get_filter('x_lp') is not stage.get_filter('y_lp')
+    values = np.column_stack([signal(100, 1), signal(100, 2)])
+    out = stage.process(values)
+    np.testing.assert_allclose(out[:, 2], LowPass(5, 100).process(values[:, 0]))
+    np.testing.assert_allclose(out[:, 3], LowPass(5, 100).process(values[:, 1]))
+    assert template._state is None
+
+
+def test_each_sensor_gets_its_own_filter_state():
+    Sensor = type('FilteredSensor', (BaseSensor,), {'filters': {'lp': LowPass(5, 100)}})
+    first = Sensor('a', NullCommunication(), 'A', ['v'])
+    second = Sensor('b', NullCommunication(), 'B', ['v'])
+    try:
+        assert first.filter_stage.get_filter('v_lp') is not second.filter_stage.get_filter('v_lp')
+        timestamps = np.arange(100, dtype=np.int64)
+        first.data_batch_callback(timestamps, signal(100, 1)[:, None])
+        second.data_batch_callback(timestamps, np.full((100, 1), -2.0))
+        _, values = second.buffer.snapshot()
+        np.testing.assert_allclose(values[1], -2.0)
+        _, values = first.buffer.snapshot()
+        np.testing.assert_allclose(values[1], LowPass(5, 100).process(signal(100, 1)))
+        assert Sensor.filters['lp']._state is None
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,14 @@
+import pytest
+from sensors.manager import CommunicationManager
+
+
+def test_binary_codec_without_frame_ids_names_the_backend():
+    config = {'backends': {'port1': {'type': 'replay', 'path': 'unused.csv', 'codec': 'binary'}}}
+    with pytest.raises(ValueError, match="'port1'.*'frame_ids'"):
+        CommunicationManager.from_config(config)
+
+
+def test_unknown_codec_names_the_backend():
+    config = {'backends': {'port2': {'type': 'replay', 'path': 'unused.csv', 'codec': 'morse'}}}
+    with pytest.raises(ValueError, match="'port2'.*'morse'"):
+        CommunicationManager.from_config(config)
@@ -0,0 +1,153 @@
+import os
+import threading
+import numpy as np
+import pytest
+from sensors.dispatcher import DROP_NEWEST
+from sensors.recording import Recording, Segment
+from sensors.rollup import RollupPyramid
+
+FIELDS = ['a', 'b']
+
+
+def batch(start, count):
+    timestamps = np.arange(start, start + count, dtype=np.int64)
+    return timestamps, np.column_stack([timestamps * 1.0, -timestamps * 1.0])
+
+
+def segment_names(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.seg'))
+
+
+def test_records_roll_into_new_segments_and_old_ones_are_deleted(tmp_path):
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10, max_segments=3)
+    for start in range(0, 45, 5):
+        recording.append(*batch(start, 5))
+    recording.close()
+    assert segment_names(tmp_path) == ['00000002.seg', '00000003.seg', '00000004.seg']
+    reopened = Recording(str(tmp_path), FIELDS, segment_records=10, max_segments=3)
+    timestamps, values = reopened.window()
+    assert timestamps.tolist() == list(range(20, 45))
+    assert values[1].tolist() == [-t for t in range(20, 45)]
+    assert reopened.oldest() == 20
+    reopened.close()
+
+
+def test_reopened_recording_continues_the_last_segment_and_numbering(tmp_path):
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10)
+    recording.append(*batch(0, 7))
+    recording.close()
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10)
+    recording.append(*batch(7, 8))
+    recording.close()
+    assert segment_names(tmp_path) == ['00000000.seg', '00000001.seg']
+    recording = Recording(str(tmp_path), FIELDS)
+    assert recording.window()[0].tolist() == list(range(15))
+    assert recording.latest(4)[0].tolist() == [11, 12, 13, 14]
+    assert recording.count_window(3, 12) == 10
+    recording.close()
+
+
+def test_records_past_the_header_count_are_ignored_after_a_crash(tmp_path):
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10)
+    recording.append(*batch(0, 6))
+    recording.close()
+    # A crash after writing records but before advancing the count leaves them invisible
+    segment = Segment(str(tmp_path / '00000000.seg'))
+    segment._records[6:8]['time'] = [99, 100]
+    segment.close()
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10)
+    assert recording.window()[0].tolist() == list(range(6))
+    recording.append(*batch(6, 2))
+    recording.close()
+    assert Recording(str(tmp_path), FIELDS, read_only=True).window()[0].tolist() == list(range(8))
+
+
+def test_unreadable_and_foreign_segments_are_skipped(tmp_path):
+    (tmp_path / '00000000.seg').write_bytes(b'garbage')
+    Segment(str(tmp_path / '00000001.seg'), ['other'], 10).close()
+    recording = Recording(str(tmp_path), FIELDS, segment_records=10)
+    recording.append(*batch(0, 3))
+    recording.close()
+    assert segment_names(tmp_path)[-1] == '00000002.seg'
+    assert Recording(str(tmp_path), FIELDS, read_only=True).window()[0].tolist() == [0, 1, 2]
+
+
+def test_only_one_writer_per_directory(tmp_path):
+    recording = Recording(str(tmp_path), FIELDS)
+    with pytest.raises(RuntimeError):
+        Recording(str(tmp_path), FIELDS)
+    reader = Recording(str(tmp_path), FIELDS, read_only=True)
+    with pytest.raises(ValueError):
+        reader.append(*batch(0, 1))
+    recording.close()
+    Recording(str(tmp_path), FIELDS).close()
+
+
+def test_read_only_recording_follows_rolls_and_deletions(tmp_path):
+    writer = Recording(str(tmp_path), FIELDS, segment_records=5, max_segments=2, flush_interval=0.01)
+    reader = Recording(str(tmp_path), FIELDS, read_only=True)
+    writer.append(*batch(0, 5))
+    writer.close()
+    assert reader.window()[0].tolist() == list(range(5))
+    writer = Recording(str(tmp_path), FIELDS, segment_records=5, max_segments=2)
+    writer.append(*batch(5, 10))
+    writer.close()
+    assert reader.window()[0].tolist() == list(range(5, 15))
+
+
+def stalled(tmp_path, **options):
+    # A recording whose writer thread is held up, as on a stalled disk
+    recording = Recording(str(tmp_path), FIELDS, **options)
+    release = threading.Event()
+    write_pending = recording._write_pending
+    recording._write_pending = lambda: (release.wait(), write_pending())
+    return recording, release
+
+
+def test_full_queue_drops_the_oldest_records(tmp_path):
+    recording, release = stalled(tmp_path, max_pending=10)
+    for start in range(0, 25, 5):
+        recording.append(*batch(start, 5))
+    assert recording.stats() == {'pending': 10, 'dropped': 15}
+    release.set()
+    recording.close()
+    assert Recording(str(tmp_path), FIELDS, read_only=True).window()[0].tolist() == list(range(15, 25))
+
+
+def test_full_queue_can_drop_the_newest_records(tmp_path):
+    recording, release = stalled(tmp_path, max_pending=10, overflow=DROP_NEWEST)
+    for start in range(0, 25, 5):
+        recording.append(*batch(start, 5))
+    assert recording.stats() == {'pending': 10, 'dropped': 15}
+    release.set()
+    recording.close()
+    assert Recording(str(tmp_path), FIELDS, read_only=True).window()[0].tolist() == list(range(10))
+
+
+def test_close_leaves_a_stalled_writer_to_finish(tmp_path):
+    recording, release = stalled(tmp_path)
+    recording.append(*batch(0, 3))
+    recording.close(timeout=0.1)
+    assert recording.thread.is_alive()
+    release.set()
+    recording.thread.join(5)
+    assert not recording.thread.is_alive()
+    assert Recording(str(tmp_path), FIELDS, read_only=True).window()[0].tolist() == [0, 1, 2]
+
+
+def test_rollups_saved_with_the_recording_are_restored(tmp_path):
+    tiers = ((1, 10), (10, 10))
+    pyramid = RollupPyramid(FIELDS, tiers)
+    timestamps, values = batch(0, 30)
+    pyramid.extend(timestamps * 500_000_000, values)
+    recording = Recording(str(tmp_path), FIELDS)
+    recording.save_state('rollups', pyramid.state())
+    recording.close()
+
+    restored = RollupPyramid(FIELDS, tiers)
+    assert restored.restore(Recording(str(tmp_path), FIELDS, read_only=True).load_state('rollups'))
+    for original, copy in zip(pyramid.tiers, restored.tiers):
+        for a, b in zip(original.window(), copy.window()):
+            np.testing.assert_array_equal(a, b)
+    assert (restored.first_timestamp, restored.last_timestamp) == (pyramid.first_timestamp, pyramid.last_timestamp)
+    assert not RollupPyramid(FIELDS, ((1, 20),)).restore(pyramid.state())
@@ -0,0 +1,140 @@
+import threading
+import numpy as np
+import pytest
+from sensors.ring_buffer import RingBuffer
+
+
+def filled(capacity, count, fields=('a', 'b')):
+    buffer = RingBuffer(fields, capacity)
+    timestamps = np.arange(count, dtype=np.int64)
+    buffer.extend(timestamps, np.column_stack([timestamps * 10.0, timestamps * 100.0])[:, :len(fields)])
+    return buffer
+
+
+def test_append_and_snapshot_in_time_order():
+    buffer = RingBuffer(['a', 'b'], 4)
+    for t in range(3):
+        buffer.append(t, [t, -t])
+    timestamps, values = buffer.snapshot()
+    assert timestamps.tolist() == [0, 1, 2]
+    assert values.tolist() == [[0, 1, 2], [0, -1, -2]]
+    assert len(buffer) == 3
+    assert buffer.sequence == 3
+
+
+def test_append_rejects_bad_rows_without_writing():
+    buffer = RingBuffer(['a', 'b'], 4)
+    with pytest.raises(ValueError):
+        buffer.append(0, [1.0])
+    with pytest.raises(ValueError):
+        buffer.append(0, [1.0, 'x'])
+    assert len(buffer) == 0
+    assert buffer.sequence == 0
+
+
+def test_wrap_keeps_newest_capacity_rows():
+    buffer = filled(4, 10)
+    timestamps, values = buffer.snapshot()
+    assert timestamps.tolist() == [6, 7, 8, 9]
+    assert values[0].tolist() == [60, 70, 80, 90]
+    assert buffer.oldest() == 6
+    assert buffer.sequence == 10
+
+
+def test_extend_across_the_end_of_the_ring():
+    buffer = filled(5, 3)
+    buffer.extend(np.arange(3, 7), np.ones((4, 2)))
+    assert buffer.snapshot()[0].tolist() == [2, 3, 4, 5, 6]
+
+
+def test_extend_larger_than_capacity():
+    buffer = filled(3, 2)
+    buffer.extend(np.arange(2, 12), np.zeros((10, 2)))
+    timestamps, _ = buffer.snapshot()
+    assert timestamps.tolist() == [9, 10, 11]
+    assert buffer.sequence == 12
+
+
+def test_extend_rejects_mismatched_shapes():
+    buffer = RingBuffer(['a', 'b'], 4)
+    with pytest.raises(ValueError):
+        buffer.extend(np.arange(3), np.zeros((3, 3)))
+
+
+def test_read_since_returns_only_new_samples():
+    buffer = filled(8, 3)
+    timestamps, _, cursor = buffer.read_since(None)
+    assert timestamps.tolist() == [0, 1, 2]
+    assert cursor == 3
+    buffer.extend(np.arange(3, 5), np.zeros((2, 2)))
+    timestamps, _, cursor = buffer.read_since(cursor)
+    assert timestamps.tolist() == [3, 4]
+    assert cursor == 5
+    timestamps, _, cursor = buffer.read_since(cursor)
+    assert len(timestamps) == 0 and cursor == 5
+
+
+def test_read_since_after_overwrite_starts_at_oldest():
+    buffer = filled(4, 3)
+    _, _, cursor = buffer.read_since(None)
+    buffer.extend(np.arange(3, 10), np.zeros((7, 2)))
+    timestamps, _, cursor = buffer.read_since(cursor)
+    assert timestamps.tolist() == [6, 7, 8, 9]
+    assert cursor == 10
+
+
+def test_read_since_cursor_ahead_reads_everything():
+    buffer = filled(4, 2)
+    timestamps, _, cursor = buffer.read_since(100)
+    assert timestamps.tolist() == [0, 1]
+    assert cursor == 2
+
+
+def test_window_bounds_are_inclusive():
+    buffer = filled(6, 10)
+    assert buffer.window(5, 7)[0].tolist() == [5, 6, 7]
+    assert buffer.window(None, 5)[0].tolist() == [4, 5]
+    assert buffer.window(8, None)[0].tolist() == [8, 9]
+    assert buffer.window(20, 30)[0].tolist() == []
+    assert buffer.window(7, 5)[0].tolist() == []
+
+
+def test_reads_are_not_changed_by_later_appends():
+    buffer = filled(4, 4)
+    timestamps, values = buffer.snapshot()
+    window, _ = buffer.window(0, 1)
+    buffer.extend(np.arange(100, 104), np.zeros((4, 2)))
+    assert timestamps.tolist() == [0, 1, 2, 3]
+    assert values[0].tolist() == [0, 10, 20, 30]
+    assert window.tolist() == [0, 1]
+
+
+def test_window_stays_sorted_under_concurrent_appends():
+    buffer = RingBuffer(['a'], 64)
+    buffer.extend(np.arange(64), np.zeros((64, 1)))
+    stop = threading.Event()
+
+    def write():
+        t = 64
+        while not stop.is_set():
+            buffer.append(t, [0.0])
+            t += 1
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            timestamps, _ = buffer.window(0, None)
+            assert np.all(np.diff(timestamps) == 1)
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_clear_can_continue_numbering():
+    buffer = filled(4, 3)
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.sequence == 3 and buffer.oldest() is None
+    buffer.clear(sequence=42)
+    buffer.append(0, [1.0, 2.0])
+    assert buffer.read_since(None)[2] == 43
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from sensors.rollup import RollupPyramid, RollupTier, tiers_nbytes
+
+SECOND = 1_000_000_000
+
+
+def samples(n, step=SECOND // 10, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = start + np.arange(n, dtype=np.int64) * step
+    return timestamps, rng.standard_normal((n, 2))
+
+
+def expected_buckets(timestamps, values, width_ns):
+    buckets = timestamps // width_ns
+    rows = []
+    for bucket in np.unique(buckets):
+        selected = values[buckets == bucket]
+        row = []
+        for field in range(values.shape[1]):
+            column = selected[:, field]
+            row += [column.min(), column.max(), column.mean()]
+        rows.append([bucket * width_ns] + row + [len(selected)])
+    return np.array(rows)
+
+
+def as_rows(window):
+    timestamps, values = window
+    return np.column_stack([timestamps, values.T])
+
+
+@pytest.mark.parametrize('splits', [[0, 1000], [0, 1, 2, 3, 1000], [0, 5, 10, 15, 500, 999, 1000], [0, 7, 333, 1000]])
+def test_open_bucket_merges_across_extend_calls(splits):
+    timestamps, values = samples(1000)
+    tier = RollupTier(['x', 'y'], 1, 1000)
+    for start, end in zip(splits, splits[1:]):
+        tier.extend(timestamps[start:end], values[start:end])
+    np.testing.assert_allclose(as_rows(tier.window()), expected_buckets(timestamps, values, SECOND))
+
+
+def test_window_includes_the_open_bucket_only_within_the_range():
+    timestamps, values = samples(25)  # Buckets 0 and 1 closed, bucket 2 open
+    tier = RollupTier(['x', 'y'], 1, 10)
+    tier.extend(timestamps, values)
+    assert len(tier.buffer) == 2
+    assert tier.window()[0].tolist() == [0, SECOND, 2 * SECOND]
+    assert tier.window(end=SECOND)[0].tolist() == [0, SECOND]
+    assert tier.window(start=2 * SECOND)[0].tolist() == [2 * SECOND]
+
+
+def test_tier_keeps_only_capacity_closed_buckets():
+    timestamps, values = samples(200)
+    tier = RollupTier(['x', 'y'], 1, 5)
+    tier.extend(timestamps, values)
+    assert tier.buffer.snapshot()[0].tolist() == [s * SECOND for s in range(14, 19)]
+    assert tier.oldest() == 14 * SECOND
+
+
+def test_state_round_trip_continues_where_it_left_off():
+    timestamps, values = samples(600)
+    original = RollupPyramid(['x', 'y'], ((1, 100), (10, 20)))
+    original.extend(timestamps[:355], values[:355])
+    restored = RollupPyramid(['x', 'y'], ((1, 100), (10, 20)))
+    assert restored.restore(original.state())
+    assert (restored.first_timestamp, restored.last_timestamp) == (original.first_timestamp, original.last_timestamp)
+    for pyramid in (original, restored):
+        pyramid.extend(timestamps[355:], values[355:])
+    for before, after in zip(original.tiers, restored.tiers):
+        np.testing.assert_array_equal(as_rows(before.window()), as_rows(after.window()))
+    np.testing.assert_allclose(as_rows(restored.tiers[1].window()), expected_buckets(timestamps, values, 10 * SECOND))
+
+
+def test_restore_rejects_a_state_for_other_tiers_or_fields():
+    timestamps, values = samples(50)
+    pyramid = RollupPyramid(['x', 'y'], ((1, 100),))
+    pyramid.extend(timestamps, values)
+    state = pyramid.state()
+    assert not RollupPyramid(['x', 'y'], ((1, 50),)).restore(state)
+    assert not RollupPyramid(['x', 'z'], ((1, 100),)).restore(state)
+    assert RollupPyramid(['x', 'y'], ((1, 100),)).state() is None
+
+
+def pyramid_with_history(seconds):
+    # 1 s buckets for 60 s, 10 s buckets for 600 s, 60 s buckets for an hour
+    pyramid = RollupPyramid(['x', 'y'], ((1, 60), (10, 60), (60, 60)))
+    timestamps, values = samples(seconds, step=SECOND)
+    pyramid.extend(timestamps, values)
+    return pyramid, int(timestamps[-1])
+
+
+def test_finest_covering_picks_the_finest_tier_reaching_back_far_enough():
+    pyramid, now = pyramid_with_history(1000)
+    widths = lambda tier: tier.width_seconds if tier else None
+    assert widths(pyramid.finest_covering(now - 30 * SECOND)) == 1
+    assert widths(pyramid.finest_covering(now - 300 * SECOND)) == 10
+    assert widths(pyramid.finest_covering(now - 900 * SECOND)) == 60
+    assert widths(pyramid.finest_covering(0)) == 60  # Bounded by the first sample, not the tier's capacity
+    assert pyramid.finest_covering(-3600 * SECOND) == pyramid.tiers[-1]
+
+
+def test_select_picks_the_coarsest_tier_with_enough_points():
+    pyramid, now = pyramid_with_history(1000)
+    select = lambda start, min_points: getattr(pyramid.select(start, now, min_points), 'width_seconds', None)
+    assert select(now - 900 * SECOND, 10) == 60
+    assert select(now - 900 * SECOND, 50) is None  # 60 s buckets give 15 points, 10 s ones do not reach back
+    assert select(now - 500 * SECOND, 20) == 10
+    assert select(now - 50 * SECOND, 20) == 1
+    assert select(now - 50 * SECOND, 100) is None
+
+
+def test_tiers_nbytes_matches_the_allocation():
+    tiers = ((1, 100), (10, 20))
+    assert tiers_nbytes(2, tiers) == RollupPyramid(['x', 'y'], tiers).nbytes
@@ -0,0 +1,44 @@
+import os
+import numpy as np
+import pytest
+from sensors.shared_memory import SharedBlock, SharedRingBuffer, fcntl
+
+LAYOUT = SharedRingBuffer.layout('raw', 1, 8)
+
+
+@pytest.fixture
+def writer():
+    block = SharedBlock(f'sensor-gui-test-{os.getpid()}', LAYOUT, create=True)
+    yield block
+    block.close()
+    block.unlink()
+
+
+@pytest.mark.skipif(fcntl is None, reason="a second writer is only detected where flock exists")
+def test_second_writer_is_rejected(writer):
+    with pytest.raises(RuntimeError, match='already written'):
+        SharedBlock(writer.name, LAYOUT, create=True)
+
+
+def test_writer_can_reopen_after_close(writer):
+    writer.close()
+    block = SharedBlock(writer.name, LAYOUT, create=True)
+    block.close()
+
+
+def test_reader_gets_copies_not_views(writer):
+    buffer = SharedRingBuffer(writer, 'raw', ['value'], 8)
+    buffer.extend(np.arange(8), np.arange(8.0)[:, None])
+    reader = SharedBlock(writer.name, LAYOUT)
+    try:
+        shared = SharedRingBuffer(reader, 'raw', ['value'], 8)
+        timestamps, values = shared.window(2, 5)
+        view = reader.read(lambda: reader.arrays['raw.timestamps'][:4])
+        buffer.extend(np.arange(8, 16), np.arange(8.0, 16.0)[:, None])
+        assert timestamps.tolist() == [2, 3, 4, 5]
+        assert values[0].tolist() == [2.0, 3.0, 4.0, 5.0]
+        assert view.flags.owndata
+        assert shared.oldest() == 8
+    finally:
+        del shared
+        reader.close()
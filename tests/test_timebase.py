@@ -0,0 +1,55 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from sensors.timebase import local_offsets_ns, to_datetime64, to_ns
+
+HOUR = 3600 * 10**9
+
+
+@pytest.fixture
+def london(monkeypatch):
+    monkeypatch.setenv('TZ', 'Europe/London')
+    time.tzset()
+    if time.tzname[0] != 'GMT':
+        pytest.skip("Europe/London time zone data is not installed")
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def utc_ns(text):
+    return int(np.datetime64(text, 'ns').astype(np.int64))
+
+
+def test_each_timestamp_gets_the_offset_in_effect_at_its_time(london):
+    # Clocks went forward at 01:00 UTC on 2024-03-31 and back at 01:00 UTC on 2024-10-27
+    timestamps = np.array([utc_ns('2024-01-15T12:00'), utc_ns('2024-03-31T00:59:59'), utc_ns('2024-03-31T01:00'),
+                           utc_ns('2024-07-01T12:00'), utc_ns('2024-10-27T00:59:59'), utc_ns('2024-10-27T01:00')])
+    assert (local_offsets_ns(timestamps) // HOUR).tolist() == [0, 0, 1, 1, 1, 0]
+    local = to_datetime64(timestamps)
+    assert local.astype(str).tolist() == [
+        '2024-01-15T12:00:00.000000000', '2024-03-31T00:59:59.000000000', '2024-03-31T02:00:00.000000000',
+        '2024-07-01T13:00:00.000000000', '2024-10-27T01:59:59.000000000', '2024-10-27T01:00:00.000000000']
+
+
+def test_matches_pandas_across_a_year(london):
+    timestamps = np.arange(utc_ns('2024-01-01'), utc_ns('2025-01-01'), 7 * 60 * 10**9, dtype=np.int64)
+    expected = pd.DatetimeIndex(timestamps).tz_localize('UTC').tz_convert('Europe/London').tz_localize(None)
+    np.testing.assert_array_equal(to_datetime64(timestamps), expected.values)
+
+
+def test_local_times_round_trip_on_both_sides_of_a_change(london):
+    for text in ('2024-03-30T23:30', '2024-03-31T02:30', '2024-08-01T09:15:00.123456789'):
+        timestamp = utc_ns(text)
+        local = to_datetime64([timestamp])[0]
+        assert to_ns(local) == timestamp
+        assert to_ns(pd.Timestamp(local)) == timestamp
+    assert to_ns(datetime(2024, 1, 1, 12)) == utc_ns('2024-01-01T12:00')
+    assert to_ns(datetime(2024, 7, 1, 12)) == utc_ns('2024-07-01T11:00')
+
+
+def test_single_offset_is_returned_as_a_scalar(london):
+    timestamps = np.arange(utc_ns('2024-07-01'), utc_ns('2024-07-02'), 10**9, dtype=np.int64)
+    assert local_offsets_ns(timestamps) == HOUR